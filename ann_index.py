@@ -0,0 +1,243 @@
+# ann_index.py
+"""
+Índice de vizinhos aproximados (estilo IVF, só NumPy/scikit-learn) sobre o catálogo.
+
+Cada filme vira um vetor [TF-IDF da sinopse | gêneros one-hot * GENRE_WEIGHT],
+normalizado. Para buscar rápido, os vetores são projetados num espaço denso
+pequeno (TruncatedSVD) e agrupados por k-means em ~sqrt(N) listas; a
+consulta só visita as N_PROBE listas cujos centróides estão mais perto do
+perfil e reordena esses candidatos pelo cosseno exato no espaço original.
+Assim o recomendador parte dos vizinhos reais do perfil no catálogo
+inteiro, e não só da primeira página do discover.
+"""
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.decomposition import TruncatedSVD
+
+import catalog
+import shared_matrix
+from ranking import top_k_indices
+from text_model import TextModel, get_text_model
+from logger_conf import get_logger
+
+logger = get_logger(__name__)
+
+# nome da matriz publicada em data/shared/ (lida via mmap por todos os workers)
+SHARED_NAME = "ann_index"
+
+# dimensão do espaço denso usado para escolher as listas
+N_COMPONENTS = 64
+# quantas listas (clusters) visitar por consulta
+N_PROBE = 8
+# peso do bloco de gêneros em relação ao texto no vetor do filme
+GENRE_WEIGHT = 0.5
+
+def _l2_rows(X):
+    norms = np.sqrt(np.asarray(X.multiply(X).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sp.diags(1.0 / norms) @ X
+
+def _unit(Z: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(Z, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return Z / norms
+
+class ANNIndex:
+    def __init__(self, ids: np.ndarray, X, genre_ids: List[int], projection: np.ndarray,
+                 centroids: np.ndarray, order: np.ndarray, offsets: np.ndarray, model_version: str):
+        self.ids = ids
+        self.X = X if sp.isspmatrix_csr(X) else sp.csr_matrix(X)   # (N, D) vetores exatos, linhas L2
+        self.genre_ids = list(genre_ids)
+        self.projection = projection      # (d, D) componentes do SVD
+        self.centroids = centroids        # (n_lists, d)
+        self.order = order                # linhas do índice agrupadas por lista
+        self.offsets = offsets            # lista c = order[offsets[c]:offsets[c + 1]]
+        self.model_version = model_version
+        self.shared_version: Optional[str] = None   # versão publicada de onde veio (se mapeado)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    # ---------- construção ----------
+    @staticmethod
+    def _genre_block(genre_lists: List[List[int]], genre_ids: List[int]):
+        col_of = {gid: j for j, gid in enumerate(genre_ids)}
+        rows, cols = [], []
+        for i, gids in enumerate(genre_lists):
+            for gid in gids or []:
+                if gid in col_of:
+                    rows.append(i)
+                    cols.append(col_of[gid])
+        G = sp.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(len(genre_lists), len(genre_ids)))
+        return _l2_rows(G) * GENRE_WEIGHT
+
+    @classmethod
+    def build(cls, movies: List[Dict], model: TextModel, n_components: int = N_COMPONENTS,
+              n_lists: Optional[int] = None, seed: int = 0) -> "ANNIndex":
+        movies = [m for m in movies if m.get("id")]
+        ids = np.array([m["id"] for m in movies], dtype=np.int64)
+        genre_ids = sorted({int(g) for m in movies for g in (m.get("genre_ids") or [])})
+        T = model.transform([m.get("overview") or "" for m in movies])
+        G = cls._genre_block([m.get("genre_ids") for m in movies], genre_ids)
+        X = _l2_rows(sp.hstack([T, G]).tocsr()).tocsr()
+
+        n_components = max(1, min(n_components, X.shape[1] - 1, len(movies) - 1))
+        svd = TruncatedSVD(n_components=n_components, random_state=seed).fit(X)
+        projection = svd.components_.astype(np.float32)
+        Z = _unit(np.asarray(X @ projection.T, dtype=np.float32))
+
+        n_lists = n_lists or max(1, min(1024, int(np.sqrt(len(movies)))))
+        km = MiniBatchKMeans(n_clusters=n_lists, random_state=seed, n_init=3, batch_size=4096).fit(Z)
+        labels = km.labels_
+        order = np.argsort(labels, kind="stable")
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(labels, minlength=n_lists))])
+        return cls(ids, X, genre_ids, projection, km.cluster_centers_.astype(np.float32),
+                   order, offsets, model.version)
+
+    # ---------- consulta ----------
+    def query_vector(self, text_query, genre_weights: Optional[Dict[int, float]] = None):
+        """Vetor de consulta no mesmo espaço do índice: centróide de texto + pesos de gênero."""
+        n_text = self.X.shape[1] - len(self.genre_ids)
+        if text_query is None:
+            text_query = sp.csr_matrix((1, n_text))
+        g = np.array([(genre_weights or {}).get(gid, 0.0) for gid in self.genre_ids])
+        G = sp.csr_matrix(g.reshape(1, -1))
+        G = _l2_rows(G) * GENRE_WEIGHT if g.any() else G
+        return _l2_rows(sp.hstack([sp.csr_matrix(text_query), G]).tocsr())
+
+    def _probe(self, q, k: int, n_probe: int) -> np.ndarray:
+        """Linhas das listas mais próximas de q; abre mais listas até ter pelo menos k."""
+        z = np.asarray(q @ self.projection.T).ravel()
+        by_dist = np.argsort(-(self.centroids @ z))
+        sizes = np.diff(self.offsets)[by_dist]
+        # sempre n_probe listas; mais, se ainda não somam k candidatos
+        n = max(n_probe, int(np.searchsorted(np.cumsum(sizes), k)) + 1)
+        lists = by_dist[:n]
+        return np.concatenate([self.order[self.offsets[c]:self.offsets[c + 1]] for c in lists])
+
+    def query(self, q, k: int = 100, exclude_ids: Optional[set] = None,
+              n_probe: int = N_PROBE) -> Tuple[np.ndarray, np.ndarray]:
+        """(ids, scores) dos k vizinhos aproximados de q, em ordem decrescente de cosseno."""
+        if not len(self):
+            return np.array([], dtype=np.int64), np.array([])
+        rows = self._probe(q, k + len(exclude_ids or ()), n_probe)
+        scores = np.asarray((self.X[rows] @ q.T).todense()).ravel()
+        if exclude_ids:
+            # favoritos antigos podem ter id None
+            exclude = np.fromiter((int(i) for i in exclude_ids if i is not None), dtype=np.int64)
+            keep = ~np.isin(self.ids[rows], exclude)
+            rows, scores = rows[keep], scores[keep]
+        top = top_k_indices(scores, k)
+        return self.ids[rows[top]], scores[top]
+
+    # ---------- persistência ----------
+    def save(self, name: Optional[str] = None) -> str:
+        """Publica o índice em data/shared/<name>/ (mmap entre processos). Retorna a versão."""
+        return shared_matrix.publish(
+            name or SHARED_NAME, self.X,
+            columns={
+                "ids": self.ids, "genre_ids": np.array(self.genre_ids, dtype=np.int64),
+                "projection": self.projection, "centroids": self.centroids,
+                "order": self.order, "offsets": self.offsets,
+            },
+            meta={"model_version": self.model_version},
+        )
+
+    @classmethod
+    def from_shared(cls, loaded) -> Optional["ANNIndex"]:
+        """Monta o índice a partir de shared_matrix.load(), sem copiar os arrays mapeados."""
+        if loaded is None:
+            return None
+        X, cols, meta, version = loaded
+        index = cls(cols["ids"], X, cols["genre_ids"].tolist(), cols["projection"], cols["centroids"],
+                    cols["order"], cols["offsets"], str(meta.get("model_version")))
+        index.shared_version = version
+        return index
+
+    @classmethod
+    def load(cls, name: Optional[str] = None) -> Optional["ANNIndex"]:
+        try:
+            return cls.from_shared(shared_matrix.load(name or SHARED_NAME))
+        except Exception as e:
+            logger.warning("ann_index: índice ilegível, ignorando: %s", e)
+            return None
+
+# ---------- índice do catálogo ----------
+_INDEX: Optional[ANNIndex] = None
+_SHARED = shared_matrix.SharedMatrix(SHARED_NAME)
+_LOCK = threading.Lock()
+_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ann-index")
+_BUILD: Optional[Future] = None
+# processos que só leem o índice (ex: workers do batch_recs) não disparam reconstrução
+AUTO_BUILD = True
+
+def build_index(model: Optional[TextModel] = None) -> Optional[ANNIndex]:
+    """Constrói o índice sobre o catálogo com o modelo de texto atual, salva e passa a servi-lo."""
+    global _INDEX
+    model = model or get_text_model()
+    movies = catalog.all_movies()
+    if model is None or not movies:
+        return None
+    index = ANNIndex.build(movies, model)
+    index.save()
+    _SHARED.invalidate()
+    with _LOCK:
+        _INDEX = index
+    return index
+
+def schedule_build() -> Future:
+    global _BUILD
+    with _LOCK:
+        if _BUILD is None or _BUILD.done():
+            _BUILD = _EXECUTOR.submit(build_index)
+        return _BUILD
+
+def get_index() -> Optional[ANNIndex]:
+    """
+    Índice compatível com o modelo de texto atual, ou None. Se não houver
+    índice (ou o modelo foi reajustado), agenda a reconstrução em background.
+    Quando outro processo publica uma versão nova, ela é mapeada aqui na
+    próxima checagem do SharedMatrix.
+    """
+    global _INDEX
+    model = get_text_model()
+    if model is None:
+        return None
+    try:
+        loaded = _SHARED.get()
+    except Exception as e:
+        logger.warning("ann_index: índice ilegível, ignorando: %s", e)
+        loaded = None
+    with _LOCK:
+        if loaded is not None and getattr(_INDEX, "shared_version", None) != loaded[3]:
+            _INDEX = ANNIndex.from_shared(loaded)
+        index = _INDEX
+    if index is None or index.model_version != model.version:
+        if AUTO_BUILD:
+            schedule_build()
+        return None
+    return index
+
+def nearest_movies(text_query, genre_weights: Dict[int, float], k: int = 200,
+                   exclude_ids: Optional[set] = None) -> List[Dict]:
+    """Filmes do catálogo mais próximos do perfil (lista vazia se ainda não há índice)."""
+    index = get_index()
+    if index is None:
+        return []
+    ids, _ = index.query(index.query_vector(text_query, genre_weights), k=k, exclude_ids=exclude_ids)
+    movies = (catalog.get_movie(int(mid)) for mid in ids)
+    return [m for m in movies if m]
+
+if __name__ == "__main__":
+    t0 = time.perf_counter()
+    idx = build_index()
+    if idx is None:
+        print("Sem modelo de texto ou catálogo vazio — rode `python text_model.py --refresh-catalog`.")
+    else:
+        print(f"Índice com {len(idx)} filmes construído em {time.perf_counter() - t0:.1f}s.")
@@ -0,0 +1,320 @@
+# api.py
+"""
+API HTTP (JSON) do MovieBot, sem Streamlit.
+
+Serviço assíncrono (Starlette + uvicorn) sobre o tmdb_client, os favoritos e
+os recomendadores. Usa as mesmas camadas de cache do app: cache do
+tmdb_client (aquecido pelo snapshot do warm_cache), shared_store e
+rec_cache; as chamadas bloqueantes rodam no threadpool do Starlette.
+
+Rotas:
+    GET    /health
+    GET    /genres
+    GET    /search?q=matrix&page=1&min_votes=30
+    GET    /discover?genre=acao&year=1999&sort_by=popularity.desc&page=1
+    GET    /movies/{id}
+    GET    /movies/{id}/recommendations?min_votes=30
+    GET    /favorites?page=1&per_page=20
+    POST   /favorites            {"movie_id": 603} ou {"movie": {...}}
+    DELETE /favorites/{id}
+    GET    /recommendations?page=1&per_page=20   (a partir dos favoritos)
+
+Em todas as listas, `fields=id,title,...` escolhe os campos de cada filme.
+Busca/discover paginam pela página do TMDB (`page`); favoritos e
+recomendações, localmente (`page` + `per_page`). As respostas GET levam ETag
+e devolvem 304 se o cliente manda o mesmo If-None-Match.
+
+Starlette e uvicorn são opcionais (`pip install starlette uvicorn`; o
+Streamlit recente já os instala). Uso:
+    python api.py --port 8000 --workers 4
+"""
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import time
+from typing import Dict, List, Optional
+
+import rec_cache
+import shared_store
+import tracing
+import warm_cache
+from favorites import add_favorite, list_favorites, remove_favorite
+from recommender import APP_CACHE_PARAMS, APP_TFIDF_PARAMS, recommend_with_tfidf
+from tmdb_client import (
+    FALLBACK_KEY, breaker_states, deadline, fallbacks_seen, filter_results_by_min_votes, get_movie_details, get_recommendations,
+    normalize_text, watch_fallbacks,
+)
+from user_profile import get_profile
+from logger_conf import get_logger, set_session_id
+
+try:
+    from starlette.applications import Starlette
+    from starlette.concurrency import run_in_threadpool
+    from starlette.middleware import Middleware
+    from starlette.middleware.base import BaseHTTPMiddleware
+    from starlette.responses import JSONResponse, Response
+    from starlette.routing import Route
+except ImportError:  # Starlette é opcional
+    Starlette = None
+
+logger = get_logger(__name__)
+
+API_HOST = os.getenv("MOVIEBOT_API_HOST", "127.0.0.1")
+API_PORT = int(os.getenv("MOVIEBOT_API_PORT", "8000"))
+DEFAULT_MIN_VOTES = 30
+PER_PAGE = 20
+MAX_PER_PAGE = 100
+# respostas que vêm do TMDB podem ficar um pouco no cache do cliente/CDN;
+# favoritos e recomendações mudam com os favoritos (só revalidação por ETag)
+TMDB_MAX_AGE = 60
+
+class ApiError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+# ---------- helpers ----------
+def _int_arg(request, name: str, default: Optional[int] = None, minimum: int = 0) -> Optional[int]:
+    raw = request.query_params.get(name)
+    if raw in (None, ""):
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        raise ApiError(400, f"'{name}' deve ser inteiro")
+    if value < minimum:
+        raise ApiError(400, f"'{name}' deve ser >= {minimum}")
+    return value
+
+def _select(movies: List[Dict], fields: Optional[str]) -> List[Dict]:
+    """Só os campos pedidos em `fields` (lista separada por vírgula) de cada filme."""
+    if not fields:
+        return movies
+    wanted = [f.strip() for f in fields.split(",") if f.strip()]
+    return [{k: m.get(k) for k in wanted if k in m} for m in movies]
+
+def _paginate(items: List[Dict], page: int, per_page: int) -> Dict:
+    total = len(items)
+    start = (page - 1) * per_page
+    return {
+        "page": page,
+        "per_page": per_page,
+        "total_pages": max(1, -(-total // per_page)),
+        "total_results": total,
+        "results": items[start:start + per_page],
+    }
+
+def _local_page(request, items: List[Dict]) -> Dict:
+    page = _int_arg(request, "page", 1, minimum=1)
+    per_page = min(_int_arg(request, "per_page", PER_PAGE, minimum=1), MAX_PER_PAGE)
+    body = _paginate(items, page, per_page)
+    body["results"] = _select(body["results"], request.query_params.get("fields"))
+    return body
+
+def _json(request, body, max_age: int = 0, status: int = 200):
+    """
+    JSON com ETag (hash do corpo); 304 se o cliente já tem essa versão.
+    Resposta montada com fallback do TMDB (dados vencidos/do catálogo local)
+    sai sem ETag e com no-store: nem o cliente nem um CDN devem guardá-la.
+    """
+    data = json.dumps(body, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+    if fallbacks_seen():
+        return Response(data, status_code=status, media_type="application/json", headers={"Cache-Control": "no-store"})
+    etag = '"%s"' % hashlib.sha1(data).hexdigest()[:20]
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={max_age}" if max_age else "no-cache"}
+    if request.method == "GET" and etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    return Response(data, status_code=status, media_type="application/json", headers=headers)
+
+def _genre_id(value: str) -> int:
+    if value.isdigit():
+        return int(value)
+    genres = shared_store.genres()
+    normalized = normalize_text(value)
+    if normalized in genres:
+        return genres[normalized]
+    found = [gid for name, gid in genres.items() if normalized in name]
+    if len(found) != 1:
+        raise ApiError(400, "gênero ambíguo" if found else "gênero não encontrado")
+    return found[0]
+
+def _tmdb_page(request, resp: Dict) -> Dict:
+    """Página do TMDB filtrada por min_votes (se o filtro remove tudo, ficam os originais)."""
+    min_votes = _int_arg(request, "min_votes", DEFAULT_MIN_VOTES)
+    results = resp.get("results", [])
+    results = filter_results_by_min_votes(results, min_votes=min_votes) or results
+    return {
+        "page": resp.get("page", 1),
+        "total_pages": resp.get("total_pages", 1),
+        "total_results": resp.get("total_results", len(results)),
+        "results": _select(results, request.query_params.get("fields")),
+    }
+
+# ---------- rotas ----------
+async def health(request):
+    return JSONResponse({"ok": True, "store": shared_store.STORE.stats(), "tmdb": breaker_states()})
+
+async def genres(request):
+    data = await run_in_threadpool(shared_store.genres)
+    if not data:
+        raise ApiError(502, "não foi possível carregar gêneros")
+    return _json(request, {"genres": [{"name": n, "id": i} for n, i in sorted(data.items())]}, TMDB_MAX_AGE)
+
+async def search(request):
+    term = (request.query_params.get("q") or "").strip()
+    if not term:
+        raise ApiError(400, "parâmetro 'q' obrigatório")
+    page = _int_arg(request, "page", 1, minimum=1)
+    resp = await run_in_threadpool(shared_store.search_page, term, page)
+    if not resp:
+        raise ApiError(502, "resposta vazia ou erro na API do TMDB")
+    return _json(request, _tmdb_page(request, resp), TMDB_MAX_AGE)
+
+async def discover(request):
+    genre = (request.query_params.get("genre") or "").strip()
+    if not genre:
+        raise ApiError(400, "parâmetro 'genre' obrigatório")
+    gid = await run_in_threadpool(_genre_id, genre)
+    params = {"genre_id": gid, "min_vote_count": _int_arg(request, "min_votes", DEFAULT_MIN_VOTES)}
+    year = _int_arg(request, "year")
+    if year:
+        params["year"] = year
+    if request.query_params.get("sort_by"):
+        params["sort_by"] = request.query_params["sort_by"]
+    resp = await run_in_threadpool(shared_store.discover_page, params, _int_arg(request, "page", 1, minimum=1))
+    if not resp:
+        raise ApiError(502, "resposta vazia ou erro no discover")
+    return _json(request, _tmdb_page(request, resp), TMDB_MAX_AGE)
+
+async def movie_details(request):
+    details = await run_in_threadpool(get_movie_details, request.path_params["movie_id"])
+    if not details:
+        raise ApiError(404, "filme não encontrado")
+    return _json(request, _select([details], request.query_params.get("fields"))[0], TMDB_MAX_AGE)
+
+async def movie_recommendations(request):
+    rec = await run_in_threadpool(get_recommendations, request.path_params["movie_id"])
+    if not rec:
+        raise ApiError(502, "nenhuma recomendação retornada ou erro")
+    return _json(request, _tmdb_page(request, rec), TMDB_MAX_AGE)
+
+async def favorites_list(request):
+    favs = await run_in_threadpool(list_favorites)
+    return _json(request, _local_page(request, favs))
+
+def _add(payload: Dict) -> Dict:
+    movie = payload.get("movie")
+    if not movie and payload.get("movie_id"):
+        details = get_movie_details(int(payload["movie_id"]))
+        if not details:
+            raise ApiError(404, "filme não encontrado")
+        details = {k: v for k, v in details.items() if k != FALLBACK_KEY}
+        # detalhes trazem "genres" [{id, name}]; favoritos guardam genre_ids
+        movie = {**details, "genre_ids": [g.get("id") for g in details.get("genres", [])]}
+    if not isinstance(movie, dict) or "id" not in movie:
+        raise ApiError(400, "envie 'movie' (com id) ou 'movie_id'")
+    return {"added": add_favorite(movie), "id": movie["id"]}
+
+async def favorites_add(request):
+    try:
+        payload = await request.json()
+    except ValueError:
+        raise ApiError(400, "corpo JSON inválido")
+    if not isinstance(payload, dict):
+        raise ApiError(400, "corpo deve ser um objeto JSON")
+    result = await run_in_threadpool(_add, payload)
+    return JSONResponse(result, status_code=201 if result["added"] else 200)
+
+async def favorites_remove(request):
+    movie_id = request.path_params["movie_id"]
+    if not await run_in_threadpool(remove_favorite, movie_id):
+        raise ApiError(404, "não é favorito")
+    return JSONResponse({"removed": True, "id": movie_id})
+
+def _recs_from_favorites() -> List[Dict]:
+    """Mesma lista (e mesma chave de cache) da aba de recomendações do app."""
+    favs = list_favorites()
+    if not favs:
+        return []
+    fav_ids = [f.get("id") for f in favs]
+    # uma chave só, calculada antes (o estado do grafo pode mudar durante o cálculo)
+    cache_key = rec_cache.make_key(fav_ids, APP_CACHE_PARAMS)
+    return shared_store.STORE.get_or_load(shared_store.recs_key(cache_key), lambda: rec_cache.get_or_compute(
+        fav_ids,
+        APP_CACHE_PARAMS,
+        lambda: recommend_with_tfidf(
+            favs,
+            profile=get_profile(),
+            discover_fn=shared_store.discover_page,
+            **APP_TFIDF_PARAMS,
+        ),
+        key=cache_key,
+    )) or []
+
+async def recommendations(request):
+    recs = await run_in_threadpool(_recs_from_favorites)
+    return _json(request, _local_page(request, recs))
+
+async def _log_requests(request, call_next):
+    # X-Session-Id do cliente (se mandar) vai em todos os registros desta requisição
+    set_session_id(request.headers.get("x-session-id"))
+    t0 = time.perf_counter()
+    # prazo das chamadas ao TMDB desta requisição e contador de fallbacks (passam
+    # para o threadpool com o contexto)
+    with tracing.span(f"api {request.method} {request.url.path}", root=True) as sp, deadline(), watch_fallbacks():
+        response = await call_next(request)
+        sp.set("status", response.status_code)
+    logger.debug("api %s %s", request.method, request.url.path, extra={
+        "endpoint": request.url.path, "status": response.status_code,
+        "latency_ms": round((time.perf_counter() - t0) * 1000, 1),
+    })
+    return response
+
+async def _api_error(request, exc):
+    return JSONResponse({"error": str(exc)}, status_code=exc.status)
+
+@contextlib.asynccontextmanager
+async def _lifespan(app):
+    # gêneros e consultas comuns vêm do snapshot em disco; cada worker aquece o seu
+    warm_cache.boot(schedule=True)
+    yield
+
+def create_app():
+    if Starlette is None:
+        raise RuntimeError("api.py precisa de starlette e uvicorn: pip install starlette uvicorn")
+    return Starlette(
+        routes=[
+            Route("/health", health),
+            Route("/genres", genres),
+            Route("/search", search),
+            Route("/discover", discover),
+            Route("/movies/{movie_id:int}", movie_details),
+            Route("/movies/{movie_id:int}/recommendations", movie_recommendations),
+            Route("/favorites", favorites_list, methods=["GET"]),
+            Route("/favorites", favorites_add, methods=["POST"]),
+            Route("/favorites/{movie_id:int}", favorites_remove, methods=["DELETE"]),
+            Route("/recommendations", recommendations),
+        ],
+        middleware=[Middleware(BaseHTTPMiddleware, dispatch=_log_requests)],
+        exception_handlers={ApiError: _api_error},
+        lifespan=_lifespan,
+    )
+
+app = create_app() if Starlette is not None else None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="API HTTP do MovieBot.")
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    parser.add_argument("--workers", type=int, default=1, help="processos do uvicorn (cada um com seu cache em memória)")
+    args = parser.parse_args()
+    try:
+        import uvicorn
+    except ImportError:
+        print("api.py precisa de uvicorn: pip install starlette uvicorn")
+        raise SystemExit(1)
+    # com mais de um worker o uvicorn precisa importar o app pelo nome
+    uvicorn.run("api:app" if args.workers > 1 else create_app(), host=args.host, port=args.port,
+                workers=args.workers, log_level="warning")
@@ -1,27 +1,28 @@
-import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-
 import os
 import streamlit as st
+from streamlit.errors import StreamlitAPIException
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 import json
 from favorites import list_favorites, add_favorite, remove_favorite
 
-from collections import Counter
-import math
-
-from tmdb_client import (
-    search_movie,
-    discover_movies,
-    get_genres,
-    get_recommendations,
-)
+from tmdb_client import deadline, watch_fallbacks
 from favorites import (
     add_favorite,
     list_favorites,
     remove_favorite,
     top_genres_from_favorites,
 )
+from enrichment import schedule_enrichment
+from recommender import APP_CACHE_PARAMS, APP_TFIDF_PARAMS, recommend_with_tfidf
+from user_profile import get_profile
+import poster_cache
+import prefetch
+import rec_cache
+import shared_store
+import warm_cache
+import profiling
+import tracing
+from logger_conf import set_session_id
 
 # ---------------------- CONFIG BÁSICA ---------------------- #
 
@@ -31,13 +32,24 @@ st.set_page_config(
     layout="wide",
 )
 
-@st.cache_data(ttl=300)  # guarda 5 minutos
-def cached_search_movie(query: str, page: int = 1):
-    return search_movie(query, page=page)
+# registros de log desta execução levam o id da sessão do navegador
+_run_ctx = get_script_run_ctx()
+set_session_id(_run_ctx.session_id if _run_ctx else None)
 
-@st.cache_data(ttl=600)
-def cached_discover_movies(params: dict, page: int = 1):
-    return discover_movies(params, page=page)
+def profile_mode():
+    """
+    ?profile=cprofile|sample na URL liga o profiling desta sessão (senão vale
+    MOVIEBOT_PROFILE) — só com MOVIEBOT_PROFILE_ALLOW_QUERY=1.
+    """
+    if not profiling.ALLOW_QUERY:
+        return None
+    return st.query_params.get("profile")
+
+# perfil do rerun inteiro (fechado no fim do script); reruns de fragmento
+# são perfilados pelas próprias abas
+_run_profile = profiling.start("rerun", profile_mode(), replace=True)
+# raiz do trace deste rerun (cards e abas viram filhos; reruns de fragmento abrem o próprio trace)
+_run_span = tracing.span("streamlit.rerun", root=True, session_id=_run_ctx.session_id if _run_ctx else None).start()
 
 # cache para vídeos (5 minutos)
 @st.cache_data(ttl=300)
@@ -46,6 +58,17 @@ def cached_get_movie_videos(movie_id: int):
     from tmdb_client import get_movie_videos
     return get_movie_videos(movie_id) or {}
 
+# fragmentos: um clique dentro de um card/aba reexecuta só aquele trecho, e não
+# o script inteiro. Em versões antigas do Streamlit cai para a função normal.
+fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None) or (lambda fn: fn)
+
+def rerun_fragment() -> None:
+    """Reexecuta só o fragmento atual (ou o app inteiro, se não houver fragmentos ou for um run completo)."""
+    try:
+        st.rerun(scope="fragment")
+    except (TypeError, StreamlitAPIException):
+        st.rerun()
+
 # CSS simples para dar uma cara de app
 st.markdown(
     """
@@ -81,214 +104,22 @@ st.markdown(
 
 # ---------------------- HELPERS ---------------------- #
 
-def precision_at_k(recommended, relevant_set, k):
-    return len(set(recommended[:k]) & set(relevant_set)) / k
-
-
-def build_genre_id_to_name_map():
-    # st.session_state["genres_map"] tem nome_normalizado -> id
-    gm = st.session_state.get("genres_map", {}) or {}
-    id_to_name = {}
-    for name_norm, gid in gm.items():
-        # recuperar nome original (improvável recuperar original capitalization)
-        id_to_name[int(gid)] = name_norm.replace("-", " ").title()
-    return id_to_name
-
-# cache invert map
-if "genre_id_to_name" not in st.session_state:
-    st.session_state["genre_id_to_name"] = build_genre_id_to_name_map()
+# gêneros, páginas da API e listas de recomendação ficam no shared_store (um por
+# processo, com orçamento de memória); a sessão guarda só as chaves
 
 def genres_names_from_ids(ids_list):
-    id_map = st.session_state.get("genre_id_to_name", {})
+    id_map = shared_store.genre_id_to_name()
     return [id_map.get(int(g), str(g)) for g in (ids_list or [])]
 
 
-def recommend_from_favorites(favs, top_n_genres=3, candidates_per_genre=40):
-    if not favs:
-        return []
-
-    # 1) gênero pesos
-    counter = Counter()
-    for f in favs:
-        for gid in f.get("genre_ids", []):
-            counter[int(gid)] += 1
-    if not counter:
-        return []
-
-    total = sum(counter.values())
-    genre_weights = {gid: count / total for gid, count in counter.items()}
-    # top genres
-    top_genres = [gid for gid, _ in counter.most_common(top_n_genres)]
-
-    # 2) coletar candidatos via discover (cachear)
-    candidates = {}
-    for gid in top_genres:
-        params = {"genre_id": gid, "min_vote_count": 30, "sort_by": "popularity.desc"}
-        resp = cached_discover_movies(params, page=1)  # usa cache
-        results = resp.get("results", []) if resp else []
-        # pega N por gênero
-        for m in results[:candidates_per_genre]:
-            mid = m.get("id")
-            if not mid:
-                continue
-            candidates[mid] = m  # dedupe simples; manter último (popularity.desc)
-
-    # 3) normalizações para scoring
-    # calculamos max/min para vote_average e popularity para normalizar
-    votes = [m.get("vote_average", 0) for m in candidates.values()]
-    pops = [m.get("popularity", 0) for m in candidates.values()]
-    max_vote = max(votes) if votes else 1
-    min_vote = min(votes) if votes else 0
-    max_pop = max(pops) if pops else 1
-    min_pop = min(pops) if pops else 0
-
-    def norm(x, mn, mx):
-        if mx == mn:
-            return 0.0
-        return (x - mn) / (mx - mn)
-
-    scored = []
-    for m in candidates.values():
-        ga_score = 0.0
-        for gid in m.get("genre_ids", []):
-            if gid in genre_weights:
-                ga_score += genre_weights[gid]
-        vote_norm = norm(m.get("vote_average", 0), min_vote, max_vote)
-        pop_norm = norm(m.get("popularity", 0), min_pop, max_pop)
-        # peso: 0.55 vote_norm, 0.35 pop_norm, 0.10 genre affinity
-        score = 0.55 * vote_norm + 0.35 * pop_norm + 0.10 * ga_score
-        scored.append((score, m))
-
-    scored.sort(key=lambda x: x[0], reverse=True)
-    return [m for s, m in scored]
-
-def recommend_with_tfidf(favs, top_n_genres=3, candidates_per_genre=50, max_candidates=500,
-                         weight_tfidf=0.6, weight_genre=0.2, weight_score=0.2):
-    """
-    Retorna lista de filmes recomendados ordenados.
-    Parâmetros:
-      - favs: lista de filmes (favoritos) - cada item tem 'overview', 'genre_ids', 'vote_average', 'popularity'
-      - top_n_genres: quantos gêneros considerar (por frequência)
-      - candidates_per_genre: quantos candidatos coletar por gênero via discover
-      - max_candidates: limite global (deduplicado)
-      - weight_tfidf / weight_genre / weight_score: pesos combinados que somam 1.0
-    """
-    if not favs:
-        return []
-
-    # 1) calcular os gêneros preferidos (pesos)
-    from collections import Counter
-    counter = Counter()
-    for f in favs:
-        for gid in f.get("genre_ids", []) or []:
-            counter[int(gid)] += 1
-    if not counter:
-        return []
-
-    total = sum(counter.values())
-    genre_weights = {gid: count / total for gid, count in counter.items()}
-    top_genres = [gid for gid, _ in counter.most_common(top_n_genres)]
-
-    # 2) coletar candidatos (usando cached_discover_movies se disponível)
-    candidates = {}
-    for gid in top_genres:
-        params = {"genre_id": gid, "min_vote_count": 10, "sort_by": "popularity.desc"}
-        try:
-            # use cached wrapper if você já tiver: cached_discover_movies
-            resp = cached_discover_movies(params, page=1)
-        except Exception:
-            # fallback para discover_movies direto
-            resp = discover_movies(params)
-        results = resp.get("results", []) if resp else []
-        for m in results[:candidates_per_genre]:
-            mid = m.get("id")
-            if not mid:
-                continue
-            # evita favoritar/recomendar o mesmo da lista de favoritos
-            if any(f.get("id") == mid for f in favs):
-                continue
-            candidates[mid] = m
-            if len(candidates) >= max_candidates:
-                break
-        if len(candidates) >= max_candidates:
-            break
-
-    if not candidates:
-        return []
-
-    candidates_list = list(candidates.values())
-
-    # 3) construir corpora para TF-IDF: sobreviews de favorites (concat) vs candidates
-    # Criamos um "perfil textual" do usuário concatenando overviews dos favoritos
-    fav_texts = [ (f.get("overview") or "") for f in favs ]
-    user_profile_text = " ".join(fav_texts) if fav_texts else ""
-
-    candidate_texts = [ (c.get("overview") or "") for c in candidates_list ]
-
-    # Se todos os overviews estiverem vazios, desiste do TF-IDF (apenas usa outros sinais)
-    use_tfidf = any(len(t.strip()) > 0 for t in candidate_texts + [user_profile_text])
-
-    tfidf_scores = np.zeros(len(candidates_list))
-    if use_tfidf:
-        corpus = [user_profile_text] + candidate_texts
-        vect = TfidfVectorizer(stop_words="english", max_features=5000)
-        X = vect.fit_transform(corpus)  # shape (1 + N, F)
-        user_vec = X[0]
-        cand_vecs = X[1:]
-        # similaridade cosseno entre user e cada candidato
-        sims = cosine_similarity(user_vec, cand_vecs).flatten()  # shape (N,)
-        # normalizar entre 0 e 1
-        if sims.max() - sims.min() > 0:
-            tfidf_scores = (sims - sims.min()) / (sims.max() - sims.min())
-        else:
-            tfidf_scores = sims
-
-    # 4) calcular score de gênero para cada candidato (soma dos pesos dos gêneros que se cruzam)
-    genre_scores = np.zeros(len(candidates_list))
-    for i, c in enumerate(candidates_list):
-        ga = 0.0
-        for gid in (c.get("genre_ids") or []):
-            ga += genre_weights.get(int(gid), 0.0)
-        genre_scores[i] = ga
-    # normalizar
-    if genre_scores.max() - genre_scores.min() > 0:
-        genre_scores = (genre_scores - genre_scores.min()) / (genre_scores.max() - genre_scores.min())
-
-    # 5) score por nota/popularidade
-    vote_arr = np.array([float(c.get("vote_average") or 0.0) for c in candidates_list])
-    pop_arr = np.array([float(c.get("popularity") or 0.0) for c in candidates_list])
-    # normaliza cada um
-    def norm(a):
-        if a.max() - a.min() > 0:
-            return (a - a.min()) / (a.max() - a.min())
-        return np.zeros_like(a)
-    vote_n = norm(vote_arr)
-    pop_n = norm(pop_arr)
-    score_num = 0.6 * vote_n + 0.4 * pop_n
-    if score_num.max() - score_num.min() > 0:
-        score_num = (score_num - score_num.min()) / (score_num.max() - score_num.min())
-    else:
-        score_num = score_num
-
-    # 6) combinar tudo com pesos configuráveis
-    final_scores = (weight_tfidf * tfidf_scores) + (weight_genre * genre_scores) + (weight_score * score_num)
-
-    # 7) anexar score e ordenar
-    scored = []
-    for i, m in enumerate(candidates_list):
-        scored.append((final_scores[i], m))
-    scored.sort(key=lambda x: x[0], reverse=True)
-
-    # retorna só os filmes (ordem)
-    return [m for s, m in scored]
-
-def get_poster_url(movie: dict, size: str = "w200") -> str | None:
-    poster_path = movie.get("poster_path")
-    if not poster_path:
-        return None
-    return f"https://image.tmdb.org/t/p/{size}{poster_path}"
+def get_poster_url(movie: dict, width: int = 120) -> str | None:
+    # pôster reduzido (proxy, se configurado, ou arquivo local pelo st.image) ou o TMDB direto
+    return poster_cache.poster_source(movie.get("poster_path"), width)
 
 
+@fragment
+@deadline()
+@tracing.traced("ui.render_movie_card")
 def render_movie_card(
     movie: dict,
     key_prefix: str,
@@ -297,21 +128,27 @@ def render_movie_card(
 ) -> None:
     """
     Renderiza um "card" de filme com poster, infos, botões e modal de detalhes com trailer.
+    Cada card é um fragmento: favoritar/remover/detalhes só reexecutam o próprio card.
     """
     from favorites import is_favorite  # import local para evitar confusão
 
+    movie_id = movie.get("id")
+    tracing.current().set("movie_id", movie_id)
+    # card da lista de favoritos que acabou de ser removido: some sem refazer a aba
+    if show_remove and st.session_state.get(f"{key_prefix}-removed-{movie_id}") and not is_favorite(movie_id):
+        return
+
     title = movie.get("title") or movie.get("name") or "Título não disponível"
     year = (movie.get("release_date") or movie.get("first_air_date") or "")[:4] or "----"
     vote = movie.get("vote_average", "-")
     vote_count = movie.get("vote_count", 0)
-    movie_id = movie.get("id")
 
     cols = st.columns([1, 4, 1])
 
     # Poster
     poster_path = movie.get("poster_path")
     if poster_path:
-        poster_url = f"https://image.tmdb.org/t/p/w200{poster_path}"
+        poster_url = get_poster_url(movie, 120)
         cols[0].image(poster_url, width=120)
     else:
         cols[0].write("🎞️\n(sem poster)")
@@ -324,10 +161,10 @@ def render_movie_card(
         cols[1].write(overview[:260] + ("..." if len(overview) > 260 else ""))
 
     # badges de genero (se você implementou genres id->name)
-    if st.session_state.get("genre_id_to_name"):
+    if shared_store.genre_id_to_name():
         gids = movie.get("genre_ids", []) or []
         if gids:
-            names = [st.session_state["genre_id_to_name"].get(int(g), str(g)) for g in gids]
+            names = genres_names_from_ids(gids)
             badges_html = " ".join(
                 [f"<span style='display:inline-block;padding:3px 8px;border-radius:12px;background:#efefef;margin-right:6px;font-size:0.8rem'>{n}</span>" for n in names]
             )
@@ -346,9 +183,10 @@ def render_movie_card(
                 try:
                     ok = add_favorite(movie)
                     if ok:
-                        st.success("Filme adicionado aos favoritos.")
+                        st.toast("Filme adicionado aos favoritos.")
                     else:
-                        st.info("Esse filme já está nos favoritos.")
+                        st.toast("Esse filme já está nos favoritos.")
+                    rerun_fragment()  # redesenha só este card ("Já favorito")
                 except Exception as exc:
                     st.error(f"Erro ao favoritar: {exc}")
 
@@ -358,7 +196,9 @@ def render_movie_card(
             try:
                 ok = remove_favorite(movie_id)
                 if ok:
-                    st.success("Filme removido dos favoritos.")
+                    st.toast("Filme removido dos favoritos.")
+                    st.session_state[f"{key_prefix}-removed-{movie_id}"] = True
+                    rerun_fragment()
                 else:
                     st.error("Não foi possível remover.")
             except Exception as exc:
@@ -390,7 +230,7 @@ def render_movie_card(
                 # poster maior
                 poster_big = None
                 if poster_path:
-                    poster_big = f"https://image.tmdb.org/t/p/w342{poster_path}"
+                    poster_big = get_poster_url(movie, 300)
                     st.image(poster_big, width=300)
                 st.header(title)
                 st.markdown(f"**Lançamento:** {movie.get('release_date','-')}")
@@ -408,7 +248,7 @@ def render_movie_card(
             with st.expander(f"Detalhes — {title}", expanded=True):
                 poster_big = None
                 if poster_path:
-                    poster_big = f"https://image.tmdb.org/t/p/w342{poster_path}"
+                    poster_big = get_poster_url(movie, 300)
                     st.image(poster_big, width=300)
                 st.header(title)
                 st.markdown(f"**Lançamento:** {movie.get('release_date','-')}")
@@ -419,6 +259,49 @@ def render_movie_card(
                 else:
                     st.info("Trailer não disponível.")
 
+# ---------------------- LISTAS EM JANELAS ---------------------- #
+
+# cards desenhados de início em cada lista; "Carregar mais" soma outro bloco
+LIST_CHUNK = 10
+
+def render_movie_list(
+    movies: list,
+    list_key: str,
+    show_favorite: bool = True,
+    show_remove: bool = False,
+    chunk: int = LIST_CHUNK,
+) -> None:
+    """
+    Desenha só os primeiros `chunk` cards da lista e um botão "Carregar mais"
+    para o próximo bloco. O tamanho da janela fica em session_state por lista
+    e volta ao início quando a lista é outra (outra busca, outra página: nenhum
+    filme em comum com o começo da anterior); remover/favoritar um item da
+    lista não mexe na janela. As chaves dos cards dependem só de `list_key` e
+    do id do filme.
+    """
+    signature = {m.get("id") for m in movies[:chunk]}
+    state_key = f"{list_key}-window"
+    window = st.session_state.get(state_key)
+    if not window or not (window["signature"] & signature):
+        window = {"signature": signature, "shown": chunk}
+        st.session_state[state_key] = window
+    else:
+        window["signature"] = signature
+
+    shown = movies[: window["shown"]]
+    # vídeos dos cards na tela já ficam prontos para o "Detalhes"
+    prefetch.prefetch_videos(m.get("id") for m in shown)
+    # pôsteres da tela e do próximo bloco, em lote
+    poster_cache.prefetch_posters(m.get("poster_path") for m in movies[: window["shown"] + chunk])
+    for movie in shown:
+        render_movie_card(movie, key_prefix=list_key, show_favorite=show_favorite, show_remove=show_remove)
+
+    remaining = len(movies) - len(shown)
+    if remaining > 0:
+        if st.button(f"⬇️ Carregar mais ({remaining} restantes)", key=f"{list_key}-more"):
+            window["shown"] += chunk
+            rerun_fragment()  # só a aba (fragmento) onde a lista está
+
 # ---------------------- ESTADO INICIAL ---------------------- #
 
 if "search" not in st.session_state:
@@ -426,11 +309,19 @@ if "search" not in st.session_state:
         "term": "",
         "min_votes": 30,
         "page": 1,
-        "results": [],
+        "results_key": None,
     }
 
-if "genres_map" not in st.session_state:
-    st.session_state["genres_map"] = get_genres() or {}
+# cache do TMDB já nasce com gêneros/discover/buscas do snapshot (uma vez por processo)
+warm_cache.boot(schedule=True)
+
+# proxy de pôsteres, só com MOVIEBOT_POSTER_PROXY_URL (um por host; os workers compartilham data/posters/)
+poster_cache.start_proxy()
+
+# completa overview/popularity de favoritos antigos (roda em background)
+if "enrichment_scheduled" not in st.session_state:
+    schedule_enrichment()
+    st.session_state["enrichment_scheduled"] = True
 
 
 # ---------------------- TÍTULO GERAL ---------------------- #
@@ -454,7 +345,11 @@ tabs = st.tabs(
 #  ABA 1 - BUSCAR POR TERMO
 # ============================================================ #
 
-with tabs[0]:
+@fragment
+@profiling.profiled("search_tab", mode=profile_mode)
+@deadline()
+@tracing.traced("ui.search_tab")
+def search_tab():
     st.markdown('<div class="section-header">🔍 Buscar por termo</div>', unsafe_allow_html=True)
     col_search, col_opts = st.columns([3, 2])
 
@@ -464,7 +359,7 @@ with tabs[0]:
             "term": "",
             "min_votes": 30,
             "page": 1,
-            "results": [],
+            "results_key": None,
             "total_pages": 1,
             "total_results": 0,
         }
@@ -487,7 +382,7 @@ with tabs[0]:
 
     # ação de buscar: sempre reseta para página 1
     if st.button("Buscar 🔎"):
-        resp = cached_search_movie(term, page=1)
+        resp = shared_store.search_page(term, 1)
         results = resp.get("results", []) if resp else []
         total_pages = resp.get("total_pages", 1) if resp else 1
         total_results = resp.get("total_results", len(results)) if resp else len(results)
@@ -495,7 +390,7 @@ with tabs[0]:
             "term": term,
             "min_votes": int(min_votes),
             "page": 1,
-            "results": results,
+            "results_key": shared_store.search_key(term, 1),
             "total_pages": int(total_pages) if total_pages else 1,
             "total_results": int(total_results) if total_results else len(results),
         }
@@ -505,35 +400,29 @@ with tabs[0]:
     prev_disabled = st.session_state["search"]["page"] <= 1
     next_disabled = st.session_state["search"]["page"] >= st.session_state["search"].get("total_pages", 1)
 
-    if col_prev_next[0].button("⬅️ Anterior", disabled=prev_disabled):
-        new_page = max(1, st.session_state["search"]["page"] - 1)
-        resp = search_movie(st.session_state["search"]["term"], page=new_page)
+    def _go_to_page(new_page: int) -> None:
+        # página vem do cache aquecido pela pré-busca (ou espera a busca que já está a caminho)
+        term = st.session_state["search"]["term"]
+        resp = shared_store.search_page(term, new_page, loader=lambda: prefetch.get_search_page(term, new_page))
         results = resp.get("results", []) if resp else []
         total_pages = resp.get("total_pages", 1) if resp else 1
         total_results = resp.get("total_results", len(results)) if resp else len(results)
         st.session_state["search"].update({
             "page": new_page,
-            "results": results,
+            "results_key": shared_store.search_key(term, new_page),
             "total_pages": int(total_pages) if total_pages else 1,
             "total_results": int(total_results) if total_results else len(results),
         })
 
+    if col_prev_next[0].button("⬅️ Anterior", disabled=prev_disabled):
+        _go_to_page(max(1, st.session_state["search"]["page"] - 1))
+
     if col_prev_next[1].button("Próxima ➡️", disabled=next_disabled):
-        new_page = min(st.session_state["search"].get("total_pages", 1), st.session_state["search"]["page"] + 1)
-        resp = search_movie(st.session_state["search"]["term"], page=new_page)
-        results = resp.get("results", []) if resp else []
-        total_pages = resp.get("total_pages", 1) if resp else 1
-        total_results = resp.get("total_results", len(results)) if resp else len(results)
-        st.session_state["search"].update({
-            "page": new_page,
-            "results": results,
-            "total_pages": int(total_pages) if total_pages else 1,
-            "total_results": int(total_results) if total_results else len(results),
-        })
+        _go_to_page(min(st.session_state["search"].get("total_pages", 1), st.session_state["search"]["page"] + 1))
 
     # Renderização dos resultados a partir do session_state (sempre)
     data = st.session_state["search"]
-    results = data.get("results", [])
+    results = shared_store.results_of(data.get("results_key"))
 
     if not results:
         st.info("Nenhuma busca feita ainda ou nenhum resultado para esse termo.")
@@ -542,26 +431,20 @@ with tabs[0]:
             f"Resultados para **\"{data['term']}\"** — página {data['page']} / {data.get('total_pages',1)} — mínimo de {data['min_votes']} avaliações — {data.get('total_results', len(results))} resultados"
         )
 
-        count = 0
-        for movie in results:
-            if (movie.get("vote_count") or 0) < data["min_votes"]:
-                continue
-            render_movie_card(movie, key_prefix=f"search-p{data['page']}", show_favorite=True, show_remove=False)
-            count += 1
+        visible = [m for m in results if (m.get("vote_count") or 0) >= data["min_votes"]]
+        render_movie_list(visible, list_key=f"search-p{data['page']}", show_favorite=True, show_remove=False)
 
-        if count == 0:
+        if not visible:
             st.warning(
                 "Nenhum resultado atingiu o mínimo de avaliações nesta página. Experimente próxima página ou diminua o filtro."
             )
-# prefetch próxima página (somente se houver próxima)
-current_page = st.session_state["search"]["page"]
-total_pages = st.session_state["search"].get("total_pages", 1)
-if current_page < total_pages:
-    try:
-        # dispara cache para page+1 (não bloqueante, mas cachea o resultado)
-        _ = cached_search_movie(st.session_state["search"]["term"], page=current_page + 1)
-    except Exception:
-        pass
+
+    # pré-busca das páginas vizinhas em background (não bloqueia a renderização)
+    prefetch.prefetch_search_pages(
+        st.session_state["search"]["term"],
+        st.session_state["search"]["page"],
+        st.session_state["search"].get("total_pages", 1),
+    )
 
 
 
@@ -569,10 +452,14 @@ if current_page < total_pages:
 #  ABA 2 - BUSCAR POR GÊNERO
 # ============================================================ #
 
-with tabs[1]:
+@fragment
+@profiling.profiled("genre_tab", mode=profile_mode)
+@deadline()
+@tracing.traced("ui.genre_tab")
+def genre_tab():
     st.markdown('<div class="section-header">🎭 Buscar por gênero</div>', unsafe_allow_html=True)
 
-    genres_map = st.session_state["genres_map"]
+    genres_map = shared_store.genres()
     if not genres_map:
         st.error("Não foi possível carregar a lista de gêneros. Verifique suas credenciais TMDB.")
     else:
@@ -605,28 +492,32 @@ with tabs[1]:
                 if year.strip().isdigit():
                     params["year"] = int(year.strip())
 
-                resp = cached_discover_movies(params)
-                results = resp.get("results", []) if resp else []
-
-                if not results:
+                # guarda na sessão (só a chave) para a lista sobreviver ao "Carregar mais" e aos cliques nos cards
+                st.session_state["genre_search"] = {
+                    "genre": chosen_genre_key,
+                    "min_votes": int(min_votes_genre),
+                    "results_key": shared_store.discover_key(params),
+                }
+                if not shared_store.results_of(st.session_state["genre_search"]["results_key"]):
                     st.info("Nenhum resultado encontrado para esses filtros.")
-                else:
-                    st.caption(
-                        f"Gênero **{chosen_genre_key}** — mínimo de {min_votes_genre} avaliações."
-                    )
-                    for movie in results[:40]:
-                        render_movie_card(
-                            movie,
-                            key_prefix="genre",
-                            show_favorite=True,
-                            show_remove=False,
-                        )
+
+        genre_search = st.session_state.get("genre_search")
+        genre_results = shared_store.results_of(genre_search["results_key"]) if genre_search else []
+        if genre_results:
+            st.caption(
+                f"Gênero **{genre_search['genre']}** — mínimo de {genre_search['min_votes']} avaliações."
+            )
+            render_movie_list(genre_results, list_key="genre", show_favorite=True, show_remove=False)
 
 # ============================================================
 #  ABA 3 - FAVORITOS
 # ============================================================ #
 
-with tabs[2]:
+@fragment
+@profiling.profiled("favorites_tab", mode=profile_mode)
+@deadline()
+@tracing.traced("ui.favorites_tab")
+def favorites_tab():
     st.markdown('<div class="section-header">⭐ Seus favoritos</div>', unsafe_allow_html=True)
 
     favs = list_favorites()
@@ -647,6 +538,8 @@ with tabs[2]:
             for m in payload:
                 if add_favorite(m):
                     added += 1
+            # favoritos importados costumam vir sem overview/popularity
+            schedule_enrichment()
             st.success(f"Importados / adicionados {added} novos favoritos.")
         except Exception as e:
             st.error(f"Erro ao importar: {e}")
@@ -665,56 +558,87 @@ with tabs[2]:
         st.info("Você ainda não adicionou filmes aos favoritos.")
     else:
         st.caption(f"Total de favoritos: {len(favs)}")
-        for movie in favs:
-            render_movie_card(
-                movie,
-                key_prefix="fav",
-                show_favorite=False,
-                show_remove=True,
-            )
+        render_movie_list(favs, list_key="fav", show_favorite=False, show_remove=True)
 
 # ============================================================
 #  ABA 4 - RECOMENDAÇÕES BASEADAS NOS FAVORITOS
 # ============================================================ #
 
-with tabs[3]:
+@fragment
+@profiling.profiled("recommendations_tab", mode=profile_mode)
+@deadline()
+@tracing.traced("ui.recommendations_tab")
+def recommendations_tab():
     st.markdown('<div class="section-header">🎯 Recomendações baseadas nos seus favoritos</div>', unsafe_allow_html=True)
 
-    # init session_state para guardar recomendações
+    # a sessão guarda só a chave da lista (que fica no shared_store / rec_cache);
+    # uma lista degradada (fallback do TMDB) não vai para os caches e fica na sessão
     if "rec_from_favs" not in st.session_state:
-        st.session_state["rec_from_favs"] = []
+        st.session_state["rec_from_favs"] = None
+        st.session_state["rec_degraded"] = None
 
     favs = list_favorites()
     if not favs:
         st.info("Você ainda não tem favoritos suficientes para gerar recomendações.")
     else:
-        st.write("Vamos analisar seus favoritos e gerar recomendações usando IA (TF-IDF + gênero + score).")
+        st.write("Vamos analisar seus favoritos e gerar recomendações usando IA (TF-IDF + gênero + score + grafo de recomendações do TMDB).")
 
+        fav_ids = [f.get("id") for f in favs]
         if st.button("Gerar recomendações 🎯"):
             with st.spinner("Calculando recomendações com IA..."):
-                recs = recommend_with_tfidf(
-                    favs,
-                    top_n_genres=3,
-                    candidates_per_genre=50,
-                    max_candidates=400,
-                    weight_tfidf=0.6,
-                    weight_genre=0.2,
-                    weight_score=0.2,
-                )
-                st.session_state["rec_from_favs"] = recs
-
-        # Renderização SEMPRE usando session_state
-        aggregate = st.session_state.get("rec_from_favs", [])
+                # cache compartilhado entre sessões/processos, chaveado por favoritos + parâmetros;
+                # a chave sai antes do cálculo (as arestas do grafo chegam em background durante ele)
+                cache_key = rec_cache.make_key(fav_ids, APP_CACHE_PARAMS)
+                with watch_fallbacks() as seen:
+                    recs = rec_cache.get_or_compute(
+                        fav_ids,
+                        APP_CACHE_PARAMS,
+                        lambda: recommend_with_tfidf(
+                            favs,
+                            profile=get_profile(),
+                            discover_fn=shared_store.discover_page,
+                            **APP_TFIDF_PARAMS,
+                        ),
+                        key=cache_key,
+                    )
+                if seen["count"]:
+                    st.session_state["rec_from_favs"] = None
+                    st.session_state["rec_degraded"] = recs
+                else:
+                    key = shared_store.recs_key(cache_key)
+                    shared_store.STORE.put(key, recs, ttl=rec_cache.TTL_SECONDS)
+                    st.session_state["rec_from_favs"] = key
+                    st.session_state["rec_degraded"] = None
+
+        # sem recomendações na sessão: usa as pré-calculadas (batch_recs.py), se houver
+        if not st.session_state["rec_from_favs"] and not st.session_state.get("rec_degraded"):
+            key = shared_store.recs_key(rec_cache.make_key(fav_ids, APP_CACHE_PARAMS))
+            if shared_store.results_of(key):
+                st.session_state["rec_from_favs"] = key
+
+        # Renderização SEMPRE a partir da chave guardada na sessão (ou da lista degradada)
+        aggregate = st.session_state.get("rec_degraded") or shared_store.results_of(st.session_state.get("rec_from_favs"))
 
         if not aggregate:
             st.info("Nenhuma recomendação ainda. Clique em 'Gerar recomendações 🎯'.")
         else:
-            st.caption(f"Mostrando {min(40, len(aggregate))} recomendações baseadas nos seus favoritos:")
-            for movie in aggregate[:40]:
-                render_movie_card(
-                    movie,
-                    key_prefix=f"tfdif-recfav-{movie.get('id')}",
-                    show_favorite=True,
-                    show_remove=False,
-                )
-
+            st.caption(f"{len(aggregate)} recomendações baseadas nos seus favoritos:")
+            render_movie_list(aggregate, list_key="tfdif-recfav", show_favorite=True, show_remove=False)
+
+# cada aba é um fragmento: cliques dentro dela só reexecutam a própria aba
+try:
+    with tabs[0]:
+        search_tab()
+    with tabs[1]:
+        genre_tab()
+    with tabs[2]:
+        favorites_tab()
+    with tabs[3]:
+        recommendations_tab()
+except BaseException as exc:
+    _run_span.end(exc)
+    raise
+else:
+    _run_span.end()
+finally:
+    profiling.stop(_run_profile)
@@ -0,0 +1,137 @@
+# batch_recs.py
+"""
+Pré-cálculo em lote das recomendações, fora do Streamlit.
+
+Recebe vários arquivos de favoritos (um por usuário/namespace), calcula o
+top-N de cada um em paralelo num pool de processos e grava no rec_cache,
+com a mesma chave que a aba de recomendações usa; o app lê de lá antes de
+calcular qualquer coisa.
+
+O processo principal prepara o que é compartilhado antes de abrir o pool:
+o modelo de texto e o índice ANN (salvos em disco), as arestas do grafo de
+todos os favoritos e as páginas do discover dos gêneros envolvidos (o "pool
+de candidatos"), que vão para cada worker uma vez só, no initializer.
+
+Uso:
+    python batch_recs.py users/*.json --workers 4
+"""
+import argparse
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+
+import ann_index
+import graph_rec
+import rec_cache
+import text_model
+from favorites import FAV_FILE, read_favorites_file
+from recommender import APP_CACHE_PARAMS, APP_TFIDF_PARAMS, recommend_with_tfidf
+from tmdb_client import discover_movies, is_fallback
+from user_profile import UserProfile
+from logger_conf import get_logger
+
+logger = get_logger(__name__)
+
+# mesmos filtros que o recommend_with_tfidf usa no discover
+_CANDIDATE_FILTERS = {"min_vote_count": 10, "sort_by": "popularity.desc"}
+
+# ---------- worker ----------
+_POOL: Dict[int, dict] = {}
+
+def _init_worker(candidate_pool: Dict[int, dict]) -> None:
+    global _POOL
+    _POOL = candidate_pool
+    # workers só leem modelo/índice/grafo (quem reajusta e busca arestas é o
+    # processo principal ou o app); senão vários processos gravariam GRAPH_FILE
+    text_model.AUTO_REFIT = False
+    ann_index.AUTO_BUILD = False
+    graph_rec.AUTO_FETCH = False
+    # carrega do disco uma vez por processo
+    text_model.get_text_model()
+    ann_index.get_index()
+
+def _pooled_discover(params: dict, page: int = 1) -> dict:
+    """discover servido pelo pool compartilhado; qualquer outra consulta vai para a API."""
+    gid = params.get("genre_id")
+    if page == 1 and gid in _POOL and all(params.get(k) == v for k, v in _CANDIDATE_FILTERS.items()):
+        return _POOL[gid]
+    return discover_movies(params, page=page)
+
+def _compute(path: str) -> Tuple[str, int, int, float]:
+    """(arquivo, nº de favoritos, nº de recomendações, segundos)."""
+    t0 = time.perf_counter()
+    favs = read_favorites_file(path)
+    if not favs:
+        return path, 0, 0, time.perf_counter() - t0
+    fav_ids = [f.get("id") for f in favs]
+    # chave antes do cálculo, como no app (mesmo estado do grafo que o cálculo viu);
+    # lista com candidatos de fallback do TMDB não é gravada (get_or_compute)
+    key = rec_cache.make_key(fav_ids, APP_CACHE_PARAMS)
+    recs = rec_cache.get_or_compute(
+        fav_ids,
+        APP_CACHE_PARAMS,
+        lambda: recommend_with_tfidf(favs, discover_fn=_pooled_discover, **APP_TFIDF_PARAMS),
+        key=key,
+    )
+    return path, len(favs), len(recs), time.perf_counter() - t0
+
+# ---------- preparação compartilhada ----------
+def _prepare(paths: List[str]) -> Dict[int, dict]:
+    # modelo e índice são garantidos aqui, de forma síncrona (sem jobs em background)
+    text_model.AUTO_REFIT = False
+    ann_index.AUTO_BUILD = False
+    model = text_model.get_text_model()
+    if model is None or model.is_stale():
+        model = text_model.fit_text_model() or model
+    if model is not None and ann_index.get_index() is None:
+        ann_index.build_index(model)
+
+    genres, fav_ids = set(), set()
+    for path in paths:
+        favs = read_favorites_file(path)
+        fav_ids.update(f.get("id") for f in favs if f.get("id"))
+        genres.update(UserProfile.from_favorites(favs).top_genres(APP_TFIDF_PARAMS["top_n_genres"]))
+
+    # workers só leem o grafo; quem busca arestas é o processo principal
+    if APP_TFIDF_PARAMS.get("weight_graph"):
+        graph_rec.ensure_edges(fav_ids)
+
+    # páginas de fallback (TMDB fora) ficam de fora: o worker que precisar
+    # delas consulta de novo, e aí o próprio get_or_compute vê o fallback
+    pool = {}
+    for gid in genres:
+        page = discover_movies({"genre_id": gid, **_CANDIDATE_FILTERS}, page=1) or {}
+        if page and not is_fallback(page):
+            pool[gid] = page
+    return pool
+
+def run(paths: List[str], workers: Optional[int] = None) -> List[Tuple[str, int, int, float]]:
+    candidate_pool = _prepare(paths)
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(candidate_pool,)) as pool:
+        futures = [pool.submit(_compute, p) for p in paths]
+        for fut in as_completed(futures):
+            try:
+                results.append(fut.result())
+            except Exception as e:
+                logger.exception("batch_recs: falha em um perfil")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pré-calcula recomendações para vários arquivos de favoritos.")
+    parser.add_argument("paths", nargs="*", default=[FAV_FILE], help="arquivos (ou globs) de favoritos")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="processos em paralelo")
+    args = parser.parse_args()
+
+    files = sorted({p for pattern in args.paths for p in (glob.glob(pattern) or [pattern]) if os.path.isfile(p)})
+    if not files:
+        print("Nenhum arquivo de favoritos encontrado.")
+        raise SystemExit(1)
+
+    t0 = time.perf_counter()
+    done = run(files, args.workers)
+    for path, n_favs, n_recs, secs in sorted(done):
+        print(f"{path}: {n_favs} favoritos -> {n_recs} recomendações em {secs * 1000:.0f} ms")
+    print(f"{len(done)}/{len(files)} perfis em {time.perf_counter() - t0:.1f}s ({args.workers} processos).")
@@ -0,0 +1,170 @@
+# catalog.py
+"""
+Catálogo local de filmes (id -> dados do filme), persistido em data/catalog.json.
+É o corpus do modelo de texto e a base dos índices de candidatos; é
+preenchido por `refresh_catalog`, que varre páginas do /discover por gênero.
+As consultas locais (`search_local`, `discover_local`, `similar_local`) são o
+fallback do tmdb_client quando o TMDB está fora.
+"""
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+from tmdb_client import discover_movies, get_genres, is_fallback, normalize_text
+from logger_conf import get_logger
+
+logger = get_logger(__name__)
+
+CATALOG_FILE = os.path.join(os.path.dirname(__file__), "data", "catalog.json")
+
+# campos guardados por filme (os mesmos usados pelos cards e recomendadores)
+CATALOG_FIELDS = (
+    "id", "title", "release_date", "vote_average", "vote_count",
+    "genre_ids", "poster_path", "backdrop_path", "overview", "popularity",
+)
+
+DEFAULT_SORTS = ("popularity.desc", "vote_average.desc")
+# tamanho de página das consultas locais (o mesmo do TMDB)
+PAGE_SIZE = 20
+
+_CATALOG: Optional[Dict[int, Dict]] = None
+_LOCK = threading.RLock()
+
+def _slim(movie: Dict) -> Dict:
+    slim = {k: movie.get(k) for k in CATALOG_FIELDS}
+    slim["title"] = movie.get("title") or movie.get("name")
+    slim["genre_ids"] = movie.get("genre_ids") or [g.get("id") for g in movie.get("genres", []) if g.get("id")]
+    return slim
+
+def load_catalog() -> Dict[int, Dict]:
+    global _CATALOG
+    with _LOCK:
+        if _CATALOG is None:
+            try:
+                with open(CATALOG_FILE, "r", encoding="utf-8") as f:
+                    _CATALOG = {int(m["id"]): m for m in (json.load(f) or []) if m.get("id")}
+            except FileNotFoundError:
+                _CATALOG = {}
+            except Exception as e:
+                logger.warning("catalog: arquivo ilegível, recomeçando: %s", e)
+                _CATALOG = {}
+        return _CATALOG
+
+def save_catalog() -> None:
+    with _LOCK:
+        catalog = load_catalog()
+        os.makedirs(os.path.dirname(CATALOG_FILE), exist_ok=True)
+        tmp = CATALOG_FILE + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(list(catalog.values()), f, ensure_ascii=False)
+            os.replace(tmp, CATALOG_FILE)
+        except Exception as e:
+            logger.error("catalog: erro ao gravar: %s", e)
+
+def add_movies(movies: Iterable[Dict]) -> int:
+    """Adiciona/atualiza filmes no catálogo em memória. Retorna quantos eram novos."""
+    added = 0
+    with _LOCK:
+        catalog = load_catalog()
+        for m in movies or []:
+            mid = m.get("id")
+            if not mid:
+                continue
+            if mid not in catalog:
+                added += 1
+            catalog[int(mid)] = _slim(m)
+    return added
+
+def all_movies() -> List[Dict]:
+    with _LOCK:
+        return list(load_catalog().values())
+
+def get_movie(movie_id: int) -> Optional[Dict]:
+    with _LOCK:
+        return load_catalog().get(int(movie_id))
+
+# ---------- consultas locais (fallback do tmdb_client com o TMDB fora) ----------
+# respondem no formato do TMDB ({"page", "results", "total_pages", "total_results"})
+def _page(movies: List[Dict], page: int = 1) -> Dict:
+    page = max(int(page or 1), 1)
+    start = (page - 1) * PAGE_SIZE
+    return {
+        "page": page,
+        "results": movies[start:start + PAGE_SIZE],
+        "total_pages": max((len(movies) + PAGE_SIZE - 1) // PAGE_SIZE, 1),
+        "total_results": len(movies),
+    }
+
+def _popular(movies: Iterable[Dict]) -> List[Dict]:
+    return sorted(movies, key=lambda m: m.get("popularity") or 0, reverse=True)
+
+def search_local(query: str, page: int = 1) -> Dict:
+    """Filmes do catálogo com todas as palavras de `query` no título."""
+    words = normalize_text(query).split()
+    if not words:
+        return {}
+    hits = [m for m in all_movies() if all(w in normalize_text(m.get("title") or "") for w in words)]
+    return _page(_popular(hits), page)
+
+def discover_local(api_params: Dict, page: int = 1) -> Dict:
+    """O /discover sobre o catálogo; `api_params` são os parâmetros já no formato do TMDB."""
+    genre = api_params.get("with_genres")
+    year = str(api_params.get("primary_release_year") or "")
+    min_vote = float(api_params.get("vote_average.gte") or 0)
+    min_count = int(api_params.get("vote_count.gte") or 0)
+    hits = [
+        m for m in all_movies()
+        if (not genre or int(genre) in (m.get("genre_ids") or []))
+        and (not year or (m.get("release_date") or "").startswith(year))
+        and (m.get("vote_average") or 0) >= min_vote
+        and (m.get("vote_count") or 0) >= min_count
+    ]
+    field, _, order = (api_params.get("sort_by") or "popularity.desc").partition(".")
+    hits.sort(key=lambda m: m.get(field) or 0, reverse=order != "asc")
+    return _page(hits, page)
+
+def similar_local(movie_id: int, page: int = 1) -> Dict:
+    """Recomendações locais: filmes do catálogo com mais gêneros em comum com `movie_id`."""
+    movie = get_movie(movie_id)
+    if not movie:
+        return {}
+    genres = set(movie.get("genre_ids") or [])
+    scored = [(len(genres & set(m.get("genre_ids") or [])), m) for m in _popular(all_movies()) if m.get("id") != movie.get("id")]
+    return _page([m for n, m in sorted(scored, key=lambda x: -x[0]) if n], page)
+
+def refresh_catalog(genre_ids: Optional[List[int]] = None, pages_per_genre: int = 5,
+                    sorts: Iterable[str] = DEFAULT_SORTS, max_workers: int = 8) -> int:
+    """
+    Busca `pages_per_genre` páginas do /discover para cada gênero e ordenação,
+    em paralelo, e grava o catálogo. Retorna quantos filmes novos entraram.
+    """
+    if genre_ids is None:
+        genre_ids = list((get_genres() or {}).values())
+    jobs = [
+        ({"genre_id": gid, "sort_by": sort_by}, page)
+        for gid in genre_ids
+        for sort_by in sorts
+        for page in range(1, pages_per_genre + 1)
+    ]
+    if not jobs:
+        return 0
+
+    added = 0
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="catalog") as pool:
+        for resp in pool.map(lambda job: discover_movies(job[0], page=job[1]), jobs):
+            if not is_fallback(resp):  # fallback do discover sai do próprio catálogo
+                added += add_movies((resp or {}).get("results", []))
+    save_catalog()
+    return added
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Atualiza o catálogo local de filmes a partir do TMDB.")
+    parser.add_argument("--pages", type=int, default=5, help="páginas do discover por gênero e ordenação")
+    args = parser.parse_args()
+    new = refresh_catalog(pages_per_genre=args.pages)
+    print(f"Catálogo: {new} filmes novos, {len(load_catalog())} no total.")
@@ -0,0 +1,60 @@
+# conftest.py
+"""
+Fixtures comuns dos testes (pytest).
+
+Todo teste roda com os arquivos em disco (favoritos, perfil, caches, modelo
+de texto, matrizes compartilhadas, perfis, traces) num diretório temporário,
+sem rede (requests.get falha na hora, então o tmdb_client cai no fallback) e
+com os caches em memória do processo zerados.
+"""
+import pytest
+import requests
+
+import ann_index
+import catalog
+import enrichment
+import favorites
+import graph_rec
+import profiling
+import rec_cache
+import shared_matrix
+import shared_store
+import text_model
+import tmdb_client
+import tracing
+import user_profile
+import warm_cache
+
+def _offline(*args, **kwargs):
+    raise requests.exceptions.ConnectionError("rede desligada nos testes")
+
+@pytest.fixture(autouse=True)
+def isolated(tmp_path, monkeypatch):
+    paths = {
+        (favorites, "FAV_FILE"): "favorites.json",
+        (user_profile, "PROFILE_FILE"): "profile.json",
+        (user_profile, "PROFILE_TEXT_FILE"): "profile_text.npy",
+        (rec_cache, "CACHE_DIR"): "rec_cache",
+        (graph_rec, "GRAPH_FILE"): "rec_graph.json",
+        (enrichment, "CACHE_FILE"): "enrichment_cache.json",
+        (catalog, "CATALOG_FILE"): "catalog.json",
+        (text_model, "MODEL_FILE"): "text_model.pkl",
+        (shared_matrix, "SHARED_DIR"): "shared",
+        (warm_cache, "SNAPSHOT_FILE"): "tmdb_snapshot.json",
+        (profiling, "PROFILE_DIR"): "profiles",
+        (tracing, "TRACE_FILE"): "traces.jsonl",
+    }
+    for (module, name), filename in paths.items():
+        monkeypatch.setattr(module, name, str(tmp_path / filename))
+    monkeypatch.setattr(text_model, "AUTO_REFIT", False)
+    monkeypatch.setattr(ann_index, "AUTO_BUILD", False)
+    monkeypatch.setattr(tmdb_client.requests, "get", _offline)
+
+    monkeypatch.setattr(tmdb_client, "_SIMPLE_CACHE", {})
+    monkeypatch.setattr(tmdb_client, "_CACHE_EXPIRES", {})
+    monkeypatch.setattr(tmdb_client, "_REQUESTS", type(tmdb_client._REQUESTS)())
+    monkeypatch.setattr(tmdb_client, "_BREAKERS", {})
+    monkeypatch.setattr(catalog, "_CATALOG", None)
+    monkeypatch.setattr(shared_store, "STORE", shared_store.SharedStore())
+    monkeypatch.setattr(rec_cache, "_MEMORY", type(rec_cache._MEMORY)())
+    return tmp_path
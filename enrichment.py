@@ -0,0 +1,159 @@
+# enrichment.py
+"""
+Enriquecimento dos favoritos em background.
+
+`add_favorite` só guarda o que veio no card; favoritos antigos (ou vindos de
+import) não têm `overview` nem `popularity`, e o TF-IDF do recomendador fica
+sem texto. Aqui buscamos os campos que faltam via /movie/{id} em lotes
+concorrentes, guardamos num cache em disco e gravamos de volta nos favoritos.
+"""
+import json
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+from tmdb_client import get_movie_details, is_fallback
+from favorites import add_listener, list_favorites, update_favorites
+from logger_conf import get_logger
+
+logger = get_logger(__name__)
+
+CACHE_FILE = os.path.join(os.path.dirname(__file__), "data", "enrichment_cache.json")
+
+# campos que o recomendador precisa e que buscamos quando faltam
+ENRICH_FIELDS = ("overview", "popularity")
+
+DEFAULT_BATCH_SIZE = 20
+DEFAULT_MAX_WORKERS = 8
+
+_CACHE: Optional[Dict[int, Dict]] = None
+_CACHE_LOCK = threading.Lock()
+
+# um único worker: jobs de enriquecimento rodam um de cada vez, fora da UI
+_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="enrichment")
+_PENDING: Optional[Future] = None
+_PENDING_LOCK = threading.Lock()
+
+# ---------- cache em disco ----------
+def _load_cache() -> Dict[int, Dict]:
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            try:
+                with open(CACHE_FILE, "r", encoding="utf-8") as f:
+                    _CACHE = {int(k): v for k, v in (json.load(f) or {}).items()}
+            except FileNotFoundError:
+                _CACHE = {}
+            except Exception as e:
+                logger.warning("enrichment: cache ilegível, recomeçando: %s", e)
+                _CACHE = {}
+        return _CACHE
+
+def _save_cache() -> None:
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            return
+        os.makedirs(os.path.dirname(CACHE_FILE), exist_ok=True)
+        tmp = CACHE_FILE + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({str(k): v for k, v in _CACHE.items()}, f, ensure_ascii=False)
+            os.replace(tmp, CACHE_FILE)
+        except Exception as e:
+            logger.error("enrichment: erro ao gravar cache: %s", e)
+
+# ---------- busca ----------
+def missing_fields(movie: Dict) -> List[str]:
+    """Campos de ENRICH_FIELDS ausentes no filme (None conta como ausente)."""
+    return [f for f in ENRICH_FIELDS if movie.get(f) is None]
+
+def _fetch_one(movie_id: int) -> Optional[Dict]:
+    details = get_movie_details(movie_id)
+    if not details or is_fallback(details):
+        return None  # o do catálogo local não tem sinopse/elenco: tenta de novo depois
+    fields = {f: details.get(f) for f in ENRICH_FIELDS}
+    # sinopse em pt-BR pode não existir; cai para inglês
+    if not fields.get("overview"):
+        fields["overview"] = (get_movie_details(movie_id, language="en-US") or {}).get("overview") or ""
+    if fields.get("popularity") is None:
+        fields["popularity"] = 0.0
+    return fields
+
+def fetch_missing(movie_ids: Iterable[int], batch_size: int = DEFAULT_BATCH_SIZE,
+                  max_workers: int = DEFAULT_MAX_WORKERS) -> Dict[int, Dict]:
+    """
+    Retorna {id: campos} para os ids pedidos. Usa o cache primeiro e busca o
+    resto em lotes de `batch_size` requisições concorrentes; o cache é gravado
+    ao fim de cada lote, então um job interrompido não perde o que já buscou.
+    """
+    cache = _load_cache()
+    ids = list(dict.fromkeys(int(i) for i in movie_ids if i))
+    todo = [i for i in ids if i not in cache]
+
+    if todo:
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="enrichment-fetch") as pool:
+            for start in range(0, len(todo), batch_size):
+                batch = todo[start:start + batch_size]
+                for mid, fields in zip(batch, pool.map(_fetch_one, batch)):
+                    if fields is not None:
+                        with _CACHE_LOCK:
+                            cache[mid] = fields
+                _save_cache()
+
+    return {i: cache[i] for i in ids if i in cache}
+
+def enrich_favorites(batch_size: int = DEFAULT_BATCH_SIZE, max_workers: int = DEFAULT_MAX_WORKERS) -> int:
+    """Completa os favoritos que não têm overview/popularity. Retorna quantos mudaram."""
+    favs = list_favorites()
+    need = [f.get("id") for f in favs if f.get("id") and missing_fields(f)]
+    if not need:
+        return 0
+    found = fetch_missing(need, batch_size=batch_size, max_workers=max_workers)
+    updates = {}
+    for f in favs:
+        fields = found.get(f.get("id"))
+        if fields:
+            updates[f["id"]] = {k: v for k, v in fields.items() if f.get(k) is None}
+    return update_favorites(updates)
+
+def apply_cached(movies: List[Dict]) -> List[Dict]:
+    """Cópias dos filmes com os campos faltantes preenchidos a partir do cache (sem rede)."""
+    cache = _load_cache()
+    out = []
+    for m in movies or []:
+        fields = cache.get(m.get("id")) if m.get("id") else None
+        if fields and missing_fields(m):
+            m = dict(m)
+            for k, v in fields.items():
+                if m.get(k) is None:
+                    m[k] = v
+        out.append(m)
+    return out
+
+# ---------- execução em background ----------
+def _run_job() -> int:
+    try:
+        return enrich_favorites()
+    except Exception as e:
+        logger.exception("enrichment: job falhou")
+        return 0
+
+def schedule_enrichment() -> Future:
+    """
+    Agenda um job de enriquecimento e retorna imediatamente.
+    Pedidos feitos enquanto um job ainda está na fila reaproveitam esse job
+    (ex: importar 200 favoritos dispara um único job).
+    """
+    global _PENDING
+    with _PENDING_LOCK:
+        if _PENDING is not None and not _PENDING.running() and not _PENDING.done():
+            return _PENDING
+        _PENDING = _EXECUTOR.submit(_run_job)
+        return _PENDING
+
+def on_favorites_changed(event: str, movie: Dict) -> None:
+    if event == "add" and missing_fields(movie):
+        schedule_enrichment()
+
+add_listener(on_favorites_changed)
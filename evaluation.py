@@ -0,0 +1,240 @@
+# evaluation.py
+"""
+Avaliação offline dos recomendadores.
+
+Esconde parte dos favoritos (holdout aleatório, repetido com várias
+sementes), roda cada engine com o restante e mede se os escondidos voltam
+nas recomendações: precision@k, recall@k e NDCG@k, junto com latência e
+tamanho do pool de candidatos. As respostas do /discover e do
+/recommendations (arestas do grafo) podem ser gravadas uma vez (--record) e
+reproduzidas depois (--replay), para comparar engines e parâmetros sempre
+sobre os mesmos dados. Nesses modos o grafo começa vazio e só em memória, e
+modelo de texto e índice ANN são os salvos em disco, sem reajuste em
+background; o replay não faz nenhuma chamada de rede.
+
+Uso:
+    python evaluation.py --k 10 --splits 5 --replay data/eval_recording.json \\
+        --grid candidates_per_genre=20,50,100 --grid max_candidates=200,400
+"""
+import argparse
+import inspect
+import json
+import math
+import os
+import random
+import statistics
+import threading
+import time
+from itertools import product
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+import ann_index
+import graph_rec
+import text_model
+from favorites import FAV_FILE, read_favorites_file
+from recommender import recommend_from_favorites, recommend_with_tfidf
+from tmdb_client import discover_movies, get_recommendations, is_fallback
+
+# ---------- métricas ----------
+def precision_at_k(recommended, relevant_set, k):
+    return len(set(recommended[:k]) & set(relevant_set)) / k
+
+def recall_at_k(recommended, relevant_set, k):
+    relevant_set = set(relevant_set)
+    if not relevant_set:
+        return 0.0
+    return len(set(recommended[:k]) & relevant_set) / len(relevant_set)
+
+def ndcg_at_k(recommended, relevant_set, k):
+    """NDCG com relevância binária."""
+    relevant_set = set(relevant_set)
+    dcg = sum(1.0 / math.log2(i + 2) for i, mid in enumerate(recommended[:k]) if mid in relevant_set)
+    ideal = sum(1.0 / math.log2(i + 2) for i in range(min(k, len(relevant_set))))
+    return dcg / ideal if ideal else 0.0
+
+# ---------- engines ----------
+# nome -> função(favs, discover_fn=..., **params) -> lista ordenada de filmes
+ENGINES: Dict[str, Callable[..., List[Dict]]] = {
+    "favorites": recommend_from_favorites,
+    "tfidf": recommend_with_tfidf,
+    "tfidf+graph": lambda favs, **kw: recommend_with_tfidf(
+        favs, **{"weight_tfidf": 0.45, "weight_genre": 0.15, "weight_score": 0.2, "weight_graph": 0.2, **kw}
+    ),
+}
+
+def register_engine(name: str, fn: Callable[..., List[Dict]]) -> None:
+    ENGINES[name] = fn
+
+def _accepted_params(fn: Callable, params: Dict) -> Dict:
+    """Só os parâmetros do grid que a engine aceita (ex: 'favorites' não tem max_candidates)."""
+    sig = inspect.signature(fn)
+    if any(p.kind is inspect.Parameter.VAR_KEYWORD for p in sig.parameters.values()):
+        return dict(params)
+    return {k: v for k, v in params.items() if k in sig.parameters}
+
+# ---------- dados gravados ----------
+class RecordedDiscover:
+    """
+    Substituto de discover_movies (e, em `recommendations`, de
+    get_recommendations) que grava/reproduz respostas em JSON.
+    mode="record": chama a API e guarda; mode="replay": só lê (falta = {}).
+    """
+
+    def __init__(self, path: str, mode: str = "replay"):
+        self.path = path
+        self.mode = mode
+        self._lock = threading.Lock()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self.responses: Dict[str, dict] = json.load(f)
+        except FileNotFoundError:
+            self.responses = {}
+
+    @staticmethod
+    def _key(params: dict, page: int) -> str:
+        return json.dumps({"params": params, "page": page}, sort_keys=True, default=str)
+
+    def _get(self, key: str, fetch: Callable[[], dict]) -> dict:
+        with self._lock:
+            if key in self.responses or self.mode != "record":
+                return self.responses.get(key, {})
+        resp = fetch()
+        if not is_fallback(resp):  # a gravação é das respostas do TMDB, não de fallback
+            with self._lock:
+                self.responses[key] = resp
+        return resp
+
+    def __call__(self, params: dict, page: int = 1) -> dict:
+        return self._get(self._key(params, page), lambda: discover_movies(params, page=page))
+
+    def recommendations(self, movie_id: int) -> dict:
+        key = json.dumps({"recommendations": int(movie_id)})
+        return self._get(key, lambda: get_recommendations(movie_id))
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(self.responses, f, ensure_ascii=False)
+
+# ---------- execução ----------
+def holdout_splits(favs: List[Dict], n_splits: int = 5, holdout: float = 0.2, seed: int = 42):
+    """Gera (treino, ids_escondidos) com sementes fixas, para resultados reprodutíveis."""
+    favs = [f for f in favs if f.get("id")]
+    n_hidden = max(1, int(round(len(favs) * holdout)))
+    for i in range(n_splits):
+        rng = random.Random(seed + i)
+        hidden = rng.sample(favs, n_hidden)
+        hidden_ids = {f["id"] for f in hidden}
+        yield [f for f in favs if f["id"] not in hidden_ids], hidden_ids
+
+def evaluate(favs: List[Dict], engine: str, params: Optional[Dict] = None, k: int = 10,
+             n_splits: int = 5, holdout: float = 0.2, discover_fn: Callable = discover_movies,
+             seed: int = 42) -> Dict:
+    """Métricas médias de uma engine com um conjunto de parâmetros."""
+    fn = ENGINES[engine]
+    params = _accepted_params(fn, params or {})
+    rows = []
+    for train, hidden_ids in holdout_splits(favs, n_splits, holdout, seed):
+        t0 = time.perf_counter()
+        recs = fn(train, discover_fn=discover_fn, **params) or []
+        latency = time.perf_counter() - t0
+        rec_ids = [m.get("id") for m in recs]
+        rows.append({
+            "precision": precision_at_k(rec_ids, hidden_ids, k),
+            "recall": recall_at_k(rec_ids, hidden_ids, k),
+            "ndcg": ndcg_at_k(rec_ids, hidden_ids, k),
+            "latency_ms": latency * 1000,
+            "pool": len(recs),
+        })
+    if not rows:
+        return {"engine": engine, "params": params, "k": k, "splits": 0}
+    lat = sorted(r["latency_ms"] for r in rows)
+    return {
+        "engine": engine,
+        "params": params,
+        "k": k,
+        "splits": len(rows),
+        f"precision@{k}": statistics.mean(r["precision"] for r in rows),
+        f"recall@{k}": statistics.mean(r["recall"] for r in rows),
+        f"ndcg@{k}": statistics.mean(r["ndcg"] for r in rows),
+        "latency_p50_ms": statistics.median(lat),
+        "latency_max_ms": lat[-1],
+        "pool_mean": statistics.mean(r["pool"] for r in rows),
+    }
+
+def grid(spec: Iterable[str]) -> List[Dict]:
+    """['a=1,2', 'b=x'] -> [{'a': 1, 'b': 'x'}, {'a': 2, 'b': 'x'}]"""
+    axes = []
+    for item in spec or []:
+        name, _, values = item.partition("=")
+        parsed = []
+        for v in values.split(","):
+            try:
+                parsed.append(json.loads(v))
+            except ValueError:
+                parsed.append(v)
+        axes.append([(name.strip(), v) for v in parsed])
+    return [dict(combo) for combo in product(*axes)] if axes else [{}]
+
+def run(favs: List[Dict], engines: Sequence[str], param_grid: List[Dict], k: int = 10, n_splits: int = 5,
+        holdout: float = 0.2, discover_fn: Callable = discover_movies) -> List[Dict]:
+    results = []
+    for engine in engines:
+        for params in param_grid:
+            results.append(evaluate(favs, engine, params, k, n_splits, holdout, discover_fn))
+    return results
+
+def print_report(results: List[Dict]) -> None:
+    if not results:
+        print("Nada avaliado.")
+        return
+    k = results[0]["k"]
+    print(f"{'engine':<14} {'P@'+str(k):>7} {'R@'+str(k):>7} {'NDCG':>7} {'p50 ms':>8} {'max ms':>8} {'pool':>6}  params")
+    for r in results:
+        if not r.get("splits"):
+            print(f"{r['engine']:<14} (favoritos insuficientes)")
+            continue
+        print(
+            f"{r['engine']:<14} {r[f'precision@{k}']:>7.3f} {r[f'recall@{k}']:>7.3f} {r[f'ndcg@{k}']:>7.3f} "
+            f"{r['latency_p50_ms']:>8.1f} {r['latency_max_ms']:>8.1f} {r['pool_mean']:>6.0f}  {r['params']}"
+        )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Avaliação offline dos recomendadores (holdout de favoritos).")
+    parser.add_argument("--favorites", default=FAV_FILE, help="arquivo JSON de favoritos")
+    parser.add_argument("--engine", action="append", choices=sorted(ENGINES), help="engine(s) a avaliar (padrão: todas)")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--splits", type=int, default=5)
+    parser.add_argument("--holdout", type=float, default=0.2, help="fração dos favoritos escondida em cada split")
+    parser.add_argument("--grid", action="append", help="parâmetro=v1,v2 (pode repetir)")
+    rec = parser.add_mutually_exclusive_group()
+    rec.add_argument("--record", metavar="ARQ", help="chama a API e grava as respostas do discover em ARQ")
+    rec.add_argument("--replay", metavar="ARQ", help="usa só as respostas gravadas em ARQ (sem rede)")
+    parser.add_argument("--json", metavar="ARQ", help="também grava os resultados em JSON")
+    args = parser.parse_args()
+
+    discover_fn = discover_movies
+    recorder = None
+    if args.record or args.replay:
+        recorder = RecordedDiscover(args.record or args.replay, mode="record" if args.record else "replay")
+        discover_fn = recorder
+        # hermético: nada de reajuste/índice em background, grafo só das respostas gravadas
+        text_model.AUTO_REFIT = False
+        ann_index.AUTO_BUILD = False
+        graph_rec.isolate(recorder.recommendations)
+
+    favs = read_favorites_file(args.favorites)
+    if len(favs) < 2:
+        print("São necessários pelo menos 2 favoritos para avaliar.")
+        raise SystemExit(1)
+    if recorder is not None:
+        # arestas de todos os favoritos antes de avaliar (o recomendador só agenda as que faltam)
+        graph_rec.ensure_edges(f.get("id") for f in favs)
+
+    results = run(favs, args.engine or sorted(ENGINES), grid(args.grid), args.k, args.splits, args.holdout, discover_fn)
+    print_report(results)
+    if recorder is not None and args.record:
+        recorder.save()
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
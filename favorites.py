@@ -1,11 +1,33 @@
 # favorites.py (versão robusta / debug)
 import json
 import os
-from collections import Counter
-from typing import List, Dict
+import threading
+from typing import Callable, List, Dict
+import tracing
+from logger_conf import get_logger
+
+logger = get_logger(__name__)
 
 FAV_FILE = os.path.join(os.path.dirname(__file__), "favorites.json")
 
+# trava para leitura+escrita (jobs em background também gravam favoritos)
+_LOCK = threading.RLock()
+
+# funções chamadas a cada mudança: fn(evento, filme), evento em "add" / "remove" / "update"
+_LISTENERS: List[Callable[[str, Dict], None]] = []
+
+def add_listener(fn: Callable[[str, Dict], None]) -> None:
+    """Registra uma função para ser avisada quando os favoritos mudarem."""
+    if fn not in _LISTENERS:
+        _LISTENERS.append(fn)
+
+def _notify(event: str, movie: Dict) -> None:
+    for fn in list(_LISTENERS):
+        try:
+            fn(event, movie)
+        except Exception as e:
+            logger.exception("favorites listener error (%s)", event)
+
 def _ensure_file():
     """Garante que o arquivo exista e seja um JSON array."""
     if not os.path.exists(FAV_FILE):
@@ -32,19 +54,36 @@ def _read_file() -> List[Dict]:
         raise RuntimeError(f"Erro lendo {FAV_FILE}. Arquivo renomeado para {backup}. Detalhe: {e}")
 
 def _write_file(data: List[Dict]):
+    # grava em arquivo temporário e troca atomicamente, para que um leitor
+    # concorrente nunca veja o JSON pela metade
+    tmp = FAV_FILE + ".tmp"
     try:
-        with open(FAV_FILE, "w", encoding="utf-8") as f:
+        with open(tmp, "w", encoding="utf-8") as f:
             json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, FAV_FILE)
     except Exception as e:
         raise RuntimeError(f"Erro ao gravar {FAV_FILE}: {e}")
 
+def read_favorites_file(path: str) -> List[Dict]:
+    """Lê um arquivo de favoritos qualquer (ex: de outro usuário), sem criar nem corrigir nada."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f) or []
+        return [m for m in data if isinstance(m, dict)]
+    except Exception as e:
+        logger.warning("Erro lendo %s: %s", path, e)
+        return []
+
+@tracing.traced("favorites.list")
 def list_favorites() -> List[Dict]:
     try:
-        return _read_file()
+        with _LOCK:
+            return _read_file()
     except Exception as e:
-        print("favorites.list_favorites error:", e)
+        logger.warning("favorites.list_favorites error: %s", e)
         return []
 
+@tracing.traced("favorites.add")
 def add_favorite(movie: Dict) -> bool:
     """
     Adiciona um filme à lista de favoritos.
@@ -52,14 +91,6 @@ def add_favorite(movie: Dict) -> bool:
     """
     if not movie or "id" not in movie:
         return False
-    try:
-        favs = _read_file()
-    except Exception as e:
-        print("Erro ao ler favoritos:", e)
-        return False
-
-    if any(f.get("id") == movie["id"] for f in favs):
-        return False
 
     safe = {
         "id":            movie.get("id"),
@@ -71,41 +102,92 @@ def add_favorite(movie: Dict) -> bool:
         "poster_path":   movie.get("poster_path"),  # 👈 ADICIONADO
         "backdrop_path": movie.get("backdrop_path"),  # opcional, pode ser útil depois
     }
+    # campos usados pelo recomendador; se faltarem, o enriquecimento busca depois
+    for field in ("overview", "popularity"):
+        if movie.get(field) is not None:
+            safe[field] = movie.get(field)
 
-    favs.append(safe)
-    try:
-        _write_file(favs)
-        return True
-    except Exception as e:
-        print("Erro ao salvar favorito:", e)
-        return False
+    with _LOCK:
+        try:
+            favs = _read_file()
+        except Exception as e:
+            logger.warning("Erro ao ler favoritos: %s", e)
+            return False
+
+        if any(f.get("id") == movie["id"] for f in favs):
+            return False
+
+        favs.append(safe)
+        try:
+            _write_file(favs)
+        except Exception as e:
+            logger.error("Erro ao salvar favorito: %s", e)
+            return False
+
+    _notify("add", safe)
+    return True
 
+@tracing.traced("favorites.remove")
 def remove_favorite(movie_id: int) -> bool:
-    try:
-        favs = _read_file()
-    except Exception as e:
-        print("Erro ao ler favoritos:", e)
-        return False
-    new = [f for f in favs if f.get("id") != movie_id]
-    if len(new) == len(favs):
-        return False
-    try:
-        _write_file(new)
-        return True
-    except Exception as e:
-        print("Erro ao gravar ao remover favorito:", e)
-        return False
+    with _LOCK:
+        try:
+            favs = _read_file()
+        except Exception as e:
+            logger.warning("Erro ao ler favoritos: %s", e)
+            return False
+        removed = [f for f in favs if f.get("id") == movie_id]
+        if not removed:
+            return False
+        new = [f for f in favs if f.get("id") != movie_id]
+        try:
+            _write_file(new)
+        except Exception as e:
+            logger.error("Erro ao gravar ao remover favorito: %s", e)
+            return False
+
+    for f in removed:
+        _notify("remove", f)
+    return True
+
+@tracing.traced("favorites.update")
+def update_favorites(updates: Dict[int, Dict]) -> int:
+    """
+    Mescla campos extras (ex: overview, popularity) nos favoritos já salvos.
+    `updates` mapeia id -> {campo: valor}. Retorna quantos favoritos mudaram.
+    """
+    if not updates:
+        return 0
+    changed = []
+    with _LOCK:
+        try:
+            favs = _read_file()
+        except Exception as e:
+            logger.warning("Erro ao ler favoritos: %s", e)
+            return 0
+        for f in favs:
+            fields = updates.get(f.get("id"))
+            if not fields:
+                continue
+            before = dict(f)
+            f.update(fields)
+            if f != before:
+                changed.append(f)
+        if not changed:
+            return 0
+        try:
+            _write_file(favs)
+        except Exception as e:
+            logger.error("Erro ao gravar atualização de favoritos: %s", e)
+            return 0
+
+    for f in changed:
+        _notify("update", f)
+    return len(changed)
 
 def top_genres_from_favorites(top_n: int = 3) -> List[int]:
-    favs = list_favorites()
-    counter = Counter()
-    for f in favs:
-        for gid in f.get("genre_ids", []) or []:
-            try:
-                counter[int(gid)] += 1
-            except Exception:
-                pass
-    return [gid for gid, _ in counter.most_common(top_n)]
+    # contagem mantida pelo perfil incremental (import local: user_profile importa este módulo)
+    from user_profile import get_profile
+    return get_profile().top_genres(top_n)
 
 def is_favorite(movie_id: int) -> bool:
     favs = list_favorites()
@@ -0,0 +1,210 @@
+# graph_rec.py
+"""
+Recomendador por grafo de co-ocorrência montado a partir do
+/movie/{id}/recommendations do TMDB.
+
+Cada filme buscado vira um nó com arestas para as recomendações dele. As
+listas ficam salvas em data/rec_graph.json e são compartilhadas por todos
+os usuários: um favorito novo custa no máximo uma busca (e nenhuma, se
+outro usuário já tinha esse filme). O score é um PageRank personalizado
+(random walk com restart nos favoritos), calculado com matriz esparsa.
+"""
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+
+import catalog
+from favorites import add_listener
+from ranking import top_k_indices
+from tmdb_client import get_recommendations, is_fallback
+from logger_conf import get_logger
+
+logger = get_logger(__name__)
+
+GRAPH_FILE = os.path.join(os.path.dirname(__file__), "data", "rec_graph.json")
+
+# probabilidade de voltar aos favoritos a cada passo do random walk
+RESTART_PROB = 0.15
+PPR_ITERATIONS = 30
+
+_ADJ: Optional[Dict[int, List[int]]] = None
+_LOCK = threading.RLock()
+_VERSION = 0                       # muda a cada aresta nova (invalida a matriz)
+_MATRIX: Optional[Tuple[int, Dict[int, int], np.ndarray, sp.csr_matrix]] = None
+_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rec-graph")
+# de onde vêm as arestas e se o grafo vai para o disco (a avaliação troca os dois em `isolate`)
+_FETCH: Callable[[int], dict] = get_recommendations
+_PERSIST = True
+# processos que só leem o grafo (ex: workers do batch_recs) desligam a busca em background
+AUTO_FETCH = True
+
+# ---------- armazenamento ----------
+def _load() -> Dict[int, List[int]]:
+    global _ADJ
+    with _LOCK:
+        if _ADJ is None:
+            try:
+                with open(GRAPH_FILE, "r", encoding="utf-8") as f:
+                    _ADJ = {int(k): [int(x) for x in v] for k, v in (json.load(f) or {}).items()}
+            except FileNotFoundError:
+                _ADJ = {}
+            except Exception as e:
+                logger.warning("graph_rec: grafo ilegível, recomeçando: %s", e)
+                _ADJ = {}
+        return _ADJ
+
+def _save() -> None:
+    with _LOCK:
+        adj = _load()
+        os.makedirs(os.path.dirname(GRAPH_FILE), exist_ok=True)
+        tmp = GRAPH_FILE + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({str(k): v for k, v in adj.items()}, f)
+            os.replace(tmp, GRAPH_FILE)
+        except Exception as e:
+            logger.error("graph_rec: erro ao gravar grafo: %s", e)
+
+def _fetch(movie_id: int) -> Tuple[int, Optional[List[Dict]]]:
+    resp = _FETCH(movie_id)
+    if not resp or is_fallback(resp):
+        # fallback (vizinhos por gênero do catálogo) não vira aresta: fica faltando e é buscado de novo
+        return movie_id, None
+    return movie_id, resp.get("results", [])
+
+def ensure_edges(movie_ids: Iterable[int], max_workers: int = 8) -> int:
+    """
+    Garante que os filmes têm suas arestas no grafo, buscando só os que faltam
+    (em paralelo). Os filmes recomendados entram no catálogo. Retorna quantos foram buscados.
+    """
+    global _VERSION
+    adj = _load()
+    todo = missing_edges(movie_ids)
+    if not todo:
+        return 0
+
+    fetched = 0
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="rec-graph-fetch") as pool:
+        for mid, results in pool.map(_fetch, todo):
+            if results is None:
+                continue  # erro de rede: tenta de novo numa próxima vez
+            catalog.add_movies(results)
+            with _LOCK:
+                adj[mid] = [r["id"] for r in results if r.get("id")]
+                _VERSION += 1
+            fetched += 1
+    if fetched and _PERSIST:
+        _save()
+        catalog.save_catalog()
+    return fetched
+
+def isolate(fetch_fn: Callable[[int], dict]) -> None:
+    """
+    Troca o grafo compartilhado por um só em memória, começando vazio, com as
+    arestas buscadas por `fetch_fn` (ex: respostas gravadas). Nada vai para o
+    disco. Usado pela avaliação offline, para ela não depender do grafo local.
+    """
+    global _ADJ, _FETCH, _PERSIST, _VERSION
+    with _LOCK:
+        _ADJ, _FETCH, _PERSIST = {}, fetch_fn, False
+        _VERSION += 1
+
+def missing_edges(movie_ids: Iterable[int]) -> List[int]:
+    """Filmes (sem repetir) que ainda não têm arestas no grafo."""
+    adj = _load()
+    with _LOCK:
+        return list(dict.fromkeys(int(i) for i in movie_ids if i and int(i) not in adj))
+
+def schedule_edges(movie_ids: Iterable[int]) -> None:
+    """Versão em background de ensure_edges (não agenda nada se não falta aresta)."""
+    if not AUTO_FETCH:
+        return
+    todo = missing_edges(movie_ids)
+    if todo:
+        _EXECUTOR.submit(ensure_edges, todo)
+
+# ---------- PageRank personalizado ----------
+def _matrix() -> Tuple[Dict[int, int], np.ndarray, sp.csr_matrix]:
+    """(id -> nó, ids por nó, matriz de transição coluna-estocástica), refeita só se o grafo mudou."""
+    global _MATRIX
+    with _LOCK:
+        if _MATRIX is not None and _MATRIX[0] == _VERSION:
+            return _MATRIX[1], _MATRIX[2], _MATRIX[3]
+        adj = _load()
+        node_ids = sorted(set(adj) | {t for targets in adj.values() for t in targets})
+        node_of = {mid: i for i, mid in enumerate(node_ids)}
+        rows, cols = [], []
+        for src, targets in adj.items():
+            for t in targets:
+                rows.append(node_of[t])
+                cols.append(node_of[src])
+        n = len(node_ids)
+        A = sp.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(n, n))
+        A = ((A + A.T) > 0).astype(float)   # co-ocorrência: aresta vale nos dois sentidos
+        out_deg = np.asarray(A.sum(axis=0)).ravel()
+        out_deg[out_deg == 0] = 1.0
+        P = (A @ sp.diags(1.0 / out_deg)).tocsr()
+        _MATRIX = (_VERSION, node_of, np.array(node_ids, dtype=np.int64), P)
+        return node_of, _MATRIX[2], P
+
+def personalized_pagerank(seed_ids: Iterable[int], restart: float = RESTART_PROB,
+                          iterations: int = PPR_ITERATIONS) -> Tuple[np.ndarray, np.ndarray]:
+    """(ids dos nós, score) do random walk com restart nos `seed_ids`."""
+    node_of, node_ids, P = _matrix()
+    seeds = [node_of[int(s)] for s in seed_ids if s and int(s) in node_of]
+    if not seeds:
+        return node_ids, np.zeros(len(node_ids))
+    s = np.zeros(len(node_ids))
+    s[seeds] = 1.0 / len(seeds)
+    r = s.copy()
+    for _ in range(iterations):
+        r = (1 - restart) * (P @ r) + restart * s
+    return node_ids, r
+
+def graph_scores(seed_ids: Iterable[int], candidate_ids: Iterable[int]) -> np.ndarray:
+    """Score de PageRank personalizado para cada candidato (0 se fora do grafo)."""
+    node_ids, r = personalized_pagerank(seed_ids)
+    cand = np.asarray(list(candidate_ids), dtype=np.int64)
+    if not len(node_ids) or not len(cand):
+        return np.zeros(len(cand))
+    # node_ids está ordenado: localiza cada candidato por busca binária
+    pos = np.clip(np.searchsorted(node_ids, cand), 0, len(node_ids) - 1)
+    return np.where(node_ids[pos] == cand, r[pos], 0.0)
+
+def graph_candidates(seed_ids: Iterable[int], k: int = 100, exclude_ids: Optional[set] = None) -> List[Dict]:
+    """Os k filmes com maior score no grafo (dados vindos do catálogo), sem os `exclude_ids`."""
+    seed_ids = list(seed_ids)
+    node_ids, r = personalized_pagerank(seed_ids)
+    if not r.any():
+        return []
+    exclude = {int(i) for i in exclude_ids or () if i is not None} | {int(s) for s in seed_ids if s}
+    r = np.where(np.isin(node_ids, np.fromiter(exclude, dtype=np.int64)), -np.inf, r)
+    movies = []
+    for i in top_k_indices(r, k):
+        if not np.isfinite(r[i]) or r[i] <= 0:
+            break
+        m = catalog.get_movie(int(node_ids[i]))
+        if m:
+            movies.append(m)
+    return movies
+
+def on_favorites_changed(event: str, movie: Dict) -> None:
+    # já deixa as arestas do favorito novo prontas para o próximo pedido
+    if event == "add" and movie.get("id"):
+        schedule_edges([movie["id"]])
+
+add_listener(on_favorites_changed)
+
+if __name__ == "__main__":
+    from favorites import list_favorites
+
+    t0 = time.perf_counter()
+    n = ensure_edges(f.get("id") for f in list_favorites())
+    node_of, _, _ = _matrix()
+    print(f"{n} favoritos buscados em {time.perf_counter() - t0:.1f}s; grafo com {len(node_of)} nós.")
@@ -0,0 +1,443 @@
+# loadtest.py
+"""
+Teste de carga: quantos usuários simultâneos um processo do MovieBot aguenta.
+
+Simula sessões de usuário (buscar, paginar, abrir detalhes, favoritar,
+gerar recomendações) contra um TMDB falso local, com latência configurável,
+aumentando a concorrência em degraus. Para cada degrau mostra vazão
+(ops/s), latência p50/p95/p99, taxa de erro e RSS, e aponta o degrau em que
+o processo satura.
+
+Alvos:
+  - app  (padrão): os mesmos caminhos de código do app/CLI, no próprio
+    processo (shared_store, tmdb_client, favorites, recommender). Favoritos,
+    perfil e caches em disco vão para um diretório temporário.
+  - http: a API do api.py, que deve estar apontando para o TMDB falso:
+        python loadtest.py --serve-tmdb --tmdb-port 8600
+        TMDB_BASE_URL=http://127.0.0.1:8600/3 python api.py --port 8000
+        python loadtest.py --target http --url http://127.0.0.1:8000 --pid <pid do api.py>
+    (a API grava os favoritos dela de verdade: rode-a numa cópia do projeto)
+
+Uso:
+    python loadtest.py --steps 1,2,4,8,16,32 --step-seconds 10 --latency 80
+    python loadtest.py --json atual.json --baseline anterior.json
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import tempfile
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+import api
+import catalog
+import enrichment
+import favorites
+import graph_rec
+import rec_cache
+import shared_matrix
+import shared_store
+import text_model
+import tmdb_client
+import user_profile
+
+# ---------- TMDB falso ----------
+FAKE_GENRES = [(28, "Ação"), (12, "Aventura"), (16, "Animação"), (35, "Comédia"), (80, "Crime"),
+               (18, "Drama"), (14, "Fantasia"), (27, "Terror"), (10749, "Romance"), (878, "Ficção científica")]
+FAKE_MOVIES = 5000
+FAKE_PER_PAGE = 20
+WORDS = ("amor", "noite", "guerra", "cidade", "sombra", "fogo", "mar", "estrela", "rei", "sangue",
+         "tempo", "vento", "lobo", "gelo", "ouro", "luz", "ponte", "fim", "jogo", "sonho")
+
+def _fake_movie(mid: int) -> Dict:
+    rnd = random.Random(mid)
+    return {
+        "id": mid,
+        "title": " ".join(rnd.sample(WORDS, 2)).title() + f" {mid}",
+        "overview": " ".join(rnd.choice(WORDS) for _ in range(30)),
+        "release_date": f"{rnd.randint(1960, 2024)}-{rnd.randint(1, 12):02d}-01",
+        "vote_average": round(rnd.uniform(3, 9), 1),
+        "vote_count": int(rnd.paretovariate(1.2) * 20),
+        "popularity": round(rnd.paretovariate(1.5) * 5, 2),
+        "genre_ids": [g for g, _ in rnd.sample(FAKE_GENRES, rnd.randint(1, 3))],
+        "poster_path": f"/p{mid}.jpg",
+    }
+
+class FakeTMDB:
+    """Servidor HTTP com as rotas do TMDB que o app usa; dados sintéticos e determinísticos."""
+
+    def __init__(self, latency_ms: float = 50.0, jitter_ms: float = 20.0, error_rate: float = 0.0,
+                 host: str = "127.0.0.1", port: int = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.requests = 0
+        self.movies = [_fake_movie(mid) for mid in range(1, FAKE_MOVIES + 1)]
+        self.by_genre: Dict[int, List[Dict]] = {g: [] for g, _ in FAKE_GENRES}
+        for m in self.movies:
+            for g in m["genre_ids"]:
+                self.by_genre[g].append(m)
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                fake.requests += 1
+                delay = random.gauss(fake.latency_ms, fake.jitter_ms) / 1000
+                if delay > 0:
+                    time.sleep(delay)
+                if random.random() < fake.error_rate:
+                    self._send(500, {"status_message": "erro simulado"})
+                    return
+                url = urlparse(self.path)
+                status, body = fake.route(url.path, {k: v[0] for k, v in parse_qs(url.query).items()})
+                self._send(status, body)
+
+            def _send(self, status, body):
+                data = json.dumps(body).encode("utf-8")
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # o cliente desistiu (timeout/prazo do tmdb_client)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.base_url = f"http://{host}:{self.server.server_address[1]}/3"
+
+    def _page(self, movies: List[Dict], page: int) -> Dict:
+        start = (page - 1) * FAKE_PER_PAGE
+        return {"page": page, "results": movies[start:start + FAKE_PER_PAGE],
+                "total_results": len(movies), "total_pages": max(1, -(-len(movies) // FAKE_PER_PAGE))}
+
+    def route(self, path: str, q: Dict[str, str]):
+        page = int(q.get("page", 1))
+        parts = path.strip("/").split("/")[1:]  # sem o "3"
+        if parts == ["genre", "movie", "list"]:
+            return 200, {"genres": [{"id": g, "name": n} for g, n in FAKE_GENRES]}
+        if parts == ["search", "movie"]:
+            # cada termo casa com um subconjunto estável do catálogo
+            seed = zlib.crc32(q.get("query", "").encode("utf-8"))
+            rnd = random.Random(seed)
+            return 200, self._page(rnd.sample(self.movies, 30 + seed % 70), page)
+        if parts == ["discover", "movie"]:
+            movies = self.by_genre.get(int(q.get("with_genres", "0").split(",")[0] or 0), self.movies)
+            min_votes = int(q.get("vote_count.gte", 0))
+            movies = [m for m in movies if m["vote_count"] >= min_votes]
+            key = "vote_average" if q.get("sort_by", "").startswith("vote_average") else "popularity"
+            return 200, self._page(sorted(movies, key=lambda m: -m[key]), page)
+        if len(parts) >= 2 and parts[0] == "movie" and parts[1].isdigit():
+            mid = int(parts[1])
+            if not 1 <= mid <= FAKE_MOVIES:
+                return 404, {"status_message": "not found"}
+            movie = self.movies[mid - 1]
+            if parts[2:] == ["recommendations"]:
+                rnd = random.Random(mid)
+                return 200, self._page(rnd.sample(self.movies, 40), page)
+            if parts[2:] == ["videos"]:
+                return 200, {"id": mid, "results": []}
+            if not parts[2:]:
+                names = dict(FAKE_GENRES)
+                return 200, {**movie, "genres": [{"id": g, "name": names[g]} for g in movie["genre_ids"]]}
+        return 404, {"status_message": "not found"}
+
+    def start(self) -> str:
+        threading.Thread(target=self.server.serve_forever, name="fake-tmdb", daemon=True).start()
+        return self.base_url
+
+    def stop(self) -> None:
+        self.server.shutdown()
+
+# ---------- alvos ----------
+class OpError(Exception):
+    pass
+
+class AppTarget:
+    """Chama os mesmos caminhos de código do app, no próprio processo."""
+
+    def search(self, term: str, page: int) -> List[Dict]:
+        resp = shared_store.search_page(term, page)
+        if not resp:
+            raise OpError("busca vazia")
+        return resp.get("results", [])
+
+    def details(self, movie_id: int) -> None:
+        if not tmdb_client.get_movie_details(movie_id):
+            raise OpError("detalhes vazios")
+        tmdb_client.get_movie_videos(movie_id)
+
+    def favorite(self, movie: Dict) -> None:
+        favorites.add_favorite(movie)
+
+    def unfavorite(self, movie_id: int) -> None:
+        favorites.remove_favorite(movie_id)
+
+    def recommend(self, favs: List[Dict]) -> None:
+        # mesmo caminho da rota /recommendations (e da aba do app): favoritos
+        # gravados, rec_cache + shared_store, recommend_with_tfidf
+        if not api._recs_from_favorites():
+            raise OpError("sem recomendações")
+
+class HttpTarget:
+    """Mesmas sessões contra a API HTTP (api.py)."""
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url.rstrip("/")
+        self._local = threading.local()
+
+    def _get(self, path: str, **params) -> Dict:
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        resp = session.get(self.base_url + path, params=params, timeout=30)
+        if resp.status_code != 200:
+            raise OpError(f"{path}: status {resp.status_code}")
+        return resp.json()
+
+    def search(self, term: str, page: int) -> List[Dict]:
+        return self._get("/search", q=term, page=page, min_votes=0).get("results", [])
+
+    def details(self, movie_id: int) -> None:
+        self._get(f"/movies/{movie_id}")
+
+    def favorite(self, movie: Dict) -> None:
+        resp = requests.post(f"{self.base_url}/favorites", json={"movie": movie}, timeout=30)
+        if resp.status_code not in (200, 201):
+            raise OpError(f"favoritar: status {resp.status_code}")
+
+    def unfavorite(self, movie_id: int) -> None:
+        resp = requests.delete(f"{self.base_url}/favorites/{movie_id}", timeout=30)
+        if resp.status_code not in (200, 404):
+            raise OpError(f"remover: status {resp.status_code}")
+
+    def recommend(self, favs: List[Dict]) -> None:
+        self._get("/recommendations", per_page=10)
+
+# ---------- sessões e métricas ----------
+class Recorder:
+    def __init__(self):
+        self.samples: List[tuple] = []   # (op, segundos, ok)
+        self.errors: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def timed(self, op: str, fn: Callable, *args):
+        t0 = time.perf_counter()
+        try:
+            result = fn(*args)
+            ok = True
+        except Exception as e:
+            result, ok = None, False
+            with self._lock:
+                msg = f"{op}: {type(e).__name__}: {e}"[:120]
+                self.errors[msg] = self.errors.get(msg, 0) + 1
+        with self._lock:
+            self.samples.append((op, time.perf_counter() - t0, ok))
+        return result
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+def _zipf_terms(n: int) -> List[str]:
+    return [f"{WORDS[i % len(WORDS)]} {i}" if i >= len(WORDS) else WORDS[i] for i in range(n)]
+
+def user_session(target, rec: Recorder, stop: threading.Event, terms: List[str], weights: List[float],
+                 think: float, rnd: random.Random) -> None:
+    """Loop de um usuário: busca -> (próxima página) -> detalhes -> (favorita) -> (recomendações)."""
+    favs: List[Dict] = []
+    while not stop.is_set():
+        term = rnd.choices(terms, weights)[0]
+        results = rec.timed("search", target.search, term, 1) or []
+        if results and rnd.random() < 0.5:
+            results = rec.timed("paginate", target.search, term, 2) or results
+        for movie in rnd.sample(results, min(2, len(results))):
+            rec.timed("details", target.details, movie["id"])
+        if results and rnd.random() < 0.3:
+            movie = rnd.choice(results)
+            rec.timed("favorite", target.favorite, movie)
+            favs.append(movie)
+            if len(favs) > 5:
+                rec.timed("unfavorite", target.unfavorite, favs.pop(0)["id"])
+        if favs and rnd.random() < 0.2:
+            rec.timed("recommend", target.recommend, favs)
+        if think:
+            stop.wait(rnd.expovariate(1 / think))
+    # desfaz o que a sessão favoritou (fora da medição)
+    for movie in favs:
+        try:
+            target.unfavorite(movie["id"])
+        except Exception:
+            pass
+
+def rss_mb(pid: Optional[int] = None) -> float:
+    """RSS atual (Linux /proc); fora do Linux, o pico do próprio processo."""
+    try:
+        with open(f"/proc/{pid or 'self'}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def run_step(target, users: int, seconds: float, terms: List[str], think: float, pid: Optional[int]) -> Dict:
+    rec = Recorder()
+    stop = threading.Event()
+    weights = [1 / (i + 1) for i in range(len(terms))]
+    threads = [threading.Thread(target=user_session, name=f"user-{i}", daemon=True,
+                                args=(target, rec, stop, terms, weights, think, random.Random(i * 7919 + users)))
+               for i in range(users)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    stop.wait(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+
+    lat = sorted(s for _, s, _ in rec.samples)
+    errors = sum(1 for _, _, ok in rec.samples if not ok)
+    per_op = {}
+    for op in sorted({op for op, _, _ in rec.samples}):
+        op_lat = sorted(s for o, s, _ in rec.samples if o == op)
+        per_op[op] = {"count": len(op_lat), "p95_ms": round(_percentile(op_lat, 0.95) * 1000, 1)}
+    return {
+        "users": users,
+        "ops": len(lat),
+        "throughput": round(len(lat) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(_percentile(lat, 0.50) * 1000, 1),
+        "p95_ms": round(_percentile(lat, 0.95) * 1000, 1),
+        "p99_ms": round(_percentile(lat, 0.99) * 1000, 1),
+        "error_rate": round(errors / len(lat), 4) if lat else 0.0,
+        "rss_mb": round(rss_mb(pid), 1),
+        "per_op": per_op,
+        "top_errors": sorted(rec.errors.items(), key=lambda kv: -kv[1])[:3],
+    }
+
+def saturation_point(steps: List[Dict], min_gain: float = 0.10, max_errors: float = 0.05) -> Optional[int]:
+    """Primeiro nº de usuários em que a vazão para de crescer, o p95 explode ou os erros passam do limite."""
+    if not steps:
+        return None
+    base_p95 = steps[0]["p95_ms"] or 1.0
+    for prev, cur in zip(steps, steps[1:]):
+        if cur["error_rate"] > max_errors or cur["p95_ms"] > 3 * base_p95:
+            return cur["users"]
+        if cur["throughput"] < prev["throughput"] * (1 + min_gain):
+            return cur["users"]
+    return None
+
+def compare(steps: List[Dict], baseline: List[Dict], tolerance: float) -> List[str]:
+    """Degraus em que a vazão caiu ou o p95 subiu mais que `tolerance` em relação ao baseline."""
+    old = {s["users"]: s for s in baseline}
+    problems = []
+    for s in steps:
+        b = old.get(s["users"])
+        if not b:
+            continue
+        if s["throughput"] < b["throughput"] * (1 - tolerance):
+            problems.append(f"{s['users']} usuários: vazão {s['throughput']} < {b['throughput']} (baseline)")
+        if s["p95_ms"] > b["p95_ms"] * (1 + tolerance):
+            problems.append(f"{s['users']} usuários: p95 {s['p95_ms']} ms > {b['p95_ms']} ms (baseline)")
+    return problems
+
+def _isolate_disk_state(tmpdir: str) -> None:
+    """Favoritos, perfil e caches em disco do teste não tocam nos arquivos reais."""
+    favorites.FAV_FILE = os.path.join(tmpdir, "favorites.json")
+    user_profile.PROFILE_FILE = os.path.join(tmpdir, "profile.json")
+    user_profile.PROFILE_TEXT_FILE = os.path.join(tmpdir, "profile_text.npy")
+    rec_cache.CACHE_DIR = os.path.join(tmpdir, "rec_cache")
+    graph_rec.GRAPH_FILE = os.path.join(tmpdir, "rec_graph.json")
+    enrichment.CACHE_FILE = os.path.join(tmpdir, "enrichment_cache.json")
+    catalog.CATALOG_FILE = os.path.join(tmpdir, "catalog.json")
+    # o reajuste automático do modelo de texto e o índice ANN (que publica em
+    # shared_matrix) também gravam: ficam no diretório do teste
+    text_model.MODEL_FILE = os.path.join(tmpdir, "text_model.pkl")
+    shared_matrix.SHARED_DIR = os.path.join(tmpdir, "shared")
+
+def _print_step(s: Dict) -> None:
+    print(f"{s['users']:>6} {s['ops']:>8} {s['throughput']:>9.1f} {s['p50_ms']:>8.1f} {s['p95_ms']:>8.1f} "
+          f"{s['p99_ms']:>8.1f} {s['error_rate'] * 100:>6.2f}% {s['rss_mb']:>8.1f}")
+    for msg, n in s["top_errors"]:
+        print(f"{'':>8}{n}x {msg}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Teste de carga do MovieBot com TMDB falso.")
+    parser.add_argument("--target", choices=("app", "http"), default="app")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="API (api.py) quando --target http")
+    parser.add_argument("--pid", type=int, help="processo cujo RSS medir (padrão: este)")
+    parser.add_argument("--steps", default="1,2,4,8,16,32", help="usuários simultâneos em cada degrau")
+    parser.add_argument("--step-seconds", type=float, default=10.0)
+    parser.add_argument("--think", type=float, default=0.0, help="pausa média entre sessões (s)")
+    parser.add_argument("--terms", type=int, default=200, help="termos de busca distintos (frequência Zipf)")
+    parser.add_argument("--latency", type=float, default=50.0, help="latência média do TMDB falso (ms)")
+    parser.add_argument("--jitter", type=float, default=20.0, help="desvio da latência (ms)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fração de respostas 500 do TMDB falso")
+    parser.add_argument("--no-cache", action="store_true", help="sem cache do tmdb_client/shared_store (alvo app)")
+    parser.add_argument("--serve-tmdb", action="store_true", help="só sobe o TMDB falso (para --target http)")
+    parser.add_argument("--tmdb-port", type=int, default=0)
+    parser.add_argument("--json", help="grava o relatório neste arquivo")
+    parser.add_argument("--baseline", help="relatório anterior para comparar (sai com 1 se piorou)")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    fake = FakeTMDB(args.latency, args.jitter, args.error_rate, port=args.tmdb_port)
+    base_url = fake.start()
+    if args.serve_tmdb:
+        print(f"TMDB falso em {base_url} (latência {args.latency}±{args.jitter} ms). Ctrl+C para sair.")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            raise SystemExit(0)
+
+    if args.target == "app":
+        tmdb_client.BASE_URL = base_url
+        _isolate_disk_state(tempfile.mkdtemp(prefix="moviebot-load-"))
+        if args.no_cache:
+            tmdb_client.TTLS = {kind: 0 for kind in tmdb_client.TTLS}
+            shared_store.STORE.budget_bytes = 0
+        target = AppTarget()
+    else:
+        target = HttpTarget(args.url)
+
+    print(f"alvo={args.target} latência={args.latency}±{args.jitter} ms erros={args.error_rate:.0%} "
+          f"degraus de {args.step_seconds:.0f}s")
+    print(f"{'users':>6} {'ops':>8} {'ops/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'erros':>7} {'RSS MB':>8}")
+    terms = _zipf_terms(args.terms)
+    steps = []
+    for users in [int(u) for u in args.steps.split(",") if u.strip()]:
+        step = run_step(target, users, args.step_seconds, terms, args.think, args.pid)
+        steps.append(step)
+        _print_step(step)
+
+    sat = saturation_point(steps)
+    print(f"Saturação em ~{sat} usuários." if sat else "Sem saturação nos degraus testados.")
+    if args.target == "app":
+        print(f"Requisições ao TMDB falso: {fake.requests}")
+
+    report = {"target": args.target, "latency_ms": args.latency, "jitter_ms": args.jitter,
+              "error_rate": args.error_rate, "no_cache": args.no_cache, "saturation_users": sat, "steps": steps}
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            problems = compare(steps, json.load(f).get("steps", []), args.tolerance)
+        for p in problems:
+            print("REGRESSÃO:", p)
+        raise SystemExit(1 if problems else 0)
@@ -1,27 +1,138 @@
 # logger_conf.py
+"""
+Logging do MovieBot sem I/O na thread de quem loga.
+
+Todos os loggers de `get_logger` mandam os registros para uma fila
+(QueueHandler); uma thread só (QueueListener) escreve no console (INFO+,
+texto) e no arquivo movie_bot.log (JSON, uma linha por registro, com
+rotação). Na thread que loga só acontece: filtro de amostragem, montagem
+da mensagem e um put na fila. Fila cheia descarta o registro (e conta) em
+vez de bloquear.
+
+Registros DEBUG são amostrados (MOVIEBOT_LOG_DEBUG_SAMPLE, fração mantida);
+os que passam levam "sample_rate" para as contagens poderem ser corrigidas.
+Campos estruturados vão em `extra` (endpoint, latency_ms, cache, status...);
+o session_id vem de `set_session_id()` (contextvar, por sessão/requisição).
+"""
+import atexit
+import contextvars
+import json
 import logging
+import logging.handlers
 import os
+import queue
+import random
+import threading
+import time
+from typing import Optional
 
 LOG_FILE = os.path.join(os.path.dirname(__file__), "movie_bot.log")
+LOG_MAX_BYTES = int(float(os.getenv("MOVIEBOT_LOG_MAX_MB", "10")) * 1024 * 1024)
+LOG_BACKUPS = int(os.getenv("MOVIEBOT_LOG_BACKUPS", "5"))
+QUEUE_SIZE = int(os.getenv("MOVIEBOT_LOG_QUEUE", "10000"))
+# fração dos registros DEBUG mantida (0 desliga o DEBUG de vez; 1 mantém todos)
+DEBUG_SAMPLE = float(os.getenv("MOVIEBOT_LOG_DEBUG_SAMPLE", "0.1"))
+
+SESSION_ID: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("session_id", default=None)
+
+# atributos que todo LogRecord tem; o resto veio de `extra` e vai para o JSON
+_STANDARD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_LOCK = threading.Lock()
+_QUEUE: "queue.Queue[logging.LogRecord]" = queue.Queue(QUEUE_SIZE)
+_HANDLER: Optional[logging.Handler] = None
+_LISTENER: Optional[logging.handlers.QueueListener] = None
+_DROPPED = 0
+
+def set_session_id(session_id: Optional[str]) -> None:
+    """Sessão (Streamlit, requisição da API, operação do batch) dos próximos registros desta thread/contexto."""
+    SESSION_ID.set(session_id)
+
+def dropped() -> int:
+    """Quantos registros foram descartados por fila cheia."""
+    return _DROPPED
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.created)) + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "thread": record.threadName,
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRS and value is not None:
+                data[key] = value
+        if record.exc_text:
+            data["exc"] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+class _SamplingFilter(logging.Filter):
+    """Deixa passar todo INFO+ e uma fração DEBUG_SAMPLE dos DEBUG; carimba o session_id."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno <= logging.DEBUG:
+            if DEBUG_SAMPLE <= 0 or random.random() >= DEBUG_SAMPLE:
+                return False
+            record.sample_rate = DEBUG_SAMPLE
+        if getattr(record, "session_id", None) is None:
+            record.session_id = SESSION_ID.get()
+        return True
+
+class _NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # só o necessário antes de cruzar de thread: mensagem pronta e traceback em texto
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        global _DROPPED
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _DROPPED += 1
+
+def _start() -> logging.Handler:
+    global _HANDLER, _LISTENER
+    with _LOCK:
+        if _HANDLER is not None:
+            return _HANDLER
+
+        # console (info), texto como antes
+        ch = logging.StreamHandler()
+        ch.setLevel(logging.INFO)
+        ch.setFormatter(logging.Formatter("%(levelname)s - %(message)s"))
+
+        # arquivo (debug), JSON por linha, com rotação
+        fh = logging.handlers.RotatingFileHandler(LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS,
+                                                  encoding="utf-8", delay=True)
+        fh.setLevel(logging.DEBUG)
+        fh.setFormatter(JsonFormatter())
+
+        _LISTENER = logging.handlers.QueueListener(_QUEUE, ch, fh, respect_handler_level=True)
+        _LISTENER.start()
+        atexit.register(_stop)
+
+        handler = _NonBlockingQueueHandler(_QUEUE)
+        handler.addFilter(_SamplingFilter())
+        _HANDLER = handler
+        return handler
+
+def _stop() -> None:
+    # esvazia a fila antes de o processo sair
+    if _LISTENER is not None:
+        _LISTENER.stop()
 
 def get_logger(name: str = "movie-bot"):
     logger = logging.getLogger(name)
     if logger.handlers:
         return logger
-    logger.setLevel(logging.DEBUG)
-
-    # console handler (info)
-    ch = logging.StreamHandler()
-    ch.setLevel(logging.INFO)
-    ch_formatter = logging.Formatter("%(levelname)s - %(message)s")
-    ch.setFormatter(ch_formatter)
-    logger.addHandler(ch)
-
-    # file handler (debug)
-    fh = logging.FileHandler(LOG_FILE, encoding="utf-8")
-    fh.setLevel(logging.DEBUG)
-    fh_formatter = logging.Formatter("%(asctime)s %(levelname)s [%(name)s] %(message)s")
-    fh.setFormatter(fh_formatter)
-    logger.addHandler(fh)
-
+    logger.setLevel(logging.DEBUG if DEBUG_SAMPLE > 0 else logging.INFO)
+    logger.addHandler(_start())
+    logger.propagate = False
     return logger
@@ -1,22 +1,68 @@
 # main.py (ATUALIZADO)
+"""
+CLI interativa do MovieBot.
+
+Modo batch (sem input()): lê operações em JSONL de um arquivo ou da entrada
+padrão, executa em paralelo e escreve um resultado JSONL por operação, na
+ordem em que terminam:
+
+    python main.py --batch ops.jsonl --workers 16 > resultados.jsonl
+    cat ops.jsonl | python main.py --batch -
+
+Cada linha é um objeto com "op" e os parâmetros dela ("id" é opcional e volta
+no resultado):
+    {"op": "search", "term": "matrix", "page": 1, "min_votes": 30}
+    {"op": "genre", "genre": "acao", "year": 1999, "min_votes": 30}
+    {"op": "recommendations", "movie_id": 603, "min_votes": 30}
+    {"op": "favorite_add", "movie_id": 603}      (ou "movie": {...})
+    {"op": "favorite_remove", "movie_id": 603}
+    {"op": "favorites"}
+    {"op": "recommend_favorites", "top_k": 10}
+
+As operações rodam em paralelo, sem ordem garantida entre elas (um
+favorite_add e um favorite_remove do mesmo filme no mesmo lote podem se
+cruzar). O resumo (total, erros, operações/min) vai para o stderr.
+"""
+import argparse
+import contextlib
+import json
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, IO, List, Tuple
+
 from tmdb_client import (
     search_movie,
     discover_movies,
     get_recommendations,
     get_genres,
+    get_movie_details,
     pretty_print_results,
     filter_results_by_min_votes,
-    normalize_text
+    normalize_text,
+    deadline,
+    FALLBACK_KEY,
 )
 from favorites import add_favorite, list_favorites, remove_favorite, top_genres_from_favorites, is_favorite
-from logger_conf import get_logger
+from enrichment import schedule_enrichment
+from recommender import recommend_from_favorites
+from user_profile import get_profile
+from logger_conf import get_logger, set_session_id
+import profiling
+import tracing
+import warm_cache
 
 logger = get_logger(__name__)
 DEFAULT_MIN_VOTES = 30
 
+def ask(prompt: str) -> str:
+    """input() fora do perfil do comando (o tempo esperando o usuário não é do programa)."""
+    with profiling.paused():
+        return input(prompt)
+
 def ask_int(prompt: str, allow_empty: bool = True):
-    val = input(prompt).strip()
+    val = ask(prompt).strip()
     if val == "" and allow_empty:
         return None
     if val.isdigit():
@@ -28,7 +74,7 @@ def ask_int(prompt: str, allow_empty: bool = True):
 def handle_search(last_results: list):
     page = 1
     while True:
-        term = input("Digite termo de busca (ex: 'john wick' ou 'matrix'): ").strip()
+        term = ask("Digite termo de busca (ex: 'john wick' ou 'matrix'): ").strip()
         if not term:
             print("Termo vazio — tente de novo.")
             return last_results
@@ -60,9 +106,9 @@ def handle_search(last_results: list):
 
         # ações pós-busca: favoritar / next page / voltar ao menu
         print("\nAções: [f] favoritar um item, [n] próxima página, [p] página anterior, [m] menu")
-        action = input("> ").strip().lower()
+        action = ask("> ").strip().lower()
         if action == "f":
-            choice = input("Escolha número para favoritar (1..5): ").strip()
+            choice = ask("Escolha número para favoritar (1..5): ").strip()
             if choice.isdigit():
                 idx = int(choice)-1
                 if 0 <= idx < len(last_results):
@@ -93,8 +139,15 @@ def handle_search(last_results: list):
         else:
             return last_results
 
+def match_genre(text: str, genres_map: dict) -> List[Tuple[str, int]]:
+    """Gêneros cujo nome normalizado casa com o texto (exato primeiro, senão por substring)."""
+    normalized = normalize_text(text)
+    if normalized in genres_map:
+        return [(normalized, genres_map[normalized])]
+    return [(n, i) for n, i in genres_map.items() if normalized in n]
+
 def handle_genre(last_results: list, genres_map: dict):
-    g_input = input("Digite o gênero (ex: acao, comedia) ou 'lista' para ver opções: ").strip()
+    g_input = ask("Digite o gênero (ex: acao, comedia) ou 'lista' para ver opções: ").strip()
     if not g_input:
         print("Gênero vazio — tente de novo.")
         return last_results
@@ -108,10 +161,9 @@ def handle_genre(last_results: list, genres_map: dict):
             print(" -", name)
         return last_results
 
-    normalized = normalize_text(g_input)
-    genre_id = genres_map.get(normalized)
+    genre_id = genres_map.get(normalize_text(g_input))
     if not genre_id:
-        found = [(n, i) for n, i in genres_map.items() if normalized in n]
+        found = match_genre(g_input, genres_map)
         if len(found) == 1:
             genre_id = found[0][1]
             print(f"Interpretado gênero como: {found[0][0]}")
@@ -161,7 +213,7 @@ def handle_recommendations(last_results: list):
 
     print("Escolha o número do filme da última listagem (1..N):")
     pretty_print_results(last_results, limit=len(last_results))
-    choice = input("Número: ").strip()
+    choice = ask("Número: ").strip()
     if not choice.isdigit():
         print("Escolha inválida.")
         return last_results
@@ -210,7 +262,7 @@ def handle_remove_favorite():
         print("Nenhum favorito para remover.")
         return
     pretty_print_results(favs, limit=len(favs))
-    choice = input("Digite o número do favorito para remover (1..N): ").strip()
+    choice = ask("Digite o número do favorito para remover (1..N): ").strip()
     if not choice.isdigit():
         print("Escolha inválida.")
         return
@@ -239,27 +291,212 @@ def handle_recommend_from_favorites():
         print("Nenhum gênero encontrado a partir dos favoritos.")
         return
     print(f"Top gêneros dos seus favoritos: {top_genres} (ids). Iremos buscar recomendações por esses gêneros.")
-    # chama discover para cada gênero, junta resultados e remove duplicatas
-    aggregate = []
-    seen_ids = set()
-    for gid in top_genres:
-        resp = discover_movies({"genre_id": gid, "min_vote_count": DEFAULT_MIN_VOTES, "sort_by": "vote_average.desc"})
-        if not resp:
-            continue
-        for item in resp.get("results", []):
-            mid = item.get("id")
-            if mid in seen_ids:
-                continue
-            seen_ids.add(mid)
-            aggregate.append(item)
+    # discover por gênero + ranking (nota, popularidade, afinidade de gênero), só os 10 melhores;
+    # os comandos esperam input() no meio, então o prazo cobre só a parte sem o usuário
+    with deadline():
+        aggregate = recommend_from_favorites(
+            favs,
+            top_n_genres=3,
+            profile=get_profile(),
+            sort_by="vote_average.desc",
+            min_vote_count=DEFAULT_MIN_VOTES,
+            top_k=10,
+        )
     if not aggregate:
         print("Nenhuma recomendação encontrada via favoritos.")
         return
     print(f"Mostrando top {min(10, len(aggregate))} recomendações baseadas nos seus favoritos:")
     pretty_print_results(aggregate, limit=10)
 
+# ---------- modo batch ----------
+BATCH_WORKERS = 8
+# campos de cada filme no resultado (o suficiente para identificar e ordenar)
+RESULT_FIELDS = ("id", "title", "release_date", "vote_average", "vote_count", "genre_ids")
+
+class BatchError(Exception):
+    """Operação inválida ou sem resultado; vira "error" na linha de saída."""
+
+def _slim(movies: List[Dict], limit: int) -> List[Dict]:
+    return [{k: m.get(k) for k in RESULT_FIELDS if k in m} for m in (movies or [])[:limit]]
+
+def _filtered(results: List[Dict], min_votes: int) -> List[Dict]:
+    # mesma regra da CLI: se o filtro remove tudo, ficam os originais
+    return filter_results_by_min_votes(results, min_votes=min_votes) or results
+
+def _op_search(op: dict, genres_map: dict) -> dict:
+    term = str(op.get("term") or "").strip()
+    if not term:
+        raise BatchError("termo vazio")
+    resp = search_movie(term, page=int(op.get("page", 1)))
+    if not resp:
+        raise BatchError("resposta vazia ou erro na API")
+    results = _filtered(resp.get("results", []), int(op.get("min_votes", DEFAULT_MIN_VOTES)))
+    return {"results": _slim(results, int(op.get("limit", 5))),
+            "page": resp.get("page", 1), "total_pages": resp.get("total_pages", 1)}
+
+def _op_genre(op: dict, genres_map: dict) -> dict:
+    genre = op.get("genre")
+    if isinstance(genre, int):
+        genre_id = genre
+    else:
+        found = match_genre(str(genre or ""), genres_map) if genre else []
+        if len(found) != 1:
+            raise BatchError(f"gênero ambíguo: {[n for n, _ in found]}" if found else "gênero não encontrado")
+        genre_id = found[0][1]
+    min_votes = int(op.get("min_votes", DEFAULT_MIN_VOTES))
+    params = {"genre_id": genre_id, "min_vote_count": min_votes}
+    for key in ("year", "sort_by"):
+        if op.get(key):
+            params[key] = op[key]
+    resp = discover_movies(params, page=int(op.get("page", 1)))
+    if not resp:
+        raise BatchError("resposta vazia ou erro no discover")
+    return {"genre_id": genre_id, "results": _slim(_filtered(resp.get("results", []), min_votes), int(op.get("limit", 5)))}
+
+def _op_recommendations(op: dict, genres_map: dict) -> dict:
+    if not op.get("movie_id"):
+        raise BatchError("movie_id obrigatório")
+    rec = get_recommendations(int(op["movie_id"]))
+    if not rec:
+        raise BatchError("nenhuma recomendação retornada ou erro")
+    results = _filtered(rec.get("results", []), int(op.get("min_votes", DEFAULT_MIN_VOTES)))
+    return {"results": _slim(results, int(op.get("limit", 5)))}
+
+def _op_favorite_add(op: dict, genres_map: dict) -> dict:
+    movie = op.get("movie")
+    if not movie and op.get("movie_id"):
+        details = get_movie_details(int(op["movie_id"]))
+        if not details:
+            raise BatchError("filme não encontrado")
+        details = {k: v for k, v in details.items() if k != FALLBACK_KEY}
+        # detalhes trazem "genres" [{id, name}]; favoritos guardam genre_ids
+        movie = {**details, "genre_ids": [g.get("id") for g in details.get("genres", [])]}
+    if not movie or "id" not in movie:
+        raise BatchError("movie ou movie_id obrigatório")
+    added = add_favorite(movie)
+    if added:
+        logger.info(f"Favoritado via batch: {movie.get('title')} ({movie.get('id')})")
+    return {"added": added, "id": movie["id"]}
+
+def _op_favorite_remove(op: dict, genres_map: dict) -> dict:
+    if not op.get("movie_id"):
+        raise BatchError("movie_id obrigatório")
+    removed = remove_favorite(int(op["movie_id"]))
+    if removed:
+        logger.info(f"Removido favorito via batch: {op['movie_id']}")
+    return {"removed": removed, "id": int(op["movie_id"])}
+
+def _op_favorites(op: dict, genres_map: dict) -> dict:
+    favs = list_favorites()
+    return {"results": _slim(favs, int(op.get("limit", len(favs))))}
+
+def _op_recommend_favorites(op: dict, genres_map: dict) -> dict:
+    favs = list_favorites()
+    if not favs:
+        raise BatchError("nenhum favorito salvo")
+    top_k = int(op.get("top_k", 10))
+    aggregate = recommend_from_favorites(
+        favs,
+        top_n_genres=int(op.get("top_n_genres", 3)),
+        profile=get_profile(),
+        sort_by=op.get("sort_by", "vote_average.desc"),
+        min_vote_count=int(op.get("min_votes", DEFAULT_MIN_VOTES)),
+        top_k=top_k,
+    )
+    return {"results": _slim(aggregate, top_k)}
+
+# nomes aceitos em "op" (os comandos da CLI interativa também valem)
+BATCH_OPS = {
+    "search": _op_search, "buscar": _op_search,
+    "genre": _op_genre, "genero": _op_genre, "gênero": _op_genre,
+    "recommendations": _op_recommendations, "recomendacoes": _op_recommendations,
+    "recomendações": _op_recommendations,
+    "favorite_add": _op_favorite_add, "favoritar": _op_favorite_add,
+    "favorite_remove": _op_favorite_remove, "remover": _op_favorite_remove,
+    "favorites": _op_favorites, "favoritos": _op_favorites,
+    "recommend_favorites": _op_recommend_favorites, "recomendar_favs": _op_recommend_favorites,
+}
+
+def run_op(line_no: int, line: str, genres_map: dict) -> dict:
+    """Executa uma linha JSONL e monta a linha de resultado (nunca levanta)."""
+    t0 = time.perf_counter()
+    out: Dict = {"line": line_no}
+    try:
+        op = json.loads(line)
+        if not isinstance(op, dict):
+            raise BatchError("linha não é um objeto JSON")
+        out["id"] = op.get("id")
+        out["op"] = op.get("op")
+        # registros de log desta operação levam o id dela (ou o nº da linha)
+        set_session_id(f"batch:{op.get('id') if op.get('id') is not None else line_no}")
+        fn = BATCH_OPS.get(str(op.get("op", "")).strip().lower())
+        if fn is None:
+            raise BatchError(f"operação desconhecida: {op.get('op')!r}")
+        with profiling.profile(f"batch-{op.get('op')}"), tracing.span(f"batch.{op.get('op')}", root=True, line=line_no), \
+                deadline():
+            out.update(ok=True, **fn(op, genres_map))
+    except json.JSONDecodeError as e:
+        out.update(ok=False, error=f"JSON inválido: {e}")
+    except (BatchError, TypeError, ValueError) as e:
+        out.update(ok=False, error=str(e))
+    except Exception as e:
+        out.update(ok=False, error=f"{type(e).__name__}: {e}")
+    out["elapsed_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+    return out
+
+def run_batch(source: IO[str], out: IO[str], workers: int = BATCH_WORKERS) -> Tuple[int, int]:
+    """
+    Lê operações de `source` e escreve um resultado JSONL por operação em
+    `out`, assim que cada uma termina. No máximo `workers` em execução e
+    2x isso lidas à frente (a entrada não é carregada inteira na memória).
+    Retorna (total, erros).
+    """
+    warm_cache.boot()
+    genres_map = get_genres() or {}
+    write_lock = threading.Lock()
+    slots = threading.BoundedSemaphore(workers * 2)
+    counts = {"total": 0, "errors": 0}
+
+    def job(line_no: int, line: str) -> None:
+        try:
+            result = run_op(line_no, line, genres_map)
+            with write_lock:
+                out.write(json.dumps(result, ensure_ascii=False, default=str) + "\n")
+                out.flush()
+                counts["total"] += 1
+                counts["errors"] += not result["ok"]
+        finally:
+            slots.release()
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch") as pool:
+        for line_no, line in enumerate(source, start=1):
+            if not line.strip():
+                continue
+            slots.acquire()
+            pool.submit(job, line_no, line)
+    return counts["total"], counts["errors"]
+
+def batch_main(path: str, workers: int) -> int:
+    out = sys.stdout
+    t0 = time.perf_counter()
+    # stdout é só do JSONL: avisos/erros impressos pelos módulos vão para o stderr
+    with contextlib.redirect_stdout(sys.stderr):
+        if path == "-":
+            total, errors = run_batch(sys.stdin, out, workers)
+        else:
+            with open(path, "r", encoding="utf-8") as f:
+                total, errors = run_batch(f, out, workers)
+    secs = time.perf_counter() - t0
+    rate = total / secs * 60 if secs > 0 else 0.0
+    print(f"{total} operações ({errors} com erro) em {secs:.1f}s — {rate:.0f}/min com {workers} workers.",
+          file=sys.stderr)
+    return 1 if errors else 0
+
 def input_loop():
+    # gêneros e consultas comuns vêm do snapshot em disco (sem esperar a API)
+    warm_cache.boot()
     genres_map = get_genres() or {}
+    schedule_enrichment()
     if genres_map:
         print(f"Mapeados {len(genres_map)} gêneros. Use 'lista' no comando genero para ver.")
     else:
@@ -275,51 +512,64 @@ def input_loop():
             print("Tchau! Até a próxima.")
             sys.exit(0)
 
-        if cmd in ("buscar", "search"):
-            last_results = handle_search(last_results)
-
-        elif cmd in ("genero", "gênero", "genre"):
-            last_results = handle_genre(last_results, genres_map)
-
-        elif cmd in ("recomendacoes", "recomendações", "recommendations"):
-            last_results = handle_recommendations(last_results)
-
-        elif cmd == "favoritar":
-            # atalho: pede um ID manualmente ou usa ultimo resultados
-            if not last_results:
-                print("Sem resultados recentes para favoritar. Faça uma busca primeiro.")
-                continue
-            pretty_print_results(last_results, limit=len(last_results))
-            choice = input("Escolha número para favoritar (1..N): ").strip()
-            if not choice.isdigit():
-                print("Escolha inválida.")
-                continue
-            idx = int(choice) - 1
-            if idx < 0 or idx >= len(last_results):
-                print("Índice inválido.")
-                continue
-            movie = last_results[idx]
-            ok = add_favorite(movie)
-            if ok:
-                logger.info(f"Favoritado via comando: {movie.get('title')} ({movie.get('id')})")
-                print("Favorito adicionado.")
-            else:
-                print("Já era favorito.")
+        # MOVIEBOT_PROFILE / --profile: cada comando vira um perfil em data/profiles/
+        # (as perguntas ao usuário, via ask(), ficam fora dele)
+        with profiling.profile(f"cli-{cmd or 'vazio'}"), tracing.span(f"cli.{cmd or 'vazio'}", root=True):
+            if cmd in ("buscar", "search"):
+                last_results = handle_search(last_results)
+
+            elif cmd in ("genero", "gênero", "genre"):
+                last_results = handle_genre(last_results, genres_map)
+
+            elif cmd in ("recomendacoes", "recomendações", "recommendations"):
+                last_results = handle_recommendations(last_results)
+
+            elif cmd == "favoritar":
+                # atalho: pede um ID manualmente ou usa ultimo resultados
+                if not last_results:
+                    print("Sem resultados recentes para favoritar. Faça uma busca primeiro.")
+                    continue
+                pretty_print_results(last_results, limit=len(last_results))
+                choice = ask("Escolha número para favoritar (1..N): ").strip()
+                if not choice.isdigit():
+                    print("Escolha inválida.")
+                    continue
+                idx = int(choice) - 1
+                if idx < 0 or idx >= len(last_results):
+                    print("Índice inválido.")
+                    continue
+                movie = last_results[idx]
+                ok = add_favorite(movie)
+                if ok:
+                    logger.info(f"Favoritado via comando: {movie.get('title')} ({movie.get('id')})")
+                    print("Favorito adicionado.")
+                else:
+                    print("Já era favorito.")
 
-        elif cmd == "favoritos":
-            handle_list_favorites()
+            elif cmd == "favoritos":
+                handle_list_favorites()
 
-        elif cmd == "remover":
-            handle_remove_favorite()
+            elif cmd == "remover":
+                handle_remove_favorite()
 
-        elif cmd == "recomendar_favs":
-            handle_recommend_from_favorites()
+            elif cmd == "recomendar_favs":
+                handle_recommend_from_favorites()
 
-        else:
-            print("Comando não reconhecido. Use: buscar / genero / recomendacoes / favoritos / favoritar / remover / recomendar_favs / sair")
+            else:
+                print("Comando não reconhecido. Use: buscar / genero / recomendacoes / favoritos / favoritar / remover / recomendar_favs / sair")
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="MovieBot na linha de comando.")
+    parser.add_argument("--batch", metavar="ARQUIVO", help="operações em JSONL ('-' para stdin); sem isso, modo interativo")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS, help="operações em paralelo no modo batch")
+    parser.add_argument("--profile", nargs="?", const="cprofile", choices=("cprofile", "sample"),
+                        help="perfila cada comando/operação (arquivos em data/profiles/)")
+    args = parser.parse_args()
+    if args.profile:
+        profiling.MODE = args.profile
+    if args.batch:
+        sys.exit(batch_main(args.batch, max(1, args.workers)))
     try:
         input_loop()
     except KeyboardInterrupt:
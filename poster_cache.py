@@ -0,0 +1,199 @@
+# poster_cache.py
+"""
+Cache local de pôsteres + proxy HTTP para servi-los.
+
+Cada pôster é baixado do image.tmdb.org uma vez, reduzido para a largura em
+que aparece no app (120px nos cards, 300px no "Detalhes") e salvo em
+data/posters/. Por padrão o app entrega o arquivo local pelo próprio
+Streamlit (st.image com o caminho); ainda não baixado, usa a URL do TMDB.
+
+Opcionalmente, um servidor HTTP pequeno (thread daemon) entrega esses
+arquivos com cache longo: os caminhos do TMDB nunca mudam de conteúdo, então
+o navegador não precisa pedir de novo. Se o arquivo ainda não existe, o
+proxy busca na hora. Ele só liga com MOVIEBOT_POSTER_PROXY_URL definido: é o
+endereço pelo qual o navegador chega nele (um reverse proxy https no mesmo
+domínio do app, por exemplo), que o app não tem como adivinhar.
+
+A redução usa Pillow, se instalado (`pip install pillow`); sem ele, guarda o
+tamanho do TMDB mais próximo sem redimensionar.
+"""
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from typing import Iterable, Optional
+
+import requests
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow é opcional
+    Image = None
+
+from logger_conf import get_logger
+
+logger = get_logger(__name__)
+
+POSTER_DIR = os.path.join(os.path.dirname(__file__), "data", "posters")
+TMDB_IMAGE_URL = "https://image.tmdb.org/t/p"
+
+# largura exibida -> tamanho do TMDB a baixar (o menor que não fica abaixo dela)
+SIZES = {120: "w154", 300: "w342"}
+JPEG_QUALITY = 85
+
+# endereço que o navegador usa para chegar no proxy; sem ele, o proxy não sobe
+PROXY_URL = os.getenv("MOVIEBOT_POSTER_PROXY_URL", "").rstrip("/")
+PROXY_ENABLED = bool(PROXY_URL) and os.getenv("MOVIEBOT_POSTER_PROXY", "1") != "0"
+PROXY_HOST = os.getenv("MOVIEBOT_POSTER_PROXY_HOST", "127.0.0.1")
+PROXY_PORT = int(os.getenv("MOVIEBOT_POSTER_PROXY_PORT", "8599"))
+# resposta do /health do proxy: quem já ocupa a porta precisa ser um de nós
+HEALTH_BODY = b'{"service": "moviebot-posters"}'
+
+_PATH_RE = re.compile(r"^/[A-Za-z0-9_\-]+\.(jpg|jpeg|png)$")
+_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="posters")
+_LOCK = threading.Lock()
+_SERVER: Optional[ThreadingHTTPServer] = None
+_PROXY_UP = False       # proxy servido por este processo ou por outro worker do host
+_PENDING: set = set()
+
+def _local_file(poster_path: str, width: int) -> str:
+    return os.path.join(POSTER_DIR, str(width), poster_path.lstrip("/").rsplit(".", 1)[0] + ".jpg")
+
+def _valid(poster_path: str, width: int) -> bool:
+    return width in SIZES and bool(poster_path) and bool(_PATH_RE.match(poster_path))
+
+def fetch_poster(poster_path: str, width: int = 120) -> Optional[str]:
+    """Caminho do arquivo local do pôster (baixando e reduzindo se ainda não existe), ou None."""
+    if not _valid(poster_path, width):
+        return None
+    path = _local_file(poster_path, width)
+    if os.path.exists(path):
+        return path
+    try:
+        resp = requests.get(f"{TMDB_IMAGE_URL}/{SIZES[width]}{poster_path}", timeout=10)
+        if resp.status_code != 200:
+            return None
+        data = resp.content
+        if Image is not None:
+            img = Image.open(BytesIO(data)).convert("RGB")
+            if img.width > width:
+                img = img.resize((width, round(img.height * width / img.width)), Image.LANCZOS)
+            out = BytesIO()
+            img.save(out, "JPEG", quality=JPEG_QUALITY, optimize=True)
+            data = out.getvalue()
+    except Exception as e:
+        logger.warning("poster_cache: erro ao buscar pôster: %s", e)
+        return None
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+    return path
+
+def _fetch_job(poster_path: str, width: int) -> None:
+    try:
+        fetch_poster(poster_path, width)
+    finally:
+        with _LOCK:
+            _PENDING.discard((poster_path, width))
+
+def prefetch_posters(poster_paths: Iterable[str], width: int = 120) -> None:
+    """Baixa em background (em lote) os pôsteres que ainda não estão no disco."""
+    for p in poster_paths:
+        if not _valid(p, width) or os.path.exists(_local_file(p, width)):
+            continue
+        with _LOCK:
+            if (p, width) in _PENDING:
+                continue
+            _PENDING.add((p, width))
+        _EXECUTOR.submit(_fetch_job, p, width)
+
+def poster_source(poster_path: Optional[str], width: int = 120) -> Optional[str]:
+    """
+    O que passar para st.image: a URL do proxy, se ele está no ar; senão o
+    arquivo local já reduzido (o Streamlit entrega os bytes); senão a URL do TMDB.
+    """
+    if not poster_path:
+        return None
+    if _valid(poster_path, width):
+        if _PROXY_UP:
+            return f"{PROXY_URL}/poster/{width}{poster_path}"
+        path = _local_file(poster_path, width)
+        if os.path.exists(path):
+            return path
+    return f"{TMDB_IMAGE_URL}/{SIZES.get(width, 'w200')}{poster_path}"
+
+# ---------- proxy ----------
+class _PosterHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/health":
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(HEALTH_BODY)))
+            self.end_headers()
+            self.wfile.write(HEALTH_BODY)
+            return
+        # /poster/<largura>/<arquivo>
+        m = re.match(r"^/poster/(\d+)(/[^/?#]+)$", self.path)
+        path = fetch_poster(m.group(2), int(m.group(1))) if m else None
+        if path is None:
+            self.send_error(404)
+            return
+        etag = '"%s"' % os.path.basename(path)
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        with open(path, "rb") as f:
+            body = f.read()
+        self.send_response(200)
+        self.send_header("Content-Type", "image/jpeg")
+        self.send_header("Content-Length", str(len(body)))
+        # o conteúdo de um caminho do TMDB nunca muda: cache de 1 ano
+        self.send_header("Cache-Control", "public, max-age=31536000, immutable")
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # sem log por requisição
+
+def _port_is_ours() -> bool:
+    """A porta ocupada é de outro worker do MovieBot (e não de um processo qualquer)?"""
+    try:
+        resp = requests.get(f"http://{PROXY_HOST}:{PROXY_PORT}/health", timeout=1)
+        return resp.status_code == 200 and resp.content == HEALTH_BODY
+    except requests.exceptions.RequestException:
+        return False
+
+def start_proxy() -> bool:
+    """
+    Sobe o proxy uma vez por processo, se MOVIEBOT_POSTER_PROXY_URL estiver
+    definido. Com a porta em uso, só a aproveita se quem responde é o proxy de
+    outro worker; senão fica sem proxy (pôsteres saem pelo st.image).
+    """
+    global _SERVER, _PROXY_UP
+    if not PROXY_ENABLED:
+        return False
+    with _LOCK:
+        if _PROXY_UP:
+            return True
+        try:
+            server = ThreadingHTTPServer((PROXY_HOST, PROXY_PORT), _PosterHandler)
+        except OSError as e:
+            # outro worker deste host pode já servir a porta (e ler o mesmo data/posters/)
+            if not _port_is_ours():
+                logger.warning("poster_cache: porta %s ocupada por outro serviço, proxy desligado: %s", PROXY_PORT, e)
+                return False
+            server = None
+        if server is not None:
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, name="poster-proxy", daemon=True).start()
+            _SERVER = server
+        _PROXY_UP = True
+        return True
@@ -0,0 +1,77 @@
+# prefetch.py
+"""
+Pré-busca em background para a aba de busca.
+
+Enquanto o usuário olha uma página, as N páginas vizinhas (antes e depois)
+e os vídeos dos cards visíveis são buscados num pool de threads e ficam no
+cache do tmdb_client (que é do processo, compartilhado entre sessões); os
+pôsteres dessas páginas vão para o poster_cache. A troca de página só lê do
+cache; se a página ainda estiver a caminho, espera a busca que já está
+rodando em vez de abrir outra.
+"""
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterable, Optional, Tuple
+
+import poster_cache
+from tmdb_client import get_movie_videos, search_movie
+
+# páginas vizinhas aquecidas para cada lado
+PREFETCH_PAGES = 2
+MAX_WORKERS = 4
+
+_EXECUTOR = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="prefetch")
+_INFLIGHT: Dict[Tuple, Future] = {}
+_LOCK = threading.Lock()
+
+def _submit(key: Tuple, fn, *args) -> Optional[Future]:
+    """
+    Agenda fn(*args) uma vez por chave; pedidos repetidos enquanto roda reaproveitam o job.
+    Depois de pronto, um novo pedido só custa uma leitura do cache do tmdb_client.
+    """
+    with _LOCK:
+        fut = _INFLIGHT.get(key)
+        if fut is not None:
+            return fut
+        fut = _EXECUTOR.submit(fn, *args)
+        _INFLIGHT[key] = fut
+    fut.add_done_callback(lambda f: _done(key))
+    return fut
+
+def _done(key: Tuple) -> None:
+    with _LOCK:
+        _INFLIGHT.pop(key, None)
+
+def _search_page_job(term: str, page: int) -> dict:
+    resp = search_movie(term, page=page)
+    # pôsteres da página aquecida vão junto, num lote
+    poster_cache.prefetch_posters(m.get("poster_path") for m in (resp or {}).get("results", []))
+    return resp
+
+def prefetch_search_pages(term: str, page: int, total_pages: int, n: int = PREFETCH_PAGES) -> None:
+    """Aquece as páginas page±1..n da busca `term` (sem bloquear)."""
+    if not term or not str(term).strip():
+        return
+    for offset in range(1, n + 1):
+        for p in (page + offset, page - offset):
+            if 1 <= p <= (total_pages or 1):
+                _submit(("search", term, p), _search_page_job, term, p)
+
+def prefetch_videos(movie_ids: Iterable[int]) -> None:
+    """Aquece /videos dos filmes (usados no "Detalhes") sem bloquear."""
+    for mid in movie_ids:
+        if mid:
+            _submit(("videos", mid), get_movie_videos, mid)
+
+def get_search_page(term: str, page: int) -> dict:
+    """Página da busca: do cache se já aquecida, esperando a pré-busca em andamento, ou buscando agora."""
+    with _LOCK:
+        fut = _INFLIGHT.get(("search", term, page))
+    if fut is not None:
+        try:
+            resp = fut.result()
+            if resp:
+                return resp
+        except Exception:
+            pass
+    return search_movie(term, page=page)
@@ -0,0 +1,259 @@
+# profiling.py
+"""
+Profiling sob demanda de reruns do Streamlit e comandos do main.py.
+
+Desligado por padrão (custo: uma checagem por execução). Liga com
+MOVIEBOT_PROFILE (ou ?profile= na URL do app, ou --profile no main.py):
+  - "cprofile" (ou "1"): determinístico, grava <run>.pstats (abre com
+    `python -m pstats`, snakeviz, gprof2dot);
+  - "sample": amostra a pilha da thread a cada MOVIEBOT_PROFILE_INTERVAL_MS
+    (bem mais barato), grava <run>.folded (pilhas colapsadas, para
+    flamegraph.pl / speedscope).
+Nos dois modos também grava <run>.txt com os TOP_N pontos mais quentes e
+loga uma linha com a duração. Arquivos em data/profiles/ (só os MAX_FILES
+execuções mais recentes ficam).
+
+Uma execução por thread: perfis aninhados (ex: o fragmento de uma aba
+dentro do rerun inteiro) ficam no de fora. Só uma thread por vez usa o
+cProfile; as outras (sessões ou workers do lote simultâneos) caem para a
+amostragem. Esperas pelo usuário (input() no
+CLI) ficam de fora com `paused()`.
+
+No app, ?profile= só vale com MOVIEBOT_PROFILE_ALLOW_QUERY=1 (senão qualquer
+visitante ligaria o cProfile no servidor).
+"""
+import cProfile
+import io
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Optional
+
+from logger_conf import get_logger
+
+logger = get_logger(__name__)
+
+PROFILE_DIR = os.path.join(os.path.dirname(__file__), "data", "profiles")
+MODE = os.getenv("MOVIEBOT_PROFILE", "")
+ALLOW_QUERY = os.getenv("MOVIEBOT_PROFILE_ALLOW_QUERY", "") == "1"
+INTERVAL = float(os.getenv("MOVIEBOT_PROFILE_INTERVAL_MS", "5")) / 1000
+TOP_N = 25
+# execuções guardadas (cada uma gera 2 arquivos)
+MAX_FILES = 200
+
+_MODES = {"1": "cprofile", "true": "cprofile", "cprofile": "cprofile", "sample": "sample"}
+_LOCAL = threading.local()
+# só um cProfile ativo por processo (no Python 3.12+ ele usa sys.monitoring, que
+# recusa um segundo); quem chega com ele ocupado perfila por amostragem
+_CPROFILE_LOCK = threading.Lock()
+_CPROFILE_OWNER = None
+
+def mode_for(value: Optional[str] = None) -> Optional[str]:
+    """Modo efetivo: o pedido (query param/flag) ou o do ambiente; None = desligado."""
+    return _MODES.get(str(value or MODE).strip().lower())
+
+class Sampler:
+    """Amostra a pilha de uma thread em intervalos fixos (sys._current_frames)."""
+
+    def __init__(self, thread_id: int, interval: float = INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.paused = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler-sampler", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            if self.paused:
+                continue
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
+
+    def summary(self, n: int = TOP_N) -> str:
+        total = sum(self.stacks.values())
+        own, inclusive = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            own[frames[-1]] += count
+            for f in set(frames):
+                inclusive[f] += count
+        lines = [f"{total} amostras a cada {self.interval * 1000:.0f} ms", "", "próprio  (% amostras)"]
+        lines += [f"{c / total:7.1%}  {f}" for f, c in own.most_common(n)]
+        lines += ["", "inclusivo  (% amostras)"]
+        lines += [f"{c / total:7.1%}  {f}" for f, c in inclusive.most_common(n)]
+        if not total:
+            lines.append("(execução mais curta que o intervalo de amostragem)")
+        return "\n".join(lines) + "\n"
+
+def _base_path(label: str) -> str:
+    safe = re.sub(r"[^A-Za-z0-9_.-]+", "-", label).strip("-") or "run"
+    stamp = time.strftime("%Y%m%d-%H%M%S") + f"-{int(time.time() * 1000) % 1000:03d}"
+    return os.path.join(PROFILE_DIR, f"{stamp}-{safe}-{os.getpid()}-{threading.get_ident()}")
+
+def _cleanup() -> None:
+    try:
+        runs = sorted({name.rsplit(".", 1)[0] for name in os.listdir(PROFILE_DIR)})
+    except OSError:
+        return
+    for run in runs[:-MAX_FILES]:
+        for ext in (".pstats", ".folded", ".txt"):
+            try:
+                os.remove(os.path.join(PROFILE_DIR, run + ext))
+            except OSError:
+                pass
+
+def _write(label: str, mode: str, profiler, elapsed: float) -> str:
+    base = _base_path(label)
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    if mode == "cprofile":
+        profiler.dump_stats(base + ".pstats")
+        buf = io.StringIO()
+        pstats.Stats(profiler, stream=buf).sort_stats("cumulative").print_stats(TOP_N)
+        summary = buf.getvalue()
+    else:
+        with open(base + ".folded", "w", encoding="utf-8") as f:
+            f.write(profiler.folded())
+        summary = profiler.summary()
+    with open(base + ".txt", "w", encoding="utf-8") as f:
+        f.write(f"{label}: {elapsed * 1000:.1f} ms ({mode})\n\n{summary}")
+    _cleanup()
+    return base
+
+def start(label: str, mode: Optional[str] = None, replace: bool = False):
+    """
+    Começa a perfilar a thread atual; devolve um token para `stop` (None se
+    desligado ou se esta thread já está sendo perfilada). Com `replace`
+    (início de um rerun inteiro), um perfil largado aberto por um rerun
+    interrompido é descartado antes.
+    """
+    mode = mode_for(mode)
+    if mode is None:
+        return None
+    current = getattr(_LOCAL, "active", None)
+    if current is not None:
+        if not replace:
+            return None  # aninhado: fica no perfil de fora
+        stop(current, write=False)
+    token = {"label": label, "mode": mode, "profiler": None, "t0": time.perf_counter()}
+    if mode == "cprofile" and not _claim_cprofile(token):
+        token["mode"] = "sample"
+    if token["mode"] == "sample":
+        token["profiler"] = Sampler(threading.get_ident())
+        token["profiler"].start()
+    _LOCAL.active = token
+    return token
+
+def _claim_cprofile(token) -> bool:
+    """Liga o cProfile para `token` se nenhum outro estiver ativo no processo."""
+    global _CPROFILE_OWNER
+    with _CPROFILE_LOCK:
+        if _CPROFILE_OWNER is not None:
+            return False
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError as e:  # outra ferramenta já usa sys.monitoring
+            logger.debug("profiling: cProfile indisponível (%s), usando amostragem", e)
+            return False
+        _CPROFILE_OWNER = token
+    token["profiler"] = profiler
+    return True
+
+def _release_cprofile(token) -> None:
+    global _CPROFILE_OWNER
+    with _CPROFILE_LOCK:
+        if _CPROFILE_OWNER is token:
+            _CPROFILE_OWNER = None
+
+def stop(token, write: bool = True) -> Optional[str]:
+    """Encerra o perfil e grava os arquivos. Retorna o caminho base (sem extensão)."""
+    if token is None:
+        return None
+    elapsed = time.perf_counter() - token["t0"]
+    profiler = token["profiler"]
+    if token["mode"] == "cprofile":
+        profiler.disable()
+        _release_cprofile(token)
+    else:
+        profiler.stop()
+    if getattr(_LOCAL, "active", None) is token:
+        _LOCAL.active = None
+    if not write:
+        return None
+    try:
+        base = _write(token["label"], token["mode"], profiler, elapsed)
+    except Exception as e:
+        logger.warning("profiling: erro ao gravar perfil: %s", e)
+        return None
+    logger.info("perfil %s: %.1f ms -> %s.txt", token["label"], elapsed * 1000, base,
+                extra={"endpoint": token["label"], "latency_ms": round(elapsed * 1000, 1)})
+    return base
+
+@contextmanager
+def paused():
+    """Tira o bloco (ex: input() esperando o usuário) do perfil ativo desta thread e da duração dele."""
+    token = getattr(_LOCAL, "active", None)
+    if token is None:
+        yield
+        return
+    profiler = token["profiler"]
+    t0 = time.perf_counter()
+    if token["mode"] == "cprofile":
+        profiler.disable()
+    else:
+        profiler.paused = True
+    try:
+        yield
+    finally:
+        if token["mode"] == "cprofile":
+            profiler.enable()
+        else:
+            profiler.paused = False
+        token["t0"] += time.perf_counter() - t0
+
+@contextmanager
+def profile(label: str, mode: Optional[str] = None):
+    """Perfila o bloco se o profiling estiver ligado (env ou `mode`)."""
+    token = start(label, mode)
+    try:
+        yield token
+    finally:
+        stop(token)
+
+def profiled(label: Optional[str] = None, mode: Optional[Callable[[], Optional[str]]] = None):
+    """Decorador: perfila cada chamada. `mode` é chamado a cada vez (ex: lê o query param)."""
+    def decorate(fn):
+        name = label or fn.__name__
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            token = start(name, mode() if mode else None)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                stop(token)
+        return wrapper
+    return decorate
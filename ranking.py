@@ -0,0 +1,124 @@
+# ranking.py
+"""
+Motor de ranking compartilhado pelos recomendadores.
+
+Recebe os candidatos em colunas (arrays NumPy de nota, popularidade, matriz
+esparsa de gêneros e similaridade de texto), calcula todos os sinais com
+operações vetoriais e devolve só o top-k via seleção parcial
+(`np.argpartition`), sem ordenar a lista inteira.
+"""
+from typing import Dict, List, Optional
+
+import numpy as np
+import scipy.sparse as sp
+
+class CandidateFeatures:
+    """Features colunares de N candidatos (linha i <-> movies[i])."""
+
+    def __init__(self, movies: List[Dict]):
+        self.movies = movies
+        n = len(movies)
+        self.ids = np.array([m.get("id") or 0 for m in movies], dtype=np.int64)
+        self.vote = np.array([float(m.get("vote_average") or 0.0) for m in movies])
+        self.popularity = np.array([float(m.get("popularity") or 0.0) for m in movies])
+
+        # matriz (N, G) de gêneros: 1 se o candidato tem o gênero da coluna j
+        self.genre_ids: List[int] = []
+        col_of: Dict[int, int] = {}
+        rows, cols = [], []
+        for i, m in enumerate(movies):
+            for gid in m.get("genre_ids") or []:
+                try:
+                    gid = int(gid)
+                except (ValueError, TypeError):
+                    continue
+                if gid not in col_of:
+                    col_of[gid] = len(self.genre_ids)
+                    self.genre_ids.append(gid)
+                rows.append(i)
+                cols.append(col_of[gid])
+        self.genres = sp.csr_matrix(
+            (np.ones(len(rows)), (rows, cols)), shape=(n, len(self.genre_ids))
+        )
+
+    def __len__(self) -> int:
+        return len(self.movies)
+
+    def genre_affinity(self, genre_weights: Dict[int, float]) -> np.ndarray:
+        """Soma dos pesos dos gêneros de cada candidato (um produto matriz x vetor)."""
+        w = np.array([genre_weights.get(gid, 0.0) for gid in self.genre_ids])
+        if not len(w):
+            return np.zeros(len(self))
+        return self.genres @ w
+
+def minmax(a: np.ndarray, keep_flat: bool = False) -> np.ndarray:
+    """Normaliza para [0, 1]. Array constante vira zeros (ou fica como está, com keep_flat)."""
+    a = np.asarray(a, dtype=float)
+    if not a.size:
+        return a
+    lo, hi = a.min(), a.max()
+    if hi - lo > 0:
+        return (a - lo) / (hi - lo)
+    return a if keep_flat else np.zeros_like(a)
+
+def compute_signals(features: CandidateFeatures, genre_weights: Optional[Dict[int, float]] = None,
+                    text_sim: Optional[np.ndarray] = None, extra: Optional[Dict[str, np.ndarray]] = None) -> Dict[str, np.ndarray]:
+    """
+    Sinais por candidato, todos arrays de tamanho N:
+      - vote / popularity: nota e popularidade normalizadas
+      - quality: 0.6 * vote + 0.4 * popularity, renormalizado
+      - genre_raw / genre: afinidade de gênero (bruta e normalizada)
+      - text: similaridade de cosseno, sem reescala (zeros se não houver)
+      - qualquer sinal em `extra` (ex: grafo), normalizado
+    """
+    vote = minmax(features.vote)
+    pop = minmax(features.popularity)
+    genre_raw = features.genre_affinity(genre_weights or {})
+    signals = {
+        "vote": vote,
+        "popularity": pop,
+        "quality": minmax(0.6 * vote + 0.4 * pop, keep_flat=True),
+        "genre_raw": genre_raw,
+        "genre": minmax(genre_raw, keep_flat=True),
+        # cosseno de vetores TF-IDF já fica em [0, 1]: sem reescalar por pedido, o
+        # mesmo par perfil/filme pesa igual em qualquer lista de candidatos
+        "text": np.clip(text_sim, 0.0, 1.0) if text_sim is not None else np.zeros(len(features)),
+    }
+    for name, values in (extra or {}).items():
+        signals[name] = minmax(values, keep_flat=True)
+    return signals
+
+def top_k_indices(scores: np.ndarray, k: Optional[int] = None) -> np.ndarray:
+    """Índices dos k maiores scores em ordem decrescente (empates mantêm a ordem original)."""
+    n = len(scores)
+    if k is None or k >= n:
+        return np.argsort(-scores, kind="stable")
+    if k <= 0:
+        return np.array([], dtype=int)
+    # argpartition escolhe qualquer um entre os empatados no k-ésimo valor:
+    # completa com os primeiros deles, como o argsort estável faria
+    threshold = scores[np.argpartition(-scores, k - 1)[k - 1]]
+    above = np.flatnonzero(scores > threshold)
+    ties = np.flatnonzero(scores == threshold)[: k - len(above)]
+    part = np.concatenate([above, ties])
+    return part[np.argsort(-scores[part], kind="stable")]
+
+def rank(features: CandidateFeatures, weights: Dict[str, float], genre_weights: Optional[Dict[int, float]] = None,
+         text_sim: Optional[np.ndarray] = None, extra: Optional[Dict[str, np.ndarray]] = None,
+         k: Optional[int] = None, exclude_ids: Optional[set] = None) -> List[Dict]:
+    """
+    Combina os sinais com `weights` ({nome_do_sinal: peso}) e devolve os k
+    melhores filmes, já ordenados. `exclude_ids` remove candidatos (ex: favoritos).
+    """
+    if not len(features):
+        return []
+    signals = compute_signals(features, genre_weights, text_sim, extra)
+    scores = np.zeros(len(features))
+    for name, w in weights.items():
+        if w:
+            scores += w * signals[name]
+    if exclude_ids:
+        mask = np.isin(features.ids, np.fromiter((int(i) for i in exclude_ids if i is not None), dtype=np.int64))
+        scores[mask] = -np.inf
+        k = min(k if k is not None else len(features), int((~mask).sum()))
+    return [features.movies[i] for i in top_k_indices(scores, k)]
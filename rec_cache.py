@@ -0,0 +1,181 @@
+# rec_cache.py
+"""
+Cache de recomendações compartilhado entre sessões e processos.
+
+A chave é um hash estável dos ids dos favoritos + parâmetros do recomendador
+(pesos, limites, engine) + versão do modelo de texto (um reajuste, que vem
+com o catálogo novo, muda a chave). Os resultados ficam em memória e em
+data/rec_cache/<hash_favoritos>-<hash_parametros>.json, então outra sessão
+do Streamlit, outro worker ou o job em lote reaproveitam o mesmo cálculo.
+Quando os favoritos mudam, as entradas do conjunto antigo são apagadas; a
+cada gravação, arquivos vencidos (ou além de MAX_DISK_ENTRIES) também.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional
+
+import graph_rec
+from favorites import add_listener, list_favorites
+from text_model import get_text_model
+from tmdb_client import watch_fallbacks
+from logger_conf import get_logger
+
+logger = get_logger(__name__)
+
+CACHE_DIR = os.path.join(os.path.dirname(__file__), "data", "rec_cache")
+
+# recomendações dependem do discover/catálogo, que mudam devagar
+TTL_SECONDS = float(os.getenv("MOVIEBOT_REC_CACHE_TTL", str(6 * 3600)))
+MAX_MEMORY_ENTRIES = 256
+MAX_DISK_ENTRIES = int(os.getenv("MOVIEBOT_REC_CACHE_MAX_FILES", "2000"))
+
+_MEMORY: "OrderedDict[str, Dict]" = OrderedDict()
+_LOCK = threading.Lock()
+
+def _hash(obj) -> str:
+    raw = json.dumps(obj, sort_keys=True, ensure_ascii=True, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+def favorites_fingerprint(fav_ids: Iterable[int]) -> str:
+    """Hash dos ids (ordem e duplicatas não importam)."""
+    return _hash(sorted({int(i) for i in fav_ids if i}))
+
+def make_key(fav_ids: Iterable[int], params: Dict) -> str:
+    fav_ids = list(fav_ids)
+    model = get_text_model()
+    extra = {"text_model": model.version if model else None}
+    if params.get("weight_graph"):
+        # com o grafo ainda frio (arestas buscadas em background) a lista sai sem
+        # o sinal do grafo; outra chave evita servi-la depois que ele fica pronto
+        extra["graph_ready"] = not graph_rec.missing_edges(fav_ids)
+    return f"{favorites_fingerprint(fav_ids)}-{_hash({**params, **extra})}"
+
+def _path(key: str) -> str:
+    return os.path.join(CACHE_DIR, f"{key}.json")
+
+def get(key: str) -> Optional[List[Dict]]:
+    now = time.time()
+    with _LOCK:
+        entry = _MEMORY.get(key)
+        if entry is not None:
+            if now - entry["created"] <= TTL_SECONDS:
+                _MEMORY.move_to_end(key)
+                return entry["results"]
+            del _MEMORY[key]
+    # outro processo pode ter calculado
+    try:
+        with open(_path(key), "r", encoding="utf-8") as f:
+            entry = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    if now - entry.get("created", 0) > TTL_SECONDS:
+        return None
+    _remember(key, entry)
+    return entry["results"]
+
+def _remember(key: str, entry: Dict) -> None:
+    with _LOCK:
+        _MEMORY[key] = entry
+        _MEMORY.move_to_end(key)
+        while len(_MEMORY) > MAX_MEMORY_ENTRIES:
+            _MEMORY.popitem(last=False)
+
+def put(key: str, results: List[Dict]) -> None:
+    entry = {"created": time.time(), "results": results}
+    _remember(key, entry)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp = _path(key) + f".{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp, _path(key))
+    except Exception as e:
+        logger.error("rec_cache: erro ao gravar: %s", e)
+    prune()
+
+def prune(max_entries: int = MAX_DISK_ENTRIES) -> int:
+    """Apaga do disco as entradas vencidas e, passando de `max_entries`, as mais antigas. Retorna quantas."""
+    try:
+        names = [n for n in os.listdir(CACHE_DIR) if n.endswith(".json")]
+    except FileNotFoundError:
+        return 0
+    entries = []
+    for name in names:
+        try:
+            entries.append((os.path.getmtime(os.path.join(CACHE_DIR, name)), name))
+        except OSError:
+            pass
+    entries.sort(reverse=True)
+    limit = time.time() - TTL_SECONDS
+    old = [name for i, (mtime, name) in enumerate(entries) if i >= max_entries or mtime < limit]
+    removed = 0
+    for name in old:
+        try:
+            os.remove(os.path.join(CACHE_DIR, name))
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+def get_or_compute(fav_ids: Iterable[int], params: Dict, compute: Callable[[], List[Dict]],
+                   key: Optional[str] = None) -> List[Dict]:
+    """
+    Devolve do cache se houver; senão chama `compute()` e guarda o resultado —
+    a não ser que algum candidato tenha vindo de fallback do TMDB (lista
+    degradada: serve agora, mas a próxima chamada calcula de novo).
+
+    `key` é a de make_key(fav_ids, params) calculada por quem chama *antes*
+    do cálculo: a chave inclui o estado do grafo, que as arestas buscadas em
+    background durante o cálculo podem mudar; quem guarda a lista em outro
+    lugar (shared_store) precisa usar a mesma.
+    """
+    if key is None:
+        key = make_key(fav_ids, params)
+    cached = get(key)
+    if cached is not None:
+        return cached
+    with watch_fallbacks() as seen:
+        results = compute()
+    if not seen["count"]:
+        put(key, results)
+    return results
+
+def invalidate_favorites(fav_ids: Iterable[int]) -> int:
+    """Apaga todas as entradas (qualquer parâmetro) de um conjunto de favoritos. Retorna quantas."""
+    prefix = favorites_fingerprint(fav_ids) + "-"
+    removed = 0
+    with _LOCK:
+        for key in [k for k in _MEMORY if k.startswith(prefix)]:
+            del _MEMORY[key]
+    try:
+        names = os.listdir(CACHE_DIR)
+    except FileNotFoundError:
+        return removed
+    for name in names:
+        if name.startswith(prefix) and name.endswith(".json"):
+            try:
+                os.remove(os.path.join(CACHE_DIR, name))
+                removed += 1
+            except OSError:
+                pass
+    return removed
+
+def ids_before(event: str, movie: Dict) -> set:
+    """Ids dos favoritos antes da mudança avisada pelo listener (a lista já está atualizada)."""
+    ids = {f.get("id") for f in list_favorites()}
+    mid = movie.get("id")
+    if event == "add":
+        return ids - {mid}
+    if event == "remove":
+        return ids | {mid}
+    # enriquecimento: mesmos ids, mas o texto dos favoritos mudou
+    return ids
+
+def on_favorites_changed(event: str, movie: Dict) -> None:
+    invalidate_favorites(ids_before(event, movie))
+
+add_listener(on_favorites_changed)
@@ -0,0 +1,196 @@
+# recommender.py
+"""
+Recomendadores baseados nos favoritos (antes definidos dentro do app.py).
+
+Ambos usam o motor de `ranking`: coletam candidatos via /discover nos
+gêneros preferidos do perfil, montam as features em colunas e pedem só o
+top-k. `discover_fn` permite ao app passar a versão com st.cache_data.
+"""
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+from sklearn.metrics.pairwise import cosine_similarity
+
+import tracing
+from ann_index import nearest_movies
+from graph_rec import graph_candidates, graph_scores, schedule_edges
+from ranking import CandidateFeatures, rank
+from text_model import get_text_model, tfidf_vectorizer
+from tmdb_client import discover_movies, share_deadline
+from user_profile import UserProfile
+
+# parâmetros da aba de recomendações do app; o pré-cálculo em lote usa os mesmos
+# para gerar exatamente a mesma chave no rec_cache
+APP_TFIDF_PARAMS = {
+    "top_n_genres": 3,
+    "candidates_per_genre": 50,
+    "max_candidates": 400,
+    "weight_tfidf": 0.45,
+    "weight_genre": 0.15,
+    "weight_score": 0.2,
+    "weight_graph": 0.2,
+    # a lista inteira, ordenada: a aba desenha em janelas ("Carregar mais")
+    "top_k": None,
+}
+APP_CACHE_PARAMS = {"engine": "tfidf", **APP_TFIDF_PARAMS}
+
+def _discover_candidates(top_genres: List[int], discover_fn: Callable, min_vote_count: int, sort_by: str,
+                         per_genre: int, max_candidates: Optional[int] = None,
+                         exclude_ids: Optional[set] = None, into: Optional[Dict[int, Dict]] = None) -> Dict[int, Dict]:
+    """
+    Candidatos do discover nos gêneros preferidos. Com `into`, completa esse
+    dict (de outras fontes) até `max_candidates` no total: repetidos não contam.
+    """
+    candidates: Dict[int, Dict] = {} if into is None else into
+    for i, gid in enumerate(top_genres):
+        params = {"genre_id": gid, "min_vote_count": min_vote_count, "sort_by": sort_by}
+        # cada gênero fica com uma fatia do prazo que sobra (não o timeout inteiro)
+        with tracing.span("recs.discover", genre_id=gid), share_deadline(len(top_genres) - i):
+            try:
+                resp = discover_fn(params, page=1)  # usa cache
+            except Exception:
+                # fallback para discover_movies direto
+                resp = discover_movies(params)
+        results = resp.get("results", []) if resp else []
+        for m in results[:per_genre]:
+            mid = m.get("id")
+            if not mid:
+                continue
+            # evita recomendar o que já está nos favoritos (lookup O(1) no set do perfil)
+            if exclude_ids and mid in exclude_ids:
+                continue
+            candidates[mid] = m  # dedupe simples; manter último
+            if max_candidates and len(candidates) >= max_candidates:
+                return candidates
+    return candidates
+
+@tracing.traced("recs.from_favorites")
+def recommend_from_favorites(favs, top_n_genres=3, candidates_per_genre=40, profile=None,
+                             discover_fn: Callable = discover_movies, sort_by: str = "popularity.desc",
+                             min_vote_count: int = 30, top_k: Optional[int] = None) -> List[Dict]:
+    """
+    Ranking simples: 0.55 nota + 0.35 popularidade + 0.10 afinidade de gênero.
+    Retorna os `top_k` melhores (todos, ordenados, se top_k=None).
+    """
+    if not favs:
+        return []
+
+    # 1) gênero pesos (perfil incremental; monta um na hora se não vier pronto)
+    with tracing.span("recs.genres", favorites=len(favs)):
+        prof = profile or UserProfile.from_favorites(favs)
+        genre_weights = prof.genre_weights()
+        if not genre_weights:
+            return []
+        top_genres = prof.top_genres(top_n_genres)
+
+    # 2) coletar candidatos via discover
+    with tracing.span("recs.candidates") as sp:
+        candidates = _discover_candidates(top_genres, discover_fn, min_vote_count, sort_by, candidates_per_genre)
+        sp.set("candidates", len(candidates))
+    if not candidates:
+        return []
+
+    # 3) scoring vetorizado
+    with tracing.span("recs.rank", candidates=len(candidates)):
+        features = CandidateFeatures(list(candidates.values()))
+        weights = {"vote": 0.55, "popularity": 0.35, "genre_raw": 0.10}
+        return rank(features, weights, genre_weights=genre_weights, k=top_k)
+
+def _text_similarity(favs, prof: UserProfile, candidates_list: List[Dict]) -> Optional[np.ndarray]:
+    """Similaridade de texto perfil x candidatos, ou None se não houver texto nenhum."""
+    model = get_text_model()
+    candidate_texts = [(c.get("overview") or "") for c in candidates_list]
+    user_query = prof.text_query() if model is not None and prof.model_version == model.version else None
+
+    if user_query is None:
+        # sem centróide pronto: "perfil textual" concatenando overviews dos favoritos
+        user_profile_text = " ".join((f.get("overview") or "") for f in favs)
+    else:
+        user_profile_text = ""
+
+    # Se todos os overviews estiverem vazios, desiste do TF-IDF (apenas usa outros sinais)
+    if user_query is None and not any(t.strip() for t in candidate_texts + [user_profile_text]):
+        return None
+
+    if model is not None:
+        # modelo já ajustado no catálogo: só transform + produto escalar esparso
+        if user_query is None:
+            user_query = model.transform([user_profile_text])
+        return model.similarity(user_query, model.transform(candidate_texts))
+
+    # ainda sem modelo salvo (primeiro boot): ajusta só para este pedido
+    vect = tfidf_vectorizer()
+    try:
+        X = vect.fit_transform([user_profile_text] + candidate_texts)  # shape (1 + N, F)
+    except ValueError:
+        # vocabulário vazio (só stopwords/tokens curtos): sem sinal de texto
+        return None
+    return cosine_similarity(X[0], X[1:]).flatten()
+
+@tracing.traced("recs.tfidf")
+def recommend_with_tfidf(favs, top_n_genres=3, candidates_per_genre=50, max_candidates=500,
+                         weight_tfidf=0.6, weight_genre=0.2, weight_score=0.2, profile=None,
+                         discover_fn: Callable = discover_movies, top_k: Optional[int] = None,
+                         ann_candidates: int = 200, weight_graph=0.0, graph_candidates_k: int = 100) -> List[Dict]:
+    """
+    Retorna lista de filmes recomendados ordenados.
+    Parâmetros:
+      - favs: lista de filmes (favoritos) - cada item tem 'overview', 'genre_ids', 'vote_average', 'popularity'
+      - top_n_genres: quantos gêneros considerar (por frequência)
+      - candidates_per_genre: quantos candidatos coletar por gênero via discover
+      - max_candidates: limite global (deduplicado)
+      - weight_tfidf / weight_genre / weight_score / weight_graph: pesos combinados que somam 1.0
+      - profile: UserProfile já pronto para `favs` (ex: get_profile()); se None, é montado aqui
+      - discover_fn: função de discover (ex: versão com cache do app)
+      - top_k: quantos devolver (None = todos, ordenados)
+      - ann_candidates: quantos vizinhos do perfil buscar no índice ANN do catálogo (0 desliga)
+      - graph_candidates_k: com weight_graph > 0, quantos candidatos vêm do grafo de recomendações do TMDB
+    """
+    if not favs:
+        return []
+
+    # 1) gêneros preferidos (pesos) vêm do perfil
+    with tracing.span("recs.genres", favorites=len(favs)):
+        prof = profile or UserProfile.from_favorites(favs, get_text_model())
+        genre_weights = prof.genre_weights()
+        if not genre_weights:
+            return []
+        top_genres = prof.top_genres(top_n_genres)
+
+    # 2) coletar candidatos, sem os favoritos: vizinhos do perfil no catálogo (ANN)
+    #    + discover dos gêneros preferidos
+    fav_ids = prof.ids or {f.get("id") for f in favs if f.get("id")}
+    candidates: Dict[int, Dict] = {}
+    with tracing.span("recs.candidates") as sp:
+        if ann_candidates:
+            with tracing.span("recs.ann"):
+                model = get_text_model()
+                text_query = prof.text_query() if model is not None and prof.model_version == model.version else None
+                for m in nearest_movies(text_query, genre_weights, k=min(ann_candidates, max_candidates),
+                                        exclude_ids=fav_ids):
+                    candidates[m["id"]] = m
+        if weight_graph:
+            with tracing.span("recs.graph"):
+                # arestas que faltam (grafo frio) são buscadas em background; este pedido
+                # pontua com as que já existem, sem esperar o fan-out no TMDB
+                schedule_edges(fav_ids)
+                for m in graph_candidates(fav_ids, k=max(0, min(graph_candidates_k, max_candidates - len(candidates))),
+                                          exclude_ids=fav_ids):
+                    candidates.setdefault(m["id"], m)
+        # completa até max_candidates; os que ANN/grafo já trouxeram não gastam vaga
+        if len(candidates) < max_candidates:
+            _discover_candidates(top_genres, discover_fn, 10, "popularity.desc", candidates_per_genre,
+                                 max_candidates, exclude_ids=fav_ids, into=candidates)
+        sp.set("candidates", len(candidates))
+    if not candidates:
+        return []
+    candidates_list = list(candidates.values())
+
+    # 3) texto, 4) gênero, 5) nota/popularidade -> 6) combinação com pesos configuráveis
+    features = CandidateFeatures(candidates_list)
+    with tracing.span("recs.text_similarity", candidates=len(candidates_list)):
+        text_sim = _text_similarity(favs, prof, candidates_list)
+    with tracing.span("recs.rank", candidates=len(candidates_list)):
+        weights = {"text": weight_tfidf, "genre": weight_genre, "quality": weight_score, "graph": weight_graph}
+        extra = {"graph": graph_scores(fav_ids, features.ids)} if weight_graph else None
+        return rank(features, weights, genre_weights=genre_weights, text_sim=text_sim, extra=extra, k=top_k)
@@ -0,0 +1,150 @@
+# shared_matrix.py
+"""
+Matrizes esparsas (CSR) e colunas densas salvas em disco para leitura via mmap.
+
+Cada publicação cria data/shared/<nome>/<versão>/ com um .npy por array
+(data, indices, indptr e cada coluna densa) mais um meta.json, e só então
+troca o ponteiro data/shared/<nome>/CURRENT. Quem lê abre os .npy com
+mmap_mode="r": N workers do Streamlit usam a mesma cópia física (page
+cache do SO) e carregar é quase instantâneo. `SharedMatrix.get()` percebe
+uma versão nova no CURRENT e recarrega sozinho.
+"""
+import json
+import os
+import shutil
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+
+SHARED_DIR = os.path.join(os.path.dirname(__file__), "data", "shared")
+
+# versões antigas mantidas (um leitor pode ainda estar com elas abertas)
+KEEP_VERSIONS = 2
+# versão antiga só é apagada depois de tanto tempo sem mudar (s)
+CLEANUP_GRACE = 600
+
+def _base(name: str) -> str:
+    return os.path.join(SHARED_DIR, name)
+
+def current_version(name: str) -> Optional[str]:
+    try:
+        with open(os.path.join(_base(name), "CURRENT"), "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def publish(name: str, matrix=None, columns: Optional[Dict[str, np.ndarray]] = None,
+            meta: Optional[Dict] = None) -> str:
+    """Grava uma versão nova (matriz CSR opcional + colunas densas + metadados) e a torna a atual."""
+    version = f"{int(time.time() * 1000)}-{os.getpid()}"
+    vdir = os.path.join(_base(name), version)
+    os.makedirs(vdir, exist_ok=True)
+
+    info = {"meta": meta or {}, "columns": sorted(columns or {}), "shape": None}
+    if matrix is not None:
+        m = sp.csr_matrix(matrix)
+        m.sort_indices()
+        np.save(os.path.join(vdir, "data.npy"), m.data)
+        np.save(os.path.join(vdir, "indices.npy"), m.indices)
+        np.save(os.path.join(vdir, "indptr.npy"), m.indptr)
+        info["shape"] = list(m.shape)
+    for col, values in (columns or {}).items():
+        np.save(os.path.join(vdir, f"col_{col}.npy"), np.asarray(values))
+    with open(os.path.join(vdir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(info, f)
+
+    # troca atômica do ponteiro: leitores veem a versão antiga ou a nova, nunca pela metade
+    tmp = os.path.join(_base(name), f"CURRENT.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(tmp, os.path.join(_base(name), "CURRENT"))
+    _cleanup(name, keep=version)
+    return version
+
+def _stamp(version: str) -> int:
+    # versões são "<ms>-<pid>": ordena pelo instante, não pelo texto
+    try:
+        return int(version.split("-", 1)[0])
+    except ValueError:
+        return 0
+
+def _cleanup(name: str, keep: str) -> None:
+    """
+    Apaga versões mais velhas que a atual (e que `keep`), fora as
+    KEEP_VERSIONS - 1 mais recentes delas e as mexidas há menos de
+    CLEANUP_GRACE segundos. Uma versão mais nova que a atual pode ser de outro
+    processo ainda gravando antes de trocar o CURRENT: essa nunca é apagada.
+    """
+    base = _base(name)
+    try:
+        versions = [d for d in os.listdir(base) if os.path.isdir(os.path.join(base, d))]
+    except FileNotFoundError:
+        return
+    newest = min(_stamp(keep), _stamp(current_version(name) or keep))
+    older = sorted((v for v in versions if _stamp(v) < newest), key=_stamp)
+    limit = time.time() - CLEANUP_GRACE
+    for v in older[:-max(KEEP_VERSIONS - 1, 0) or None]:
+        vdir = os.path.join(base, v)
+        try:
+            if os.path.getmtime(vdir) > limit:
+                continue
+        except OSError:
+            continue
+        # no Linux, arquivos ainda mapeados continuam válidos para quem já os abriu
+        shutil.rmtree(vdir, ignore_errors=True)
+
+def load(name: str, version: Optional[str] = None) -> Optional[Tuple[Optional[sp.csr_matrix], Dict[str, np.ndarray], Dict, str]]:
+    """(matriz, colunas, meta, versão) mapeados somente-leitura, ou None se não houver nada publicado."""
+    version = version or current_version(name)
+    if not version:
+        return None
+    vdir = os.path.join(_base(name), version)
+    try:
+        with open(os.path.join(vdir, "meta.json"), "r", encoding="utf-8") as f:
+            info = json.load(f)
+        matrix = None
+        if info.get("shape"):
+            data = np.load(os.path.join(vdir, "data.npy"), mmap_mode="r")
+            indices = np.load(os.path.join(vdir, "indices.npy"), mmap_mode="r")
+            indptr = np.load(os.path.join(vdir, "indptr.npy"), mmap_mode="r")
+            matrix = sp.csr_matrix((data, indices, indptr), shape=tuple(info["shape"]), copy=False)
+        columns = {c: np.load(os.path.join(vdir, f"col_{c}.npy"), mmap_mode="r") for c in info["columns"]}
+        return matrix, columns, info.get("meta", {}), version
+    except FileNotFoundError:
+        return None
+
+class SharedMatrix:
+    """
+    Handle para uma matriz publicada. `get()` devolve a versão carregada e,
+    no máximo a cada `check_interval` segundos, olha o CURRENT e recarrega
+    se houver versão nova (hot reload entre processos).
+    """
+
+    def __init__(self, name: str, check_interval: float = 5.0):
+        self.name = name
+        self.check_interval = check_interval
+        self._loaded = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def version(self) -> Optional[str]:
+        return self._loaded[3] if self._loaded else None
+
+    def get(self):
+        now = time.time()
+        with self._lock:
+            if self._loaded is None or now - self._checked_at >= self.check_interval:
+                self._checked_at = now
+                latest = current_version(self.name)
+                if latest and latest != self.version:
+                    self._loaded = load(self.name, latest) or self._loaded
+            return self._loaded
+
+    def invalidate(self) -> None:
+        """Força olhar o CURRENT na próxima chamada (ex: depois de publicar neste processo)."""
+        with self._lock:
+            self._checked_at = 0.0
@@ -0,0 +1,211 @@
+# shared_store.py
+"""
+Camada de dados compartilhada por todas as sessões do processo.
+
+Dados de leitura frequente e que não dependem do usuário (gêneros, páginas
+do discover/busca, pool de candidatos, listas de recomendação) ficam aqui
+uma vez só, com um orçamento global de memória (MOVIEBOT_SHARED_BUDGET_MB)
+e despejo LRU. As sessões do Streamlit guardam só as chaves; se algo foi
+despejado, a chave sabe recarregar (API, cache do tmdb_client, rec_cache).
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+import rec_cache
+from favorites import add_listener
+from tmdb_client import (
+    discover_movies, get_genres, is_fallback, note_use, search_movie, ttl_for, watch_fallbacks,
+)
+
+BUDGET_BYTES = int(float(os.getenv("MOVIEBOT_SHARED_BUDGET_MB", "64")) * 1024 * 1024)
+
+def estimate_size(value: Any) -> int:
+    """Tamanho aproximado em bytes (JSON serializado; bom o bastante para dados da API)."""
+    try:
+        return len(json.dumps(value, ensure_ascii=False, default=str).encode("utf-8"))
+    except (TypeError, ValueError):
+        return 1024
+
+class SharedStore:
+    """LRU limitado por bytes (não por número de entradas), seguro para várias threads.
+
+    Cada entrada pode ter validade (`ttl` em segundos): vencida, conta como
+    ausente e é recarregada, como no cache do tmdb_client.
+    """
+
+    def __init__(self, budget_bytes: int = BUDGET_BYTES):
+        self.budget_bytes = budget_bytes
+        self.used_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # chave -> (valor, tamanho, vence_em); vence_em 0 = sem validade
+        self._items: "OrderedDict[Hashable, Tuple[Any, int, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # chave -> [lock, quantas threads usando]; sai do dict quando a última termina
+        self._loading: Dict[Hashable, list] = {}
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None and item[2] and item[2] <= time.time():
+                del self._items[key]
+                self.used_bytes -= item[1]
+                item = None
+            if item is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def put(self, key: Hashable, value: Any, size: Optional[int] = None, ttl: Optional[float] = None) -> None:
+        size = estimate_size(value) if size is None else size
+        if size > self.budget_bytes:
+            return  # maior que o orçamento inteiro: não vale guardar
+        expires_at = time.time() + ttl if ttl else 0.0
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.used_bytes -= old[1]
+            self._items[key] = (value, size, expires_at)
+            self.used_bytes += size
+            while self.used_bytes > self.budget_bytes and self._items:
+                _, (_, s, _) = self._items.popitem(last=False)
+                self.used_bytes -= s
+                self.evictions += 1
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        """
+        Valor da chave, carregando com `loader()` se não estiver aqui. Várias
+        sessões pedindo a mesma chave ao mesmo tempo disparam um carregamento só.
+        Resultados vazios (erro da API) ou degradados (fallback do tmdb_client,
+        ou montados com algum) não são guardados.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+        with self._lock:
+            slot = self._loading.setdefault(key, [threading.Lock(), 0])
+            slot[1] += 1
+        try:
+            with slot[0]:
+                value = self.get(key)
+                if value is None:
+                    with watch_fallbacks() as seen:
+                        value = loader()
+                    if value and not seen["count"] and not is_fallback(value):
+                        self.put(key, value, ttl=ttl)
+        finally:
+            with self._lock:
+                slot[1] -= 1
+                if not slot[1]:
+                    self._loading.pop(key, None)
+        return value
+
+    def discard(self, key: Hashable) -> None:
+        with self._lock:
+            item = self._items.pop(key, None)
+            if item is not None:
+                self.used_bytes -= item[1]
+
+    def discard_where(self, pred: Callable[[Hashable], bool]) -> int:
+        """Remove as chaves para as quais `pred(chave)` é verdadeiro. Retorna quantas."""
+        with self._lock:
+            keys = [k for k in self._items if pred(k)]
+            for k in keys:
+                self.used_bytes -= self._items.pop(k)[1]
+        return len(keys)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._items), "used_bytes": self.used_bytes, "budget_bytes": self.budget_bytes,
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+            }
+
+STORE = SharedStore()
+
+# ---------- chaves e carregadores ----------
+# cada chave é uma tupla pequena (é o que a sessão guarda) que diz como recarregar
+
+def genres() -> Dict[str, int]:
+    """{nome_normalizado: id} dos gêneros (uma busca por processo, não por sessão)."""
+    return STORE.get_or_load(("genres",), get_genres, ttl=ttl_for("genres")) or {}
+
+def genre_id_to_name() -> Dict[int, str]:
+    def build():
+        # recuperar nome original (improvável recuperar original capitalization)
+        return {int(gid): name.replace("-", " ").title() for name, gid in genres().items()}
+    return STORE.get_or_load(("genre_names",), build, ttl=ttl_for("genres")) or {}
+
+def search_key(term: str, page: int) -> Tuple:
+    return ("search", term, int(page))
+
+def discover_key(params: dict, page: int = 1) -> Tuple:
+    return ("discover", json.dumps(params, sort_keys=True, default=str), int(page))
+
+def _request_args(key: Tuple) -> Tuple:
+    """Argumentos de search_movie/discover_movies que a chave representa."""
+    if key[0] == "discover":
+        return json.loads(key[1]), key[2]
+    return key[1], key[2]
+
+def resolve(key: Tuple, loader: Optional[Callable[[], Any]] = None) -> Any:
+    """Valor de uma chave guardada pela sessão, recarregando se foi despejada ou venceu."""
+    kind = key[0]
+    if loader is None:
+        if kind == "search":
+            loader = lambda: search_movie(key[1], page=key[2])
+        elif kind == "discover":
+            loader = lambda: discover_movies(json.loads(key[1]), page=key[2])
+        elif kind == "recs":
+            loader = lambda: rec_cache.get(key[1])
+        else:
+            raise KeyError(f"sem carregador para a chave {key!r}")
+    if kind == "recs":
+        return STORE.get_or_load(key, loader, ttl=rec_cache.TTL_SECONDS)
+    if kind not in ("search", "discover"):
+        return STORE.get_or_load(key, loader)
+
+    loaded = []
+    def load():
+        loaded.append(True)
+        return loader()
+    value = STORE.get_or_load(key, load, ttl=ttl_for(kind))
+    if not loaded:
+        # servido daqui, sem passar pelo tmdb_client: conta o pedido mesmo assim
+        # (é o que o warm_cache usa para escolher o que reaquecer)
+        note_use(kind, *_request_args(key))
+    return value
+
+def search_page(term: str, page: int = 1, loader: Optional[Callable[[], dict]] = None) -> dict:
+    return resolve(search_key(term, page), loader) or {}
+
+def discover_page(params: dict, page: int = 1) -> dict:
+    """discover_movies pelo store compartilhado (também serve de discover_fn do recomendador)."""
+    return resolve(discover_key(params, page)) or {}
+
+def recs_key(cache_key: str) -> Tuple:
+    """Chave de uma lista de recomendações (mesma chave do rec_cache, que é de onde ela recarrega)."""
+    return ("recs", cache_key)
+
+def results_of(key: Optional[Tuple]) -> List[Dict]:
+    """Filmes guardados numa chave: 'results' da busca/discover ou a lista de recomendações."""
+    if not key:
+        return []
+    value = resolve(key)
+    if isinstance(value, dict):
+        return value.get("results", [])
+    return value or []
+
+def _on_favorites_changed(event: str, movie: Dict) -> None:
+    # listas de recomendação do conjunto antigo (o rec_cache apaga as dele no próprio listener)
+    prefix = rec_cache.favorites_fingerprint(rec_cache.ids_before(event, movie)) + "-"
+    STORE.discard_where(lambda k: k[0] == "recs" and k[1].startswith(prefix))
+
+add_listener(_on_favorites_changed)
@@ -0,0 +1,71 @@
+# test_ann_index.py
+import numpy as np
+import pytest
+import scipy.sparse as sp
+
+from ann_index import ANNIndex
+
+N, D, K = 600, 40, 10
+
+class FakeModel:
+    """Vetores de texto sintéticos: a sinopse "doc<i>" vira a linha i de TEXT."""
+    version = "fake-v1"
+
+    def __init__(self, text):
+        self.text = text
+
+    def transform(self, docs):
+        return sp.csr_matrix(self.text[[int(d[3:]) for d in docs]])
+
+@pytest.fixture(scope="module")
+def index():
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(12, D))
+    labels = rng.integers(0, len(centers), N)
+    text = np.abs(centers[labels] + 0.3 * rng.normal(size=(N, D)))
+    movies = [{"id": 1000 + i, "overview": f"doc{i}", "genre_ids": [int(labels[i]) % 4]} for i in range(N)]
+    return ANNIndex.build(movies, FakeModel(text), n_components=16, seed=0)
+
+def _exact(index, q, k, exclude=()):
+    scores = np.asarray((index.X @ q.T).todense()).ravel()
+    order = [i for i in np.argsort(-scores, kind="stable") if index.ids[i] not in exclude]
+    return set(index.ids[order[:k]].tolist())
+
+def test_recall_against_exact_cosine(index):
+    overlaps = []
+    for row in range(0, N, 37):
+        q = index.X[row]
+        ids, scores = index.query(q, k=K)
+        assert len(ids) == K
+        assert np.all(np.diff(scores) <= 1e-12)   # ordem decrescente
+        overlaps.append(len(set(ids.tolist()) & _exact(index, q, K)) / K)
+    assert np.mean(overlaps) >= 0.9
+
+def test_query_vector_matches_index_space(index):
+    q = index.query_vector(None, {0: 1.0})
+    assert q.shape == (1, index.X.shape[1])
+    ids, _ = index.query(q, k=K)
+    assert len(ids) == K
+
+def test_excluded_ids_are_left_out_and_backfilled(index):
+    q = index.X[0]
+    nearest, _ = index.query(q, k=K)
+    exclude = set(nearest[:5].tolist()) | {None}   # favoritos antigos podem ter id None
+    ids, _ = index.query(q, k=K, exclude_ids=exclude)
+    assert len(ids) == K
+    assert not exclude & set(ids.tolist())
+    assert len(set(ids.tolist()) & _exact(index, q, K, exclude)) >= K - 2
+
+def test_probe_opens_more_lists_until_k(index):
+    # uma lista só não tem 150 filmes: _probe abre as próximas até ter candidatos suficientes
+    assert max(np.diff(index.offsets)) < 150
+    ids, _ = index.query(index.X[0], k=150, n_probe=1)
+    assert len(ids) == 150 and len(set(ids.tolist())) == 150
+    ids, _ = index.query(index.X[0], k=150, exclude_ids=set(ids[:100].tolist()), n_probe=1)
+    assert len(ids) == 150
+
+def test_empty_index_returns_nothing(index):
+    empty = ANNIndex(np.array([], dtype=np.int64), sp.csr_matrix((0, index.X.shape[1])), index.genre_ids,
+                     index.projection, index.centroids, index.order[:0], np.zeros(1, dtype=np.int64), "v")
+    ids, scores = empty.query(index.X[0], k=K)
+    assert len(ids) == 0 and len(scores) == 0
@@ -0,0 +1,93 @@
+# test_api.py
+import pytest
+
+pytest.importorskip("starlette")
+pytest.importorskip("httpx")
+from starlette.testclient import TestClient
+
+import api
+import shared_store
+import tmdb_client
+
+PAGE = {"page": 1, "total_pages": 1, "total_results": 2, "results": [
+    {"id": 603, "title": "Matrix", "vote_count": 900, "vote_average": 8.2},
+    {"id": 604, "title": "Matrix Reloaded", "vote_count": 10, "vote_average": 7.0},
+]}
+
+@pytest.fixture
+def client():
+    # sem `with`: o lifespan (warm_cache.boot + scheduler) não roda
+    return TestClient(api.create_app())
+
+def _cached_search(term="matrix"):
+    tmdb_client._cache_set(tmdb_client.request_key("search", term, 1), PAGE, 60)
+
+def test_get_has_etag_and_max_age(client):
+    _cached_search()
+    resp = client.get("/search", params={"q": "matrix"})
+    assert resp.status_code == 200
+    assert resp.headers["etag"].startswith('"')
+    assert resp.headers["cache-control"] == f"public, max-age={api.TMDB_MAX_AGE}"
+    assert [m["id"] for m in resp.json()["results"]] == [603]  # min_votes padrão
+
+def test_matching_if_none_match_is_304(client):
+    _cached_search()
+    etag = client.get("/search", params={"q": "matrix"}).headers["etag"]
+    resp = client.get("/search", params={"q": "matrix"}, headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+    assert resp.content == b""
+    assert resp.headers["etag"] == etag
+
+def test_etag_follows_the_body(client):
+    _cached_search()
+    etag = client.get("/search", params={"q": "matrix"}).headers["etag"]
+    resp = client.get("/search", params={"q": "matrix", "min_votes": 0}, headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.headers["etag"] != etag
+    assert len(resp.json()["results"]) == 2
+
+def test_fields_selection(client):
+    _cached_search()
+    resp = client.get("/search", params={"q": "matrix", "fields": "id,title"})
+    assert resp.json()["results"] == [{"id": 603, "title": "Matrix"}]
+
+def test_degraded_response_is_not_cacheable(client):
+    _cached_search()
+    etag = client.get("/search", params={"q": "matrix"}).headers["etag"]
+    # mesma página, agora só como cópia vencida: o TMDB (sem rede) falha e a rota responde com o fallback
+    tmdb_client._cache_set(tmdb_client.request_key("search", "matrix", 1), PAGE, -1)
+    shared_store.STORE.discard(shared_store.search_key("matrix", 1))
+    resp = client.get("/search", params={"q": "matrix"}, headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.headers["cache-control"] == "no-store"
+    assert "etag" not in resp.headers
+    assert [m["id"] for m in resp.json()["results"]] == [603]
+    assert shared_store.STORE.get(shared_store.search_key("matrix", 1)) is None
+
+def test_favorites_etag_changes_after_post(client):
+    first = client.get("/favorites")
+    assert first.status_code == 200 and first.headers["cache-control"] == "no-cache"
+    etag = first.headers["etag"]
+    added = client.post("/favorites", json={"movie": {"id": 603, "title": "Matrix", "genre_ids": [878]}})
+    assert added.status_code == 201 and added.json() == {"added": True, "id": 603}
+    resp = client.get("/favorites", headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert [f["id"] for f in resp.json()["results"]] == [603]
+    assert client.delete("/favorites/603").json() == {"removed": True, "id": 603}
+
+@pytest.mark.parametrize("path, status", [
+    ("/search", 400),
+    ("/search?q=matrix&page=0", 400),
+    ("/search?q=matrix&page=x", 400),
+    ("/favorites/999", 404),
+])
+def test_errors_are_json(client, path, status):
+    method = client.delete if path.startswith("/favorites/") else client.get
+    resp = method(path)
+    assert resp.status_code == status
+    assert "error" in resp.json()
+
+def test_health_reports_store_and_breakers(client):
+    body = client.get("/health").json()
+    assert body["ok"] is True
+    assert "entries" in body["store"] and isinstance(body["tmdb"], dict)
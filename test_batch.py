@@ -0,0 +1,112 @@
+# test_batch.py
+import io
+import json
+
+import pytest
+
+import main
+from favorites import list_favorites
+
+GENRES = {"acao": 28, "animacao": 16, "aventura": 12, "comedia": 35}
+
+MOVIES = [
+    {"id": 1, "title": "A", "vote_count": 500, "vote_average": 7.5, "overview": "longo", "genre_ids": [28]},
+    {"id": 2, "title": "B", "vote_count": 5, "vote_average": 9.0, "overview": "longo", "genre_ids": [28]},
+    {"id": 3, "title": "C", "vote_count": 80, "vote_average": 6.0, "overview": "longo", "genre_ids": [35]},
+]
+
+@pytest.fixture
+def tmdb(monkeypatch):
+    calls = []
+
+    def search_movie(term, page=1):
+        calls.append(("search", term, page))
+        return {"page": page, "total_pages": 3, "results": MOVIES}
+
+    def discover_movies(params, page=1):
+        calls.append(("discover", params, page))
+        return {"page": page, "results": MOVIES}
+
+    monkeypatch.setattr(main, "search_movie", search_movie)
+    monkeypatch.setattr(main, "discover_movies", discover_movies)
+    return calls
+
+def _run(op, line_no=1):
+    return main.run_op(line_no, op if isinstance(op, str) else json.dumps(op), GENRES)
+
+def test_search_filters_and_slims(tmdb):
+    out = _run({"id": "q1", "op": "search", "term": "matrix", "page": 2, "limit": 5})
+    assert out["ok"] and out["id"] == "q1" and out["op"] == "search" and out["line"] == 1
+    assert [m["id"] for m in out["results"]] == [1, 3]  # min_votes padrão (30) tira o 2
+    assert "overview" not in out["results"][0]
+    assert (out["page"], out["total_pages"]) == (2, 3)
+    assert tmdb == [("search", "matrix", 2)]
+    assert out["elapsed_ms"] >= 0
+
+def test_cli_op_names_are_accepted(tmdb):
+    out = _run({"op": "Buscar", "term": "matrix", "limit": 1})
+    assert out["ok"] and [m["id"] for m in out["results"]] == [1]
+
+def test_genre_by_name_and_id(tmdb):
+    out = _run({"op": "genero", "genre": "Comédia", "min_votes": 0, "year": 1999})
+    assert out["ok"] and out["genre_id"] == 35
+    assert tmdb[-1] == ("discover", {"genre_id": 35, "min_vote_count": 0, "year": 1999}, 1)
+    assert _run({"op": "genre", "genre": 28})["genre_id"] == 28
+
+@pytest.mark.parametrize("op, error", [
+    ("{nao é json", "JSON inválido"),
+    ("[1, 2]", "linha não é um objeto JSON"),
+    ({"op": "voar"}, "operação desconhecida"),
+    ({"op": "search", "term": "  "}, "termo vazio"),
+    ({"op": "genre", "genre": "a"}, "gênero ambíguo"),
+    ({"op": "genre", "genre": "faroeste"}, "gênero não encontrado"),
+    ({"op": "recommendations"}, "movie_id obrigatório"),
+    ({"op": "search", "term": "x", "limit": "muitos"}, "invalid literal"),
+])
+def test_errors_become_result_lines(tmdb, op, error):
+    out = _run(op)
+    assert out["ok"] is False
+    assert error in out["error"]
+
+def test_unexpected_exception_is_reported(monkeypatch):
+    def boom(term, page=1):
+        raise RuntimeError("quebrou")
+    monkeypatch.setattr(main, "search_movie", boom)
+    out = _run({"op": "search", "term": "x"})
+    assert out["ok"] is False and out["error"] == "RuntimeError: quebrou"
+
+def test_empty_api_response_is_an_error(monkeypatch):
+    monkeypatch.setattr(main, "search_movie", lambda term, page=1: {})
+    assert _run({"op": "search", "term": "x"})["error"] == "resposta vazia ou erro na API"
+
+def test_favorite_add_list_remove():
+    movie = {"id": 42, "title": "Ok", "genre_ids": [28]}
+    out = _run({"op": "favorite_add", "movie": movie})
+    assert out["ok"] and out["added"] and out["id"] == 42
+    assert _run({"op": "favorite_add", "movie": movie})["added"] is False
+    assert [f["id"] for f in list_favorites()] == [42]
+    assert _run({"op": "favorites"})["results"][0]["id"] == 42
+    out = _run({"op": "remover", "movie_id": 42})
+    assert out["ok"] and out["removed"]
+    assert list_favorites() == []
+
+def test_favorite_add_from_details_drops_fallback_tag(monkeypatch):
+    details = {"id": 7, "title": "Sete", "genres": [{"id": 18, "name": "Drama"}], "_fallback": True}
+    monkeypatch.setattr(main, "get_movie_details", lambda movie_id: details)
+    out = _run({"op": "favoritar", "movie_id": 7})
+    assert out["ok"] and out["added"]
+    saved = list_favorites()[0]
+    assert saved["genre_ids"] == [18] and "_fallback" not in saved
+
+def test_run_batch_writes_one_line_per_op(tmdb):
+    source = io.StringIO("\n".join([
+        json.dumps({"id": 1, "op": "search", "term": "a"}),
+        "",
+        "lixo",
+        json.dumps({"id": 3, "op": "search", "term": "c"}),
+    ]) + "\n")
+    out = io.StringIO()
+    assert main.run_batch(source, out, workers=2) == (3, 1)
+    lines = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert sorted(line["line"] for line in lines) == [1, 3, 4]
+    assert {line["line"]: line["ok"] for line in lines} == {1: True, 3: False, 4: True}
@@ -0,0 +1,55 @@
+# test_batch_recs.py
+import json
+
+import batch_recs
+import rec_cache
+import tmdb_client
+from recommender import APP_CACHE_PARAMS
+
+FAVS = [{"id": 1, "title": "A", "genre_ids": [28]}, {"id": 2, "title": "B", "genre_ids": [35]}]
+
+def _write_favs(tmp_path):
+    path = tmp_path / "user.json"
+    path.write_text(json.dumps(FAVS), encoding="utf-8")
+    return str(path)
+
+def test_prepare_leaves_fallback_pages_out_of_the_pool(monkeypatch, tmp_path):
+    monkeypatch.setattr(batch_recs.text_model, "get_text_model", lambda: None)
+    monkeypatch.setattr(batch_recs.text_model, "fit_text_model", lambda: None)
+    monkeypatch.setattr(batch_recs.graph_rec, "ensure_edges", lambda ids: None)
+
+    def discover(params, page=1):
+        if params["genre_id"] == 28:
+            return {"results": [{"id": 10}], tmdb_client.FALLBACK_KEY: True}
+        return {"results": [{"id": 20}]}
+
+    monkeypatch.setattr(batch_recs, "discover_movies", discover)
+    assert batch_recs._prepare([_write_favs(tmp_path)]) == {35: {"results": [{"id": 20}]}}
+
+def test_compute_does_not_cache_degraded_lists(monkeypatch, tmp_path):
+    monkeypatch.setattr(rec_cache, "get_text_model", lambda: None)
+    monkeypatch.setattr(rec_cache.graph_rec, "missing_edges", lambda ids: [])
+    path = _write_favs(tmp_path)
+    key = rec_cache.make_key([1, 2], APP_CACHE_PARAMS)
+
+    def degraded(favs, discover_fn, **params):
+        return tmdb_client.get_movie_videos(1).get("results", []) + [{"id": 7}]  # sem rede: fallback
+
+    monkeypatch.setattr(batch_recs, "recommend_with_tfidf", degraded)
+    assert batch_recs._compute(path)[1:3] == (2, 1)
+    assert rec_cache.get(key) is None
+
+    monkeypatch.setattr(batch_recs, "recommend_with_tfidf", lambda favs, discover_fn, **params: [{"id": 7}])
+    batch_recs._compute(path)
+    assert rec_cache.get(key) == [{"id": 7}]
+
+def test_workers_do_not_fetch_graph_edges(monkeypatch):
+    for module, flag in ((batch_recs.text_model, "AUTO_REFIT"), (batch_recs.ann_index, "AUTO_BUILD"),
+                         (batch_recs.graph_rec, "AUTO_FETCH")):
+        monkeypatch.setattr(module, flag, True)
+    submitted = []
+    monkeypatch.setattr(batch_recs.graph_rec._EXECUTOR, "submit", lambda *a: submitted.append(a))
+    batch_recs._init_worker({})
+    batch_recs.graph_rec.schedule_edges([1, 2])
+    assert submitted == []
+    assert not batch_recs.text_model.AUTO_REFIT and not batch_recs.ann_index.AUTO_BUILD
@@ -0,0 +1,63 @@
+# test_graph_rec.py
+import pytest
+
+import catalog
+import graph_rec
+
+# arestas "recomendados de" de cada filme; a matriz as usa nos dois sentidos
+EDGES = {
+    1: [10, 11, 12],
+    2: [10, 11],
+    3: [10, 13],
+    20: [21],        # componente separado dos favoritos
+    30: [],          # filme sem recomendações: nó isolado
+}
+
+@pytest.fixture
+def graph(monkeypatch):
+    # isolate() troca estado do módulo; o monkeypatch devolve tudo no fim
+    for name in ("_ADJ", "_FETCH", "_PERSIST", "_MATRIX"):
+        monkeypatch.setattr(graph_rec, name, getattr(graph_rec, name))
+    fetch = lambda mid: {"results": [{"id": t, "title": f"Filme {t}"} for t in EDGES.get(mid, [])]}
+    graph_rec.isolate(fetch)
+    return graph_rec
+
+def test_ranking_follows_shared_neighbours(graph):
+    assert graph.ensure_edges(EDGES) == len(EDGES)
+    ids = [m["id"] for m in graph.graph_candidates([1, 2, 3], k=10)]
+    # 10 liga os três favoritos, 11 liga dois, 12 e 13 só um
+    assert ids[:2] == [10, 11]
+    assert set(ids) == {10, 11, 12, 13}
+    assert [m["title"] for m in graph.graph_candidates([1, 2, 3], k=1)] == ["Filme 10"]
+
+def test_favorites_and_excluded_ids_are_left_out(graph):
+    graph.ensure_edges(EDGES)
+    ids = [m["id"] for m in graph.graph_candidates([1, 2], k=10, exclude_ids={10, None})]
+    assert 1 not in ids and 2 not in ids and 10 not in ids
+    assert ids[0] == 11
+    # o 3 é alcançado via 10, mas não é favorito: pode aparecer
+    assert set(ids) <= {3, 11, 12, 13}
+
+def test_graph_scores_are_zero_outside_the_graph(graph):
+    graph.ensure_edges(EDGES)
+    scores = graph.graph_scores([1, 2, 3], [10, 21, 99])
+    assert scores[0] > 0
+    assert scores[1] == 0 and scores[2] == 0
+
+def test_isolated_and_unknown_seeds_return_nothing(graph):
+    graph.ensure_edges(EDGES)
+    assert graph.graph_candidates([30]) == []
+    assert graph.graph_candidates([999, None]) == []
+    assert graph.graph_candidates([20]) and [m["id"] for m in graph.graph_candidates([20])] == [21]
+
+def test_empty_graph_returns_nothing(graph):
+    node_ids, r = graph.personalized_pagerank([1])
+    assert len(node_ids) == 0 and len(r) == 0
+    assert graph.graph_candidates([1, 2]) == []
+    assert list(graph.graph_scores([1], [10, 11])) == [0.0, 0.0]
+
+def test_fallback_responses_do_not_become_edges(graph, monkeypatch):
+    monkeypatch.setattr(graph_rec, "_FETCH", lambda mid: {"results": [{"id": 5}], "_fallback": True})
+    assert graph.ensure_edges([1]) == 0
+    assert graph.missing_edges([1]) == [1]
+    assert catalog.get_movie(5) is None
@@ -0,0 +1,56 @@
+# test_profiling.py
+import os
+import threading
+import time
+
+import profiling
+
+def test_concurrent_cprofile_falls_back_to_sampling():
+    barrier = threading.Barrier(4)
+    tokens, errors = [], []
+
+    def run():
+        try:
+            barrier.wait()
+            token = profiling.start("concorrente", "cprofile")
+            tokens.append(token)
+            barrier.wait()  # todas ativas ao mesmo tempo
+            sum(range(10000))
+            profiling.stop(token)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    assert sorted(t["mode"] for t in tokens) == ["cprofile", "sample", "sample", "sample"]
+    assert profiling._CPROFILE_OWNER is None
+    # liberado: o próximo volta a usar o cProfile
+    token = profiling.start("depois", "cprofile")
+    assert token["mode"] == "cprofile"
+    profiling.stop(token, write=False)
+
+def test_enable_error_falls_back_to_sampling(monkeypatch):
+    class Busy:
+        def enable(self):
+            raise ValueError("Another profiling tool is already active")
+
+    monkeypatch.setattr(profiling.cProfile, "Profile", Busy)
+    token = profiling.start("ocupado", "cprofile")
+    assert token["mode"] == "sample"
+    assert profiling._CPROFILE_OWNER is None
+    profiling.stop(token, write=False)
+
+def test_paused_block_is_left_out():
+    with profiling.profile("pausa", "sample") as token:
+        with profiling.paused():
+            time.sleep(0.2)
+    assert time.perf_counter() - token["t0"] < 0.2
+    assert any(n.endswith(".folded") for n in os.listdir(profiling.PROFILE_DIR))
+
+def test_disabled_by_default(monkeypatch):
+    monkeypatch.setattr(profiling, "MODE", "")
+    assert profiling.start("nada") is None
@@ -0,0 +1,79 @@
+# test_ranking.py
+import random
+
+import numpy as np
+import pytest
+
+from ranking import CandidateFeatures, minmax, rank, top_k_indices
+
+def _movies(n, seed=0):
+    rnd = random.Random(seed)
+    return [
+        {
+            "id": i + 1,
+            "vote_average": round(rnd.uniform(3, 9), 1),
+            "popularity": round(rnd.uniform(1, 500), 2),
+            "genre_ids": rnd.sample([12, 14, 18, 27, 28, 35, 878], rnd.randint(0, 3)),
+        }
+        for i in range(n)
+    ]
+
+def _old_sort(movies, genre_weights):
+    """Ordenação do recommend_from_favorites antes do motor vetorizado (loop + sort)."""
+    votes = [m.get("vote_average", 0) for m in movies]
+    pops = [m.get("popularity", 0) for m in movies]
+
+    def norm(x, mn, mx):
+        if mx == mn:
+            return 0.0
+        return (x - mn) / (mx - mn)
+
+    scored = []
+    for m in movies:
+        ga_score = 0.0
+        for gid in m.get("genre_ids", []):
+            if gid in genre_weights:
+                ga_score += genre_weights[gid]
+        vote_norm = norm(m.get("vote_average", 0), min(votes), max(votes))
+        pop_norm = norm(m.get("popularity", 0), min(pops), max(pops))
+        scored.append((0.55 * vote_norm + 0.35 * pop_norm + 0.10 * ga_score, m))
+    scored.sort(key=lambda x: x[0], reverse=True)
+    return [m for s, m in scored]
+
+FAVORITES_WEIGHTS = {"vote": 0.55, "popularity": 0.35, "genre_raw": 0.10}
+GENRE_WEIGHTS = {28: 3.0, 878: 2.0, 18: 0.5}
+
+@pytest.mark.parametrize("seed", range(5))
+def test_rank_matches_old_sort(seed):
+    movies = _movies(200, seed)
+    expected = [m["id"] for m in _old_sort(movies, GENRE_WEIGHTS)]
+    got = [m["id"] for m in rank(CandidateFeatures(movies), FAVORITES_WEIGHTS, genre_weights=GENRE_WEIGHTS)]
+    assert got == expected
+
+def test_rank_top_k_is_prefix_of_full_ranking():
+    movies = _movies(300, seed=7)
+    features = CandidateFeatures(movies)
+    full = rank(features, FAVORITES_WEIGHTS, genre_weights=GENRE_WEIGHTS)
+    assert rank(features, FAVORITES_WEIGHTS, genre_weights=GENRE_WEIGHTS, k=10) == full[:10]
+
+def test_rank_excludes_ids_and_caps_k():
+    movies = _movies(5, seed=1)
+    features = CandidateFeatures(movies)
+    got = rank(features, FAVORITES_WEIGHTS, genre_weights=GENRE_WEIGHTS, k=10, exclude_ids={1, 2, None})
+    assert sorted(m["id"] for m in got) == [3, 4, 5]
+
+def test_rank_empty():
+    assert rank(CandidateFeatures([]), FAVORITES_WEIGHTS) == []
+
+@pytest.mark.parametrize("k", [None, 0, 1, 5, 49, 50, 80])
+def test_top_k_indices_matches_stable_argsort(k):
+    rnd = np.random.default_rng(3)
+    scores = rnd.integers(0, 10, size=50).astype(float)  # muitos empates
+    expected = np.argsort(-scores, kind="stable")
+    got = top_k_indices(scores, k)
+    assert list(got) == list(expected if k is None else expected[:k])
+
+def test_minmax():
+    assert list(minmax(np.array([2.0, 4.0, 6.0]))) == [0.0, 0.5, 1.0]
+    assert list(minmax(np.array([3.0, 3.0]))) == [0.0, 0.0]
+    assert list(minmax(np.array([3.0, 3.0]), keep_flat=True)) == [3.0, 3.0]
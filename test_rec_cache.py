@@ -0,0 +1,102 @@
+# test_rec_cache.py
+import os
+import types
+
+import pytest
+
+import rec_cache
+
+PARAMS = {"engine": "tfidf", "top_k": 10}
+
+@pytest.fixture(autouse=True)
+def no_text_model(monkeypatch):
+    monkeypatch.setattr(rec_cache, "get_text_model", lambda: None)
+
+def _files():
+    try:
+        return sorted(os.listdir(rec_cache.CACHE_DIR))
+    except FileNotFoundError:
+        return []
+
+def test_key_ignores_order_and_duplicates():
+    assert rec_cache.make_key([3, 1, 2], PARAMS) == rec_cache.make_key([1, 2, 3, 3], PARAMS)
+    assert rec_cache.make_key([1, 2], PARAMS) != rec_cache.make_key([1, 2, 3], PARAMS)
+
+def test_key_changes_with_params_and_model_version(monkeypatch):
+    key = rec_cache.make_key([1, 2], PARAMS)
+    assert key != rec_cache.make_key([1, 2], {**PARAMS, "top_k": 20})
+    monkeypatch.setattr(rec_cache, "get_text_model", lambda: types.SimpleNamespace(version="v2"))
+    other = rec_cache.make_key([1, 2], PARAMS)
+    assert other != key
+    # mesmo conjunto de favoritos: mesmo prefixo (é o que a invalidação usa)
+    assert other.split("-")[0] == key.split("-")[0]
+
+def test_key_tracks_graph_readiness(monkeypatch):
+    params = {**PARAMS, "weight_graph": 0.2}
+    monkeypatch.setattr(rec_cache.graph_rec, "missing_edges", lambda ids: [1])
+    cold = rec_cache.make_key([1], params)
+    monkeypatch.setattr(rec_cache.graph_rec, "missing_edges", lambda ids: [])
+    assert rec_cache.make_key([1], params) != cold
+
+def test_put_get_from_memory_and_disk():
+    key = rec_cache.make_key([1, 2], PARAMS)
+    rec_cache.put(key, [{"id": 10}])
+    assert rec_cache.get(key) == [{"id": 10}]
+    rec_cache._MEMORY.clear()  # outro processo: só o arquivo
+    assert rec_cache.get(key) == [{"id": 10}]
+
+def test_expired_entries_are_misses(monkeypatch):
+    key = rec_cache.make_key([1], PARAMS)
+    rec_cache.put(key, [{"id": 10}])
+    monkeypatch.setattr(rec_cache, "TTL_SECONDS", -1)
+    assert rec_cache.get(key) is None
+
+def test_get_or_compute_computes_once():
+    calls = []
+    compute = lambda: calls.append(1) or [{"id": 5}]
+    assert rec_cache.get_or_compute([1], PARAMS, compute) == [{"id": 5}]
+    assert rec_cache.get_or_compute([1], PARAMS, compute) == [{"id": 5}]
+    assert len(calls) == 1
+
+def test_get_or_compute_stores_under_key_taken_before(monkeypatch):
+    params = {**PARAMS, "weight_graph": 0.2}
+    ready = []
+    monkeypatch.setattr(rec_cache.graph_rec, "missing_edges", lambda ids: [] if ready else [1])
+    cold = rec_cache.make_key([1], params)
+    # as arestas chegam durante o cálculo: a lista (sem o grafo) fica na chave fria
+    compute = lambda: ready.append(1) or [{"id": 5}]
+    assert rec_cache.get_or_compute([1], params, compute, key=cold) == [{"id": 5}]
+    assert rec_cache.get(cold) == [{"id": 5}]
+    assert rec_cache.get(rec_cache.make_key([1], params)) is None
+
+def test_invalidate_removes_only_that_favorites_set():
+    old = rec_cache.make_key([1, 2], PARAMS)
+    old_other_params = rec_cache.make_key([1, 2], {**PARAMS, "top_k": 5})
+    kept = rec_cache.make_key([1, 2, 3], PARAMS)
+    for key in (old, old_other_params, kept):
+        rec_cache.put(key, [{"id": 9}])
+    assert rec_cache.invalidate_favorites([2, 1]) == 2
+    assert rec_cache.get(old) is None and rec_cache.get(old_other_params) is None
+    assert rec_cache.get(kept) == [{"id": 9}]
+    assert _files() == [f"{kept}.json"]
+
+@pytest.mark.parametrize("event, current, old", [
+    ("add", [1, 2, 3], [1, 2]),
+    ("remove", [1], [1, 2]),
+    ("update", [1, 2], [1, 2]),
+])
+def test_favorites_listener_drops_previous_set(monkeypatch, event, current, old):
+    monkeypatch.setattr(rec_cache, "list_favorites", lambda: [{"id": i} for i in current])
+    stale = rec_cache.make_key(old, PARAMS)
+    rec_cache.put(stale, [{"id": 9}])
+    rec_cache.on_favorites_changed(event, {"id": 3 if event == "add" else 2})
+    assert rec_cache.get(stale) is None
+
+def test_prune_keeps_newest(monkeypatch):
+    monkeypatch.setattr(rec_cache, "TTL_SECONDS", float("inf"))
+    keys = [rec_cache.make_key([i], PARAMS) for i in range(1, 6)]
+    for i, key in enumerate(keys):
+        rec_cache.put(key, [{"id": i}])
+        os.utime(os.path.join(rec_cache.CACHE_DIR, f"{key}.json"), (1000 + i, 1000 + i))
+    assert rec_cache.prune(max_entries=2) == 3
+    assert _files() == sorted(f"{k}.json" for k in keys[-2:])
@@ -0,0 +1,104 @@
+# test_shared_store.py
+import threading
+import time
+
+import rec_cache
+import shared_store
+import tmdb_client
+from shared_store import SharedStore
+
+def test_lru_eviction_by_bytes():
+    store = SharedStore(budget_bytes=100)
+    store.put("a", "x", size=40)
+    store.put("b", "y", size=40)
+    assert store.get("a") == "x"  # "a" passa a ser o mais recente
+    store.put("c", "z", size=40)
+    assert store.get("b") is None
+    assert store.get("a") == "x" and store.get("c") == "z"
+    assert store.used_bytes == 80
+    assert store.stats()["evictions"] == 1
+
+def test_value_larger_than_budget_is_not_stored():
+    store = SharedStore(budget_bytes=10)
+    store.put("big", "x" * 100)
+    assert store.get("big") is None and store.used_bytes == 0
+
+def test_replacing_a_key_keeps_byte_count():
+    store = SharedStore(budget_bytes=100)
+    store.put("a", "x", size=30)
+    store.put("a", "y", size=50)
+    assert store.used_bytes == 50 and store.get("a") == "y"
+
+def test_expired_entry_is_a_miss_and_reloads(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(shared_store.time, "time", lambda: now[0])
+    store = SharedStore()
+    store.put("k", {"v": 1}, ttl=60)
+    now[0] += 59
+    assert store.get("k") == {"v": 1}
+    now[0] += 2
+    assert store.get("k") is None
+    assert store.used_bytes == 0
+    assert store.get_or_load("k", lambda: {"v": 2}, ttl=60) == {"v": 2}
+
+def test_no_ttl_never_expires(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(shared_store.time, "time", lambda: now[0])
+    store = SharedStore()
+    store.put("k", 1)
+    now[0] += 10 ** 9
+    assert store.get("k") == 1
+
+def test_get_or_load_single_flight():
+    store = SharedStore()
+    calls = []
+    started = threading.Event()
+
+    def slow():
+        calls.append(1)
+        started.set()
+        time.sleep(0.1)
+        return {"v": 1}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(store.get_or_load("k", slow))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert results == [{"v": 1}] * 8
+    assert store._loading == {}  # o lock da chave sai quando o último termina
+
+def test_empty_results_are_not_stored():
+    store = SharedStore()
+    assert store.get_or_load("k", lambda: {}) == {}
+    assert store.get("k") is None
+
+def test_discard_where():
+    store = SharedStore()
+    store.put(("recs", "aaa-1"), [1])
+    store.put(("recs", "bbb-1"), [2])
+    store.put(("search", "aaa", 1), {"results": []})
+    assert store.discard_where(lambda k: k[0] == "recs" and k[1].startswith("aaa-")) == 1
+    assert store.get(("recs", "aaa-1")) is None
+    assert store.get(("recs", "bbb-1")) == [2]
+
+def test_favorites_change_drops_old_recs(monkeypatch):
+    monkeypatch.setattr(rec_cache, "get_text_model", lambda: None)
+    monkeypatch.setattr(rec_cache, "list_favorites", lambda: [{"id": 1}, {"id": 2}])
+    old = shared_store.recs_key(rec_cache.make_key([1], {"engine": "tfidf"}))
+    current = shared_store.recs_key(rec_cache.make_key([1, 2], {"engine": "tfidf"}))
+    shared_store.STORE.put(old, [{"id": 7}])
+    shared_store.STORE.put(current, [{"id": 8}])
+    shared_store._on_favorites_changed("add", {"id": 2})
+    assert shared_store.STORE.get(old) is None
+    assert shared_store.STORE.get(current) == [{"id": 8}]
+
+def test_store_hits_are_counted_as_requests():
+    key = shared_store.search_key("matrix", 1)
+    shared_store.STORE.put(key, {"results": [{"id": 1}]})
+    shared_store.search_page("matrix", 1)
+    shared_store.search_page("matrix", 1)
+    counts = [e["count"] for e in tmdb_client.tracked_requests().values() if e["kind"] == "search"]
+    assert counts == [2]
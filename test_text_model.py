@@ -0,0 +1,58 @@
+# test_text_model.py
+import numpy as np
+import pytest
+
+import text_model
+from text_model import HashingTextModel, TextModel, chunked
+
+DOCS = [
+    "Piratas navegam pelo Caribe atrás de um tesouro amaldiçoado.",
+    "Um policial solitário enfrenta uma quadrilha de ladrões de bancos.",
+    "A família viaja para a praia e tudo dá errado nas férias.",
+    "Exploradores encontram um tesouro numa ilha cheia de piratas.",
+    "Dois policiais investigam ladrões de arte em Paris.",
+    "",
+    "Uma menina descobre um mundo mágico atrás do guarda-roupa.",
+    "Robôs gigantes defendem a cidade de monstros vindos do mar.",
+]
+
+def _dense(model, docs=DOCS):
+    return model.transform(docs).toarray()
+
+def test_streamed_batches_match_one_shot_fit():
+    one_shot = HashingTextModel().partial_fit(DOCS)
+    streamed = HashingTextModel.fit_stream(chunked(iter(DOCS), 3))
+    assert streamed.n_docs == one_shot.n_docs == len(DOCS)
+    assert np.array_equal(streamed.doc_freq, one_shot.doc_freq)
+    assert np.allclose(_dense(streamed), _dense(one_shot))
+
+def test_online_idf_update_matches_refit():
+    model = HashingTextModel.fit(DOCS[:4])
+    before = _dense(model)
+    model.partial_fit(DOCS[4:])
+    # IDF atualizado com os documentos novos: igual a ajustar tudo de uma vez
+    assert np.allclose(_dense(model), _dense(HashingTextModel.fit(DOCS)))
+    assert not np.allclose(_dense(model), before)
+
+def test_hashing_matches_tfidf_within_tolerance():
+    hashed = HashingTextModel.fit(DOCS)
+    tfidf = TextModel.fit(DOCS)
+    sim_hashed = _dense(hashed) @ _dense(hashed).T
+    sim_tfidf = _dense(tfidf) @ _dense(tfidf).T
+    assert np.allclose(sim_hashed, sim_tfidf, atol=1e-6)
+
+def test_fit_text_model_streams_a_generator(monkeypatch):
+    monkeypatch.setattr(text_model, "_MODEL", None)
+    monkeypatch.setattr(text_model, "CHUNK_SIZE", 2)
+    model = text_model.fit_text_model((d for d in DOCS), mode="hashing")
+    assert isinstance(model, HashingTextModel) and model.n_docs == len(DOCS)
+    loaded = TextModel.load()
+    assert isinstance(loaded, HashingTextModel)
+    assert np.allclose(_dense(loaded), _dense(model))
+    assert text_model.fit_text_model(iter([]), mode="hashing") is None
+
+@pytest.mark.parametrize("size", [1, 3, 100])
+def test_chunked_keeps_every_text(size):
+    chunks = list(chunked(iter(DOCS), size))
+    assert [t for c in chunks for t in c] == DOCS
+    assert all(0 < len(c) <= size for c in chunks)
@@ -0,0 +1,130 @@
+# test_tmdb_resilience.py
+import requests
+
+import catalog
+import rec_cache
+import shared_store
+import tmdb_client
+from tmdb_client import CircuitBreaker
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+def _breaker(monkeypatch, failures=3, cooldown=30):
+    clock = FakeClock()
+    monkeypatch.setattr(tmdb_client.time, "monotonic", clock)
+    return CircuitBreaker("test", failures=failures, cooldown=cooldown), clock
+
+def _response(status=200, body=b'{"results": [{"id": 1}]}'):
+    resp = requests.Response()
+    resp.status_code = status
+    resp._content = body
+    return resp
+
+def test_breaker_opens_after_consecutive_failures(monkeypatch):
+    b, _ = _breaker(monkeypatch)
+    b.failure()
+    b.failure()
+    b.success()  # sucesso zera a sequência
+    b.failure()
+    b.failure()
+    assert b.state == "closed" and b.allow()
+    b.failure()
+    assert b.state == "open"
+    assert not b.allow()
+
+def test_breaker_half_open_probe(monkeypatch):
+    b, clock = _breaker(monkeypatch, failures=1)
+    b.failure()
+    clock.now += 29
+    assert not b.allow()
+    clock.now += 2
+    assert b.allow()          # sondagem
+    assert b.state == "half_open"
+    assert not b.allow()      # só uma por vez
+    b.success()
+    assert b.state == "closed" and b.allow()
+
+def test_breaker_failed_probe_reopens(monkeypatch):
+    b, clock = _breaker(monkeypatch, failures=1)
+    b.failure()
+    clock.now += 31
+    assert b.allow()
+    b.failure()
+    assert b.state == "open"
+    assert not b.allow()
+    assert b.snapshot()["retry_in"] == 30
+
+def test_fetch_skips_call_when_breaker_open(monkeypatch):
+    calls = []
+    monkeypatch.setattr(tmdb_client.requests, "get", lambda *a, **k: calls.append(1) or _response())
+    b = tmdb_client.breaker("search")
+    for _ in range(b.max_failures):
+        b.failure()
+    assert tmdb_client._fetch("search", "http://tmdb/search", {}) == {}
+    assert calls == []
+
+def test_fetch_server_errors_and_bad_json_count_as_failures(monkeypatch):
+    responses = iter([_response(500), _response(429), _response(200, b"<html>"), _response(404)])
+    monkeypatch.setattr(tmdb_client.requests, "get", lambda *a, **k: next(responses))
+    for _ in range(3):
+        assert tmdb_client._fetch("videos", "http://tmdb/videos", {}) == {}
+    assert tmdb_client.breaker("videos").failures == 3
+    # 4xx é resposta válida do TMDB: não conta como falha
+    assert tmdb_client._fetch("videos", "http://tmdb/videos", {}) == {}
+    assert tmdb_client.breaker("videos").failures == 0
+
+def test_fetch_without_deadline_left_does_not_call(monkeypatch):
+    calls = []
+    monkeypatch.setattr(tmdb_client.requests, "get", lambda *a, **k: calls.append(1) or _response())
+    with tmdb_client.deadline(0):
+        assert tmdb_client._fetch("search", "http://tmdb/search", {}) == {}
+    assert calls == []
+
+def test_fallback_prefers_stale_cache_and_is_tagged():
+    key = tmdb_client.request_key("search", "matrix", 1)
+    tmdb_client._cache_set(key, {"results": [{"id": 603}]}, -1)  # vencido
+    resp = tmdb_client.search_movie("matrix")
+    assert resp["results"] == [{"id": 603}]
+    assert tmdb_client.is_fallback(resp)
+    # a cópia vencida no cache não ganha a marca
+    assert not tmdb_client.is_fallback(tmdb_client._SIMPLE_CACHE[key])
+
+def test_fallback_uses_local_catalog():
+    catalog.add_movies([{"id": 1, "title": "Matrix", "popularity": 10, "genre_ids": [878]},
+                        {"id": 2, "title": "Outro", "popularity": 5, "genre_ids": [18]}])
+    resp = tmdb_client.search_movie("matrix")
+    assert [m["id"] for m in resp["results"]] == [1]
+    assert tmdb_client.is_fallback(resp)
+
+def test_fallback_without_data_is_empty():
+    assert tmdb_client.get_movie_videos(1) == {}
+
+def test_genres_fallback_is_not_tagged():
+    key = tmdb_client.request_key("genres")
+    tmdb_client._cache_set(key, {"acao": 28}, -1)
+    with tmdb_client.watch_fallbacks() as seen:
+        assert tmdb_client.get_genres() == {"acao": 28}
+    assert seen["count"] == 1
+
+def test_watch_fallbacks_nested_counts_reach_outer():
+    with tmdb_client.watch_fallbacks() as outer:
+        with tmdb_client.watch_fallbacks() as inner:
+            tmdb_client.get_movie_videos(1)
+        assert inner["count"] == 1
+    assert outer["count"] == 1
+    assert tmdb_client.fallbacks_seen() == 0
+
+def test_degraded_results_are_not_cached(monkeypatch):
+    monkeypatch.setattr(rec_cache, "get_text_model", lambda: None)
+    tmdb_client._cache_set(tmdb_client.request_key("search", "matrix", 1), {"results": [{"id": 603}]}, -1)
+    assert shared_store.search_page("matrix", 1)["results"] == [{"id": 603}]
+    assert shared_store.STORE.get(shared_store.search_key("matrix", 1)) is None
+
+    recs = rec_cache.get_or_compute([1], {"engine": "t"}, lambda: tmdb_client.search_movie("matrix")["results"])
+    assert recs == [{"id": 603}]
+    assert rec_cache.get(rec_cache.make_key([1], {"engine": "t"})) is None
@@ -0,0 +1,72 @@
+# test_user_profile.py
+import os
+
+import numpy as np
+import pytest
+
+import favorites
+import user_profile
+from text_model import TextModel
+from user_profile import UserProfile
+
+MOVIES = [
+    {"id": 1, "title": "A", "genre_ids": [28, 12], "overview": "piratas navegam atrás de um tesouro perdido"},
+    {"id": 2, "title": "B", "genre_ids": [35], "overview": "uma família atrapalhada viaja para a praia"},
+    {"id": 3, "title": "C", "genre_ids": [28], "overview": "um policial enfrenta uma quadrilha de ladrões"},
+    {"id": 4, "title": "D", "genre_ids": [16, 35], "overview": ""},
+    {"id": 5, "title": "E", "genre_ids": [12], "overview": "exploradores encontram um tesouro numa ilha"},
+]
+
+@pytest.fixture
+def model(monkeypatch):
+    model = TextModel.fit([m["overview"] for m in MOVIES if m["overview"]])
+    monkeypatch.setattr(user_profile, "get_text_model", lambda: model)
+    return model
+
+def _assert_same(prof, expected):
+    assert prof.ids == expected.ids
+    assert +prof.genre_counts == +expected.genre_counts
+    assert prof.text_ids == expected.text_ids
+    assert np.allclose(prof.text_sum, expected.text_sum)
+    assert np.allclose(prof.text_query().toarray(), expected.text_query().toarray())
+
+def test_incremental_add_remove_matches_rebuild(model):
+    by_id = {m["id"]: m for m in MOVIES}
+    prof = UserProfile.from_favorites([], model)
+    current = []
+    for op, mid in [("add", 1), ("add", 2), ("add", 3), ("add", 2), ("remove", 1),
+                    ("add", 4), ("add", 5), ("remove", 9), ("remove", 4), ("add", 1)]:
+        if op == "add":
+            prof.add(by_id[mid], model)
+            if mid not in current:
+                current.append(mid)
+        else:
+            prof.remove(by_id.get(mid, {"id": mid}), model)
+            current = [i for i in current if i != mid]
+    _assert_same(prof, UserProfile.from_favorites([by_id[i] for i in current], model))
+
+def test_listener_keeps_saved_profile_in_sync(model):
+    for m in MOVIES[:3]:
+        favorites.add_favorite(m)
+    favorites.remove_favorite(2)
+    _assert_same(user_profile.get_profile(), UserProfile.from_favorites([MOVIES[0], MOVIES[2]], model))
+    # outro processo lê o perfil salvo
+    user_profile._PROFILE = None
+    _assert_same(UserProfile.load(), UserProfile.from_favorites([MOVIES[0], MOVIES[2]], model))
+
+def test_rebuilds_when_favorites_changed_behind_its_back(model):
+    favorites.add_favorite(MOVIES[0])
+    # outro processo grava o favorites.json sem passar pelos listeners
+    favorites._write_file([MOVIES[0], MOVIES[4]])
+    later = os.path.getmtime(user_profile.PROFILE_FILE) + 10
+    os.utime(favorites.FAV_FILE, (later, later))
+    _assert_same(user_profile.get_profile(), UserProfile.from_favorites([MOVIES[0], MOVIES[4]], model))
+
+def test_delta_is_dropped_when_ids_disagree_with_file(model):
+    favorites.add_favorite(MOVIES[0])
+    favorites._write_file([MOVIES[0], MOVIES[4]])
+    # o add seguinte não confere com o arquivo (falta o 5 no perfil): reconstrói
+    favorites.add_favorite(MOVIES[2])
+    expected = UserProfile.from_favorites([MOVIES[0], MOVIES[4], MOVIES[2]], model)
+    _assert_same(user_profile._PROFILE, expected)
+    _assert_same(UserProfile.load(), expected)
@@ -0,0 +1,102 @@
+# test_warm_cache.py
+import pytest
+
+import tmdb_client
+import warm_cache
+from warm_cache import WarmingScheduler
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(tmdb_client.time, "time", clock)
+    return clock
+
+@pytest.fixture
+def tmdb(monkeypatch):
+    """TMDB falso: cada chamada devolve uma versão nova da página."""
+    calls = []
+
+    def fetch(kind, url, params):
+        calls.append((kind, params.get("query")))
+        return {"page": 1, "results": [{"id": 1}], "version": len(calls)}
+
+    monkeypatch.setattr(tmdb_client, "_fetch", fetch)
+    return calls
+
+SEARCH_TTL = tmdb_client.ttl_for("search")
+
+def _count(term):
+    entry = tmdb_client.tracked_requests().get(tmdb_client.request_key("search", term, 1))
+    return entry and entry["count"]
+
+def test_expired_entries_are_refetched(clock, tmdb):
+    assert tmdb_client.search_movie("matrix")["version"] == 1
+    clock.now += SEARCH_TTL - 1
+    assert tmdb_client.search_movie("matrix")["version"] == 1
+    clock.now += 2
+    assert tmdb_client.search_movie("matrix")["version"] == 2
+    assert len(tmdb) == 2
+    assert _count("matrix") == 3
+
+def test_purge_expired_keeps_the_grace_window(clock, tmdb):
+    tmdb_client.search_movie("matrix")
+    key = tmdb_client.request_key("search", "matrix", 1)
+    clock.now += SEARCH_TTL + 10
+    assert tmdb_client.purge_expired(grace=60) == 0
+    assert tmdb_client.cache_expires_at(key)   # vencida, mas ainda serve de fallback
+    clock.now += 60
+    assert tmdb_client.purge_expired(grace=60) == 1
+    assert tmdb_client.cache_expires_at(key) == 0.0
+
+def test_only_hot_keys_near_expiry_are_due(clock, tmdb):
+    for _ in range(3):
+        tmdb_client.search_movie("matrix")
+    tmdb_client.search_movie("raro")                     # frio: menos que MIN_COUNT pedidos
+    tmdb_client.get_movie_details(603)                   # tipo que o scheduler não reaquece
+    tmdb_client.get_movie_details(603)
+    scheduler = WarmingScheduler(tick=1)
+    assert scheduler.due() == []
+    clock.now += SEARCH_TTL * (1 - warm_cache.REFRESH_AHEAD) + 1
+    assert [e["args"] for _, e in scheduler.due()] == [["matrix", 1]]
+
+def test_run_once_rewarms_without_counting_as_a_request(clock, tmdb):
+    for _ in range(3):
+        tmdb_client.search_movie("matrix")
+    tmdb_client.search_movie("raro")
+    key = tmdb_client.request_key("search", "matrix", 1)
+    clock.now += SEARCH_TTL - 1
+    scheduler = WarmingScheduler(tick=1)
+    assert scheduler.run_once() == 1
+    assert tmdb[-1] == ("search", "matrix")
+    assert tmdb_client.cache_expires_at(key) == clock.now + SEARCH_TTL
+    assert tmdb_client.search_movie("matrix")["version"] == 3  # servido do cache reaquecido
+    clock.now += 2
+    assert tmdb_client.search_movie("raro")["version"] == 4   # o frio venceu e foi buscado de novo
+
+def test_counts_decay_until_keys_stop_being_rewarmed(clock, tmdb, monkeypatch):
+    monkeypatch.setattr(warm_cache, "COUNT_HALF_LIFE", 1.0)
+    for _ in range(4):
+        tmdb_client.search_movie("matrix")
+    tmdb_client.search_movie("fixa")
+    scheduler = WarmingScheduler(tick=1)                # meia-vida = um tick
+    scheduler.pinned = {tmdb_client.request_key("search", "fixa", 1)}
+    clock.now += SEARCH_TTL
+    scheduler.run_once()                                # reaquece os dois; 4 -> 2
+    assert _count("matrix") == 2 and _count("fixa") == 0.5
+    clock.now += SEARCH_TTL
+    assert [e["args"][0] for _, e in scheduler.due()] == ["fixa", "matrix"]  # fixas primeiro
+    scheduler.run_once()                                # 2 -> 1: abaixo de MIN_COUNT
+    clock.now += SEARCH_TTL
+    assert [e["args"][0] for _, e in scheduler.due()] == ["fixa"]
+    for _ in range(5):
+        scheduler.run_once()
+    # abaixo do piso a consulta observada é esquecida; a fixa fica
+    assert _count("matrix") is None
+    assert _count("fixa") is not None
@@ -0,0 +1,294 @@
+# text_model.py
+"""
+Modelo de texto (TF-IDF) ajustado uma vez sobre o catálogo e salvo em disco.
+
+Antes cada clique em "Gerar recomendações" criava e ajustava um
+TfidfVectorizer novo; agora o vocabulário e o IDF vêm prontos, o request só
+faz `transform` e a similaridade vira um produto escalar esparso. O modelo é
+reajustado em background quando passa de REFIT_INTERVAL.
+
+Há dois modos (MOVIEBOT_TEXT_MODEL_MODE):
+- "tfidf" (padrão): TfidfVectorizer com vocabulário, precisa do corpus inteiro;
+- "hashing": feature hashing + IDF acumulado em streaming, lendo o corpus em
+  blocos de um gerador. A memória é fixa (HASH_FEATURES contadores), não
+  importa quantas sinopses passem.
+"""
+import os
+import pickle
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS, HashingVectorizer, TfidfVectorizer
+from sklearn.preprocessing import normalize
+
+import catalog
+from tmdb_client import normalize_text
+from logger_conf import get_logger
+
+logger = get_logger(__name__)
+
+MODEL_FILE = os.path.join(os.path.dirname(__file__), "data", "text_model.pkl")
+
+# reajuste a cada 24h por padrão (configurável via ambiente)
+REFIT_INTERVAL = float(os.getenv("MOVIEBOT_TEXT_MODEL_REFIT_HOURS", "24")) * 3600
+
+MAX_FEATURES = 5000
+# formato do arquivo salvo; modelos de outro formato (ex: com as stopwords só
+# do inglês) são ignorados no load e reajustados
+FORMAT = 2
+
+MODE = os.getenv("MOVIEBOT_TEXT_MODEL_MODE", "tfidf")
+
+# dimensão do espaço do modo "hashing" (também é o tamanho do vetor do perfil
+# e da projeção do índice ANN, por isso não é maior)
+HASH_FEATURES = 2 ** 16
+# sinopses por bloco no ajuste em streaming
+CHUNK_SIZE = 2000
+
+# stopwords em português já sem acento (o texto passa por normalize_text antes
+# de ser quebrado em tokens); as sinopses que caem no en-US usam as do inglês
+PT_STOP_WORDS = frozenset("""
+a ao aos aquela aquelas aquele aqueles aquilo as ate com como da das de dela delas dele deles
+depois do dos e ela elas ele eles em entre era eram essa essas esse esses esta estas este estes
+eu foi foram ha isso isto ja la lhe lhes mais mas me mesmo meu meus minha minhas muito na nas
+nem no nos nossa nossas nosso nossos num numa o os ou para pela pelas pelo pelos por quando que
+quem se sem ser seu seus so sua suas tambem te tem ter seja sao sobre um uma umas uns voce voces
+vai vao esta estao estava estavam sera serao seria tudo todo toda todos todas apos ainda onde
+""".split())
+STOP_WORDS = sorted(PT_STOP_WORDS | ENGLISH_STOP_WORDS)
+
+class TextModel:
+    """TfidfVectorizer já ajustado + metadados (quando foi ajustado e sobre quantos docs)."""
+
+    def __init__(self, vectorizer: TfidfVectorizer, fitted_at: float, n_docs: int):
+        self.vectorizer = vectorizer
+        self.fitted_at = fitted_at
+        self.n_docs = n_docs
+
+    @property
+    def version(self) -> str:
+        # muda a cada ajuste; quem guarda vetores (perfil, caches) compara com isso
+        return str(int(self.fitted_at))
+
+    @property
+    def n_features(self) -> int:
+        return len(self.vectorizer.vocabulary_)
+
+    @classmethod
+    def fit(cls, texts: List[str]) -> "TextModel":
+        vect = tfidf_vectorizer()
+        vect.fit(texts)
+        return cls(vect, time.time(), len(texts))
+
+    def transform(self, texts: List[str]):
+        """Matriz esparsa (len(texts), n_features) com linhas normalizadas (L2)."""
+        return self.vectorizer.transform([t or "" for t in texts])
+
+    @staticmethod
+    def similarity(query_vec, doc_vecs) -> np.ndarray:
+        """Cosseno entre um vetor (1, F) e cada linha de doc_vecs: com linhas L2 é só o produto escalar."""
+        return np.asarray((doc_vecs @ query_vec.T).todense()).ravel()
+
+    def is_stale(self, max_age: float = REFIT_INTERVAL) -> bool:
+        return (time.time() - self.fitted_at) > max_age
+
+    def save(self, path: Optional[str] = None) -> None:
+        path = path or MODEL_FILE
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        # guarda só os campos (e não a instância) para o arquivo não depender
+        # de onde a classe foi importada (ex: `python text_model.py` -> __main__)
+        state = self._state()
+        with open(tmp, "wb") as f:
+            pickle.dump(state, f)
+        os.replace(tmp, path)
+
+    def _state(self) -> dict:
+        return {"kind": "tfidf", "format": FORMAT, "vectorizer": self.vectorizer, "fitted_at": self.fitted_at,
+                "n_docs": self.n_docs}
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> Optional["TextModel"]:
+        path = path or MODEL_FILE
+        try:
+            with open(path, "rb") as f:
+                state = pickle.load(f)
+            if state.get("format") != FORMAT:
+                logger.info("text_model: modelo salvo em formato antigo, será reajustado")
+                return None
+            if state.get("kind") == "hashing":
+                return HashingTextModel(state["doc_freq"], state["fitted_at"], state["n_docs"])
+            return TextModel(state["vectorizer"], state["fitted_at"], state["n_docs"])
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning("text_model: modelo ilegível, ignorando: %s", e)
+            return None
+
+def tfidf_vectorizer(max_features: int = MAX_FEATURES) -> TfidfVectorizer:
+    """TfidfVectorizer do modo padrão: sem acentos, stopwords em português e inglês."""
+    return TfidfVectorizer(preprocessor=normalize_text, stop_words=STOP_WORDS, max_features=max_features)
+
+def _hashing_vectorizer() -> HashingVectorizer:
+    return HashingVectorizer(
+        n_features=HASH_FEATURES, preprocessor=normalize_text, stop_words=STOP_WORDS,
+        alternate_sign=False, norm=None,
+    )
+
+class HashingTextModel(TextModel):
+    """
+    TF-IDF sem vocabulário: cada termo cai num dos HASH_FEATURES baldes e o
+    IDF sai de contadores de frequência por documento, acumulados bloco a
+    bloco (`partial_fit`). Mesma interface do TextModel.
+    """
+
+    def __init__(self, doc_freq: Optional[np.ndarray] = None, fitted_at: float = 0.0, n_docs: int = 0):
+        super().__init__(_hashing_vectorizer(), fitted_at, n_docs)
+        self.doc_freq = doc_freq if doc_freq is not None else np.zeros(HASH_FEATURES, dtype=np.int64)
+
+    @property
+    def n_features(self) -> int:
+        return len(self.doc_freq)
+
+    @property
+    def idf(self) -> np.ndarray:
+        # mesma fórmula do TfidfVectorizer (smooth_idf=True)
+        return np.log((1 + self.n_docs) / (1 + self.doc_freq)) + 1.0
+
+    def partial_fit(self, texts: List[str]) -> "HashingTextModel":
+        """Soma um bloco de sinopses às estatísticas de IDF."""
+        counts = self.vectorizer.transform([t or "" for t in texts])
+        counts.data[:] = 1
+        self.doc_freq += np.asarray(counts.sum(axis=0), dtype=np.int64).ravel()
+        self.n_docs += len(texts)
+        self.fitted_at = time.time()
+        return self
+
+    @classmethod
+    def fit(cls, texts: List[str]) -> "HashingTextModel":
+        return cls.fit_stream(chunked(texts, CHUNK_SIZE))
+
+    @classmethod
+    def fit_stream(cls, chunks: Iterable[List[str]]) -> "HashingTextModel":
+        """Ajusta lendo blocos de um gerador; só um bloco fica em memória por vez."""
+        model = cls()
+        for chunk in chunks:
+            if chunk:
+                model.partial_fit(chunk)
+        model.fitted_at = time.time()
+        return model
+
+    def transform(self, texts: List[str]):
+        counts = self.vectorizer.transform([t or "" for t in texts])
+        return normalize(counts @ sp.diags(self.idf), norm="l2", copy=False).tocsr()
+
+    def _state(self) -> dict:
+        return {"kind": "hashing", "format": FORMAT, "doc_freq": self.doc_freq, "fitted_at": self.fitted_at,
+                "n_docs": self.n_docs}
+
+def chunked(texts: Iterable[str], size: int = CHUNK_SIZE) -> Iterator[List[str]]:
+    """Quebra qualquer iterável de textos (lista, arquivo, gerador) em blocos de `size`."""
+    it = iter(texts)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+# ---------- ajuste / carregamento ----------
+_MODEL: Optional[TextModel] = None
+_MODEL_LOCK = threading.Lock()
+_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="text-model")
+_REFIT: Optional[Future] = None
+_REFIT_STARTED = 0.0
+# intervalo mínimo entre tentativas (evita martelar o TMDB se o ajuste falhar)
+_REFIT_RETRY = 600
+# processos que só leem o modelo (ex: workers do batch_recs) desligam o reajuste automático
+AUTO_REFIT = True
+
+def catalog_corpus() -> List[str]:
+    return [m.get("overview") or "" for m in catalog.all_movies() if m.get("overview")]
+
+def iter_catalog_overviews() -> Iterator[str]:
+    return (m["overview"] for m in catalog.all_movies() if m.get("overview"))
+
+def fit_text_model(texts: Optional[Iterable[str]] = None, refresh_catalog: bool = False,
+                   mode: Optional[str] = None) -> Optional[TextModel]:
+    """
+    Ajusta sobre `texts` (padrão: sinopses do catálogo), salva e passa a servir o novo modelo.
+    No modo "hashing", `texts` pode ser um gerador de qualquer tamanho.
+    """
+    global _MODEL
+    mode = mode or MODE
+    if texts is None:
+        if refresh_catalog:
+            catalog.refresh_catalog()
+        texts = iter_catalog_overviews() if mode == "hashing" else catalog_corpus()
+    if mode == "hashing":
+        model = HashingTextModel.fit_stream(chunked(texts, CHUNK_SIZE))
+        if not model.n_docs:
+            return None
+    else:
+        texts = list(texts)
+        if not texts:
+            return None
+        model = TextModel.fit(texts)
+    model.save()
+    with _MODEL_LOCK:
+        _MODEL = model
+    return model
+
+def schedule_refit() -> Future:
+    """Reajusta em background (atualizando o catálogo antes); pedidos repetidos reaproveitam o job."""
+    global _REFIT, _REFIT_STARTED
+    with _MODEL_LOCK:
+        if _REFIT is None or _REFIT.done():
+            _REFIT_STARTED = time.time()
+            _REFIT = _EXECUTOR.submit(_refit_job)
+        return _REFIT
+
+def _refit_job() -> Optional[TextModel]:
+    try:
+        return fit_text_model(refresh_catalog=True)
+    except Exception as e:
+        logger.exception("text_model: reajuste falhou")
+        return None
+
+def get_text_model() -> Optional[TextModel]:
+    """
+    Modelo pronto para `transform`, ou None se ainda não existe nenhum
+    (nesse caso um ajuste é agendado e o chamador usa o caminho antigo).
+    """
+    global _MODEL
+    with _MODEL_LOCK:
+        if _MODEL is None:
+            _MODEL = TextModel.load()
+        model = _MODEL
+    # trocar MOVIEBOT_TEXT_MODEL_MODE também pede um reajuste
+    wrong_mode = model is not None and isinstance(model, HashingTextModel) != (MODE == "hashing")
+    if AUTO_REFIT and (model is None or wrong_mode or model.is_stale()) and time.time() - _REFIT_STARTED > _REFIT_RETRY:
+        schedule_refit()
+    return model
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Ajusta e salva o modelo de texto sobre o catálogo local.")
+    parser.add_argument("--refresh-catalog", action="store_true", help="atualiza o catálogo via TMDB antes de ajustar")
+    parser.add_argument("--mode", choices=("tfidf", "hashing"), default=MODE)
+    parser.add_argument("--corpus", help="arquivo com uma sinopse por linha (em vez do catálogo; lido em streaming no modo hashing)")
+    args = parser.parse_args()
+    if args.corpus:
+        with open(args.corpus, "r", encoding="utf-8") as corpus:
+            m = fit_text_model((line.strip() for line in corpus if line.strip()), mode=args.mode)
+    else:
+        m = fit_text_model(refresh_catalog=args.refresh_catalog, mode=args.mode)
+    if m is None:
+        print("Catálogo vazio — rode `python catalog.py` ou use --refresh-catalog.")
+    else:
+        print(f"Modelo ajustado: {m.n_docs} documentos, {m.n_features} termos (versão {m.version}).")
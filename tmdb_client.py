@@ -1,13 +1,23 @@
 # tmdb_client.py
+import contextvars
 import os
+import threading
+import time
 import requests
 import unicodedata
+from collections import OrderedDict
+from contextlib import contextmanager
 from dotenv import load_dotenv
-from typing import Dict, List
+from typing import Dict, List, Optional
+
+import tracing
+from logger_conf import get_logger
 
 # Carrega .env
 load_dotenv()
 
+logger = get_logger(__name__)
+
 # Leitura das chaves do ambiente
 API_KEY_V4 = os.getenv("TMDB_API_KEY")       # Bearer token (v4), opcional
 API_KEY_V3 = os.getenv("TMDB_API_KEY_V3")    # API Key v3 (curta), preferível para query params
@@ -17,10 +27,34 @@ HEADERS = {
     "accept": "application/json"
 } if API_KEY_V4 else {}
 
-BASE_URL = "https://api.themoviedb.org/3"
+# TMDB_BASE_URL aponta para outro servidor compatível (ex: o TMDB falso do loadtest.py)
+BASE_URL = os.getenv("TMDB_BASE_URL", "https://api.themoviedb.org/3").rstrip("/")
 
 # cache simples em memória (opcional): maps (endpoint, frozenset(params.items())) -> response_json
 _SIMPLE_CACHE: Dict[str, dict] = {}
+# chave -> quando expira (time.time()); valor vencido continua guardado até ser rebuscado
+_CACHE_EXPIRES: Dict[str, float] = {}
+# escritas nos dois dicts acima (requisições, reaquecimento e limpeza rodam em threads diferentes)
+_CACHE_LOCK = threading.Lock()
+
+# TTL padrão (segundos) por tipo de consulta
+CACHE_TTL = float(os.getenv("MOVIEBOT_TMDB_CACHE_TTL", "300"))
+TTLS = {
+    "genres": 24 * 3600,
+    "discover": 600,
+    "search": CACHE_TTL,
+    "recommendations": 6 * 3600,
+    "videos": 24 * 3600,
+    "details": 24 * 3600,
+}
+
+# consultas vistas por chave de cache: {"kind", "args", "count"} — usado pelo
+# warm_cache para salvar/reaquecer as mais pedidas. Limitado a MAX_TRACKED
+# consultas (LRU: buscas digitadas uma vez só vão saindo)
+MAX_TRACKED = int(os.getenv("MOVIEBOT_TMDB_MAX_TRACKED", "5000"))
+_REQUESTS: "OrderedDict[str, dict]" = OrderedDict()
+_REQUESTS_LOCK = threading.Lock()
+_BYPASS = threading.local()
 
 # ---------- utilitários ----------
 def normalize_text(text: str) -> str:
@@ -34,76 +68,374 @@ def normalize_text(text: str) -> str:
     )
 
 def _cache_get(key: str):
+    if getattr(_BYPASS, "active", False):
+        return None
+    if _CACHE_EXPIRES.get(key, 0) < time.time():
+        return None
     return _SIMPLE_CACHE.get(key)
 
-def _cache_set(key: str, value: dict, ttl_seconds: int = 300):
-    # TTL não implementado aqui; é apenas cache simples sem expiração para este projeto
-    _SIMPLE_CACHE[key] = value
+def ttl_for(kind: str) -> float:
+    return TTLS.get(kind, CACHE_TTL)
+
+def cache_expires_at(key: str) -> float:
+    """Quando a entrada vence (0 se não está no cache)."""
+    return _CACHE_EXPIRES.get(key, 0.0) if key in _SIMPLE_CACHE else 0.0
+
+def purge_expired(grace: float = 3600) -> int:
+    """Remove entradas vencidas há mais de `grace` segundos. Retorna quantas."""
+    limit = time.time() - grace
+    with _CACHE_LOCK:
+        old = [k for k, exp in _CACHE_EXPIRES.items() if exp < limit]
+        for k in old:
+            _SIMPLE_CACHE.pop(k, None)
+            _CACHE_EXPIRES.pop(k, None)
+    return len(old)
+
+@contextmanager
+def bypass_cache():
+    """Dentro do bloco, as funções ignoram o cache e buscam de novo (o valor antigo fica se a busca falhar)."""
+    _BYPASS.active = True
+    try:
+        yield
+    finally:
+        _BYPASS.active = False
+
+def _note_request(key: str, kind: str, *args) -> None:
+    with _REQUESTS_LOCK:
+        entry = _REQUESTS.get(key)
+        if entry is None:
+            entry = _REQUESTS[key] = {"kind": kind, "args": list(args), "count": 0}
+            while len(_REQUESTS) > MAX_TRACKED:
+                _REQUESTS.popitem(last=False)
+        # reaquecimento (bypass) não conta como pedido de usuário, mas mantém a consulta na lista
+        if not getattr(_BYPASS, "active", False):
+            entry["count"] += 1
+        _REQUESTS.move_to_end(key)
+
+# ---------- leitura/restauração do cache (snapshot do warm_cache) ----------
+def cache_size() -> int:
+    return len(_SIMPLE_CACHE)
+
+def tracked_requests() -> Dict[str, dict]:
+    """Cópia de {chave: {"kind", "args", "count"}} das consultas vistas."""
+    with _REQUESTS_LOCK:
+        return {k: dict(e) for k, e in _REQUESTS.items()}
+
+def top_requests(kind: str, n: int) -> List[tuple]:
+    """As n consultas de um tipo mais pedidas (que estão no cache), da mais para a menos: [(chave, entrada)]."""
+    entries = [(k, e) for k, e in tracked_requests().items() if e["kind"] == kind and k in _SIMPLE_CACHE]
+    entries.sort(key=lambda item: -item[1]["count"])
+    return entries[:n]
+
+def decay_requests(factor: float, floor: float = 0.05, keep=()) -> None:
+    """
+    Multiplica as contagens por `factor` (média móvel exponencial: pedidos
+    antigos pesam cada vez menos) e esquece consultas abaixo de `floor`,
+    exceto as chaves em `keep`.
+    """
+    with _REQUESTS_LOCK:
+        for key in list(_REQUESTS):
+            entry = _REQUESTS[key]
+            entry["count"] *= factor
+            if entry["count"] < floor and key not in keep:
+                del _REQUESTS[key]
+
+def cached_responses(keys) -> Dict[str, dict]:
+    """Respostas em cache (vencidas ou não) das chaves pedidas."""
+    with _CACHE_LOCK:
+        return {k: _SIMPLE_CACHE[k] for k in keys if k in _SIMPLE_CACHE}
+
+def restore_cache(responses: Dict[str, dict], requests_info: Dict[str, dict]) -> None:
+    """
+    Coloca no cache respostas salvas (sem sobrescrever o que já está lá; cada
+    uma vale o TTL inteiro do seu tipo a partir de agora) e soma as contagens
+    de pedidos salvas às atuais.
+    """
+    now = time.time()
+    with _CACHE_LOCK:
+        for key, value in responses.items():
+            if key not in _SIMPLE_CACHE:
+                kind = (requests_info.get(key) or {}).get("kind", "")
+                _SIMPLE_CACHE[key] = value
+                _CACHE_EXPIRES[key] = now + ttl_for(kind)
+    with _REQUESTS_LOCK:
+        for key, entry in requests_info.items():
+            current = _REQUESTS.setdefault(key, {**entry, "count": 0})
+            current["count"] += entry.get("count", 0)
+        while len(_REQUESTS) > MAX_TRACKED:
+            _REQUESTS.popitem(last=False)
+
+def _cache_set(key: str, value: dict, ttl_seconds: float = CACHE_TTL):
+    with _CACHE_LOCK:
+        _SIMPLE_CACHE[key] = value
+        _CACHE_EXPIRES[key] = time.time() + ttl_seconds
 
 def _make_cache_key(url: str, params: dict) -> str:
     # transforma params em tupla ordenada para chave estável
     items = tuple(sorted((k, str(v)) for k, v in (params or {}).items()))
     return f"{url}|{items}"
 
-# ---------- funções principais ----------
-def search_movie(query: str, page: int = 1) -> dict:
+# ---------- disjuntor por endpoint e prazo por requisição ----------
+# teto de cada chamada HTTP (o prazo da requisição pode deixá-lo menor)
+TIMEOUT = float(os.getenv("MOVIEBOT_TMDB_TIMEOUT", "6"))
+# prazo padrão de uma requisição de usuário (aba/card do app, rota da API, comando do CLI)
+REQUEST_BUDGET = float(os.getenv("MOVIEBOT_TMDB_BUDGET", "8"))
+# com menos prazo que isso a chamada nem sai: vai direto para o fallback
+MIN_CALL_TIMEOUT = 0.25
+# falhas seguidas que abrem o disjuntor e quanto tempo ele fica aberto até a sondagem
+BREAKER_FAILURES = int(os.getenv("MOVIEBOT_TMDB_BREAKER_FAILURES", "5"))
+BREAKER_COOLDOWN = float(os.getenv("MOVIEBOT_TMDB_BREAKER_COOLDOWN", "30"))
+
+class CircuitBreaker:
     """
-    Busca filmes por texto (/search/movie).
-    Usa TMDB_API_KEY_V3 se existir (via param api_key). Caso contrário tenta Bearer v4.
-    Retorna JSON dict ou {} em caso de erro.
+    Disjuntor de um endpoint (compartilhado pelo processo):
+      - closed: as chamadas passam; BREAKER_FAILURES falhas seguidas abrem;
+      - open: nenhuma chamada sai durante `cooldown` segundos;
+      - half_open: passado o cooldown, uma chamada passa como sondagem (as
+        outras continuam barradas); sucesso fecha, falha reabre. Uma sondagem
+        que some sem resultado libera outra depois de mais um cooldown.
+    Falha = timeout, erro de rede, 5xx ou 429; outros 4xx são respostas válidas.
     """
-    if not query or not str(query).strip():
-        return {}
-
-    url = f"{BASE_URL}/search/movie"
-    params = {
-        "query": query,
-        "page": page,
-        "language": "pt-BR",
-        "include_adult": False
-    }
-
-    # cache
-    cache_key = _make_cache_key(url, params)
-    cached = _cache_get(cache_key)
-    if cached:
-        return cached
 
+    def __init__(self, name: str, failures: int = BREAKER_FAILURES, cooldown: float = BREAKER_COOLDOWN):
+        self.name = name
+        self.max_failures = failures
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.failures = 0
+        self.changed_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if time.monotonic() - self.changed_at < self.cooldown:
+                return False
+            self.state, self.changed_at = "half_open", time.monotonic()
+        logger.info("tmdb %s: disjuntor meio-aberto, sondando", self.name, extra={"endpoint": self.name})
+        return True
+
+    def success(self) -> None:
+        with self._lock:
+            was = self.state
+            self.state, self.failures = "closed", 0
+        if was != "closed":
+            logger.info("tmdb %s: disjuntor fechado", self.name, extra={"endpoint": self.name})
+
+    def failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == "open" or (self.state == "closed" and self.failures < self.max_failures):
+                return
+            self.state, self.changed_at = "open", time.monotonic()
+        logger.warning("tmdb %s: disjuntor aberto por %.0f s após %d falhas seguidas",
+                       self.name, self.cooldown, self.failures, extra={"endpoint": self.name})
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            retry_in = self.cooldown - (time.monotonic() - self.changed_at) if self.state == "open" else 0.0
+            return {"state": self.state, "failures": self.failures, "retry_in": round(max(retry_in, 0.0), 1)}
+
+_BREAKERS: Dict[str, CircuitBreaker] = {}
+_BREAKERS_LOCK = threading.Lock()
+
+def breaker(kind: str) -> CircuitBreaker:
+    with _BREAKERS_LOCK:
+        if kind not in _BREAKERS:
+            _BREAKERS[kind] = CircuitBreaker(kind)
+        return _BREAKERS[kind]
+
+def breaker_states() -> Dict[str, dict]:
+    """Estado dos disjuntores por endpoint (para /health e diagnóstico)."""
+    with _BREAKERS_LOCK:
+        breakers = list(_BREAKERS.values())
+    return {b.name: b.snapshot() for b in breakers}
+
+# instante (time.monotonic) em que o prazo da requisição atual acaba; None = sem prazo
+_DEADLINE: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("tmdb_deadline", default=None)
+
+@contextmanager
+def deadline(seconds: Optional[float] = None):
+    """
+    Prazo total (REQUEST_BUDGET por padrão) para as chamadas ao TMDB dentro do
+    bloco: cada uma espera no máximo o que sobra dele. Aninhado, vale o menor.
+    Serve também de decorador (o prazo começa a cada chamada).
+    """
+    limit = time.monotonic() + (REQUEST_BUDGET if seconds is None else seconds)
+    outer = _DEADLINE.get()
+    token = _DEADLINE.set(limit if outer is None else min(outer, limit))
     try:
-        if API_KEY_V3:
-            params["api_key"] = API_KEY_V3
-            resp = requests.get(url, params=params, timeout=10)
-        else:
-            resp = requests.get(url, headers=HEADERS, params=params, timeout=10)
+        yield
+    finally:
+        _DEADLINE.reset(token)
 
-        if resp.status_code != 200:
-            print(f"Erro na API (search): status {resp.status_code} — {resp.text[:200]}")
-            return {}
+def remaining() -> Optional[float]:
+    """Segundos que restam do prazo atual (None se não há prazo)."""
+    limit = _DEADLINE.get()
+    return None if limit is None else max(limit - time.monotonic(), 0.0)
 
-        data = resp.json()
-        _cache_set(cache_key, data)
-        return data
+@contextmanager
+def share_deadline(parts: int):
+    """
+    Dá ao bloco 1/parts do prazo restante: num laço de sub-chamadas em
+    sequência, `parts` = quantas ainda faltam. Uma que termina cedo (cache)
+    deixa a sobra para as seguintes.
+    """
+    left = remaining()
+    if left is None:
+        yield
+        return
+    with deadline(left / max(parts, 1)):
+        yield
+
+# ---------- requisição (comum a todos os endpoints) ----------
+def _log_hit(kind: str, t0: float) -> None:
+    tracing.current().set("cache", "hit")
+    logger.debug("tmdb %s", kind, extra={"endpoint": kind, "cache": "hit",
+                                         "latency_ms": round((time.perf_counter() - t0) * 1000, 3)})
 
+def _fetch(kind: str, url: str, params: dict) -> dict:
+    """
+    GET na API: chave v3 em query param, senão Bearer v4. Registra endpoint,
+    latência, status e cache (miss/error) no log. Retorna o JSON ou {} em erro.
+    Não chama (e retorna {} na hora) com o disjuntor do endpoint aberto ou
+    sem prazo sobrando; o timeout é o menor entre TIMEOUT e o prazo restante.
+    """
+    params = dict(params)  # api_key não vai para quem chamou (nem para a chave de cache)
+    t0 = time.perf_counter()
+    extra = {"endpoint": kind, "cache": "error"}
+    left = remaining()
+    timeout = TIMEOUT if left is None else min(TIMEOUT, left)
+    if timeout < MIN_CALL_TIMEOUT:
+        tracing.current().set("cache", "deadline")
+        logger.debug("tmdb %s: prazo esgotado, sem chamada", kind, extra={"endpoint": kind, "cache": "deadline"})
+        return {}
+    circuit = breaker(kind)
+    if not circuit.allow():
+        tracing.current().set("cache", "open")
+        logger.debug("tmdb %s: disjuntor aberto, sem chamada", kind, extra={"endpoint": kind, "cache": "open"})
+        return {}
+    tracing.current().set("cache", "miss")
+    try:
+        with tracing.span("tmdb.http", endpoint=kind, timeout=round(timeout, 2)) as sp:
+            if API_KEY_V3:
+                params["api_key"] = API_KEY_V3
+                resp = requests.get(url, params=params, timeout=timeout)
+            else:
+                resp = requests.get(url, headers=HEADERS, params=params, timeout=timeout)
+            sp.set("status", resp.status_code).set("bytes", len(resp.content))
     except requests.exceptions.Timeout:
-        print("Erro: requisição expirou (timeout). Tente novamente.")
+        circuit.failure()
+        extra["latency_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+        logger.warning("Erro: requisição %s expirou (timeout de %.1f s).", kind, timeout, extra=extra)
         return {}
     except requests.exceptions.RequestException as e:
-        print(f"Erro de rede/requests (search): {e}")
+        circuit.failure()
+        extra["latency_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+        logger.warning("Erro de rede (%s): %s", kind, e, extra=extra)
         return {}
 
-def discover_movies(params: dict = None, page: int = 1) -> dict:
+    extra.update(status=resp.status_code, latency_ms=round((time.perf_counter() - t0) * 1000, 1))
+    if resp.status_code != 200:
+        if resp.status_code >= 500 or resp.status_code == 429:
+            circuit.failure()
+        else:
+            circuit.success()
+        logger.warning("Erro na API (%s): status %s — %s", kind, resp.status_code, resp.text[:200], extra=extra)
+        return {}
+    try:
+        with tracing.span("tmdb.json_decode"):
+            data = resp.json()
+    except ValueError as e:
+        # 200 com corpo truncado/HTML de proxy: conta como falha do endpoint
+        circuit.failure()
+        logger.warning("Erro na API (%s): resposta não é JSON — %s", kind, e, extra=extra)
+        return {}
+    circuit.success()
+    extra["cache"] = "miss"
+    logger.debug("tmdb %s", kind, extra=extra)
+    return data
+
+def _local():
+    # import tardio: catalog importa este módulo
+    import catalog
+    return catalog
+
+# ---------- respostas degradadas ----------
+# marca das respostas de fallback (`resp.get(FALLBACK_KEY)`): quem guarda
+# resultados (shared_store, rec_cache, grafo, enriquecimento) não as guarda
+FALLBACK_KEY = "_fallback"
+# contador de fallbacks do bloco watch_fallbacks() atual (o mesmo dict passa
+# para o threadpool junto com o contexto)
+_FALLBACKS: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar("tmdb_fallbacks", default=None)
+
+def is_fallback(data) -> bool:
+    return isinstance(data, dict) and bool(data.get(FALLBACK_KEY))
+
+@contextmanager
+def watch_fallbacks():
     """
-    Usa /discover/movie. params aceita:
-      - genre_id (int)
-      - year (int)
-      - min_vote (float) -> vote_average.gte
-      - sort_by (str)
-      - include_adult (bool)
-      - min_vote_count (int) -> vote_count.gte (por padrão 30 se não informado)
+    Conta as respostas de fallback dadas dentro do bloco: `with
+    watch_fallbacks() as seen: ...` e depois `seen["count"]`. Serve para
+    resultados montados a partir de várias respostas (ex: lista de
+    recomendações), que não levam a marca. Aninhado, o de fora também conta.
     """
-    if params is None:
-        params = {}
+    outer = _FALLBACKS.get()
+    seen = {"count": 0}
+    token = _FALLBACKS.set(seen)
+    try:
+        yield seen
+    finally:
+        _FALLBACKS.reset(token)
+        if outer is not None:
+            outer["count"] += seen["count"]
+
+def fallbacks_seen() -> int:
+    """Fallbacks até agora no bloco watch_fallbacks() atual (0 fora de um)."""
+    seen = _FALLBACKS.get()
+    return seen["count"] if seen else 0
+
+def _fallback(kind: str, cache_key: str, local=None) -> dict:
+    """
+    Resposta de quando a chamada falhou (erro, disjuntor aberto, prazo
+    esgotado): o valor vencido do cache, se houver, senão `local()` (consulta
+    ao catálogo local), senão {}. Nada disso entra no cache, e a resposta vem
+    marcada com FALLBACK_KEY — menos a dos gêneros, que é um {nome: id} e
+    seria lida como mais um gênero (ela só conta em watch_fallbacks).
+    """
+    data, source = _SIMPLE_CACHE.get(cache_key), "stale"
+    if not data and local is not None:
+        source = "catalog"
+        try:
+            data = local()
+        except Exception as e:
+            logger.warning("tmdb %s: fallback local falhou: %s", kind, e, extra={"endpoint": kind})
+            data = None
+    seen = _FALLBACKS.get()
+    if seen is not None:
+        seen["count"] += 1
+    if not data:
+        return {}
+    tracing.current().set("fallback", source)
+    logger.debug("tmdb %s: fallback %s", kind, source, extra={"endpoint": kind, "cache": source})
+    if kind == "genres":
+        return data
+    return {**data, FALLBACK_KEY: True}
+
+# ---------- montagem das consultas (também dá a chave de cache a quem guarda a resposta fora daqui) ----------
+def _search_request(query: str, page: int = 1):
+    url = f"{BASE_URL}/search/movie"
+    params = {
+        "query": query,
+        "page": page,
+        "language": "pt-BR",
+        "include_adult": False
+    }
+    return url, params
 
+def _discover_request(params: dict, page: int = 1):
+    """URL e parâmetros do /discover no formato do TMDB (ver discover_movies)."""
     url = f"{BASE_URL}/discover/movie"
     api_params = {
         "page": page,
@@ -135,72 +467,106 @@ def discover_movies(params: dict = None, page: int = 1) -> dict:
             api_params["vote_count.gte"] = 30
     else:
         api_params["vote_count.gte"] = 30
+    return url, api_params
+
+def request_key(kind: str, *args) -> str:
+    """Chave de cache de search_movie(*args) / discover_movies(*args) / get_genres()."""
+    if kind == "search":
+        return _make_cache_key(*_search_request(*args))
+    if kind == "discover":
+        return _make_cache_key(*_discover_request(*args))
+    if kind == "genres":
+        return _make_cache_key(f"{BASE_URL}/genre/movie/list", {"language": "pt-BR"})
+    raise KeyError(kind)
+
+def note_use(kind: str, *args) -> None:
+    """Conta um pedido servido por um cache de fora (ex: shared_store) como se tivesse vindo aqui."""
+    _note_request(request_key(kind, *args), kind, *args)
 
-    cache_key = _make_cache_key(url, api_params)
+# ---------- funções principais ----------
+@tracing.traced("tmdb.search")
+def search_movie(query: str, page: int = 1) -> dict:
+    """
+    Busca filmes por texto (/search/movie).
+    Usa TMDB_API_KEY_V3 se existir (via param api_key). Caso contrário tenta Bearer v4.
+    Retorna JSON dict ou {} em caso de erro.
+    """
+    if not query or not str(query).strip():
+        return {}
+
+    url, params = _search_request(query, page)
+
+    # cache
+    t0 = time.perf_counter()
+    cache_key = _make_cache_key(url, params)
+    _note_request(cache_key, "search", query, page)
     cached = _cache_get(cache_key)
     if cached:
+        _log_hit("search", t0)
         return cached
 
-    try:
-        if API_KEY_V3:
-            api_params["api_key"] = API_KEY_V3
-            resp = requests.get(url, params=api_params, timeout=10)
-        else:
-            resp = requests.get(url, headers=HEADERS, params=api_params, timeout=10)
+    data = _fetch("search", url, params)
+    if not data:
+        return _fallback("search", cache_key, lambda: _local().search_local(query, page))
+    _cache_set(cache_key, data, ttl_for("search"))
+    return data
+
+@tracing.traced("tmdb.discover")
+def discover_movies(params: dict = None, page: int = 1) -> dict:
+    """
+    Usa /discover/movie. params aceita:
+      - genre_id (int)
+      - year (int)
+      - min_vote (float) -> vote_average.gte
+      - sort_by (str)
+      - include_adult (bool)
+      - min_vote_count (int) -> vote_count.gte (por padrão 30 se não informado)
+    """
+    if params is None:
+        params = {}
 
-        if resp.status_code != 200:
-            print(f"Erro na API (discover): status {resp.status_code} — {resp.text[:200]}")
-            return {}
+    url, api_params = _discover_request(params, page)
 
-        data = resp.json()
-        _cache_set(cache_key, data)
-        return data
+    t0 = time.perf_counter()
+    cache_key = _make_cache_key(url, api_params)
+    _note_request(cache_key, "discover", dict(params), page)
+    cached = _cache_get(cache_key)
+    if cached:
+        _log_hit("discover", t0)
+        return cached
 
-    except requests.exceptions.Timeout:
-        print("Erro: requisição discover expirou (timeout).")
-        return {}
-    except requests.exceptions.RequestException as e:
-        print(f"Erro de rede ao usar discover: {e}")
-        return {}
+    data = _fetch("discover", url, api_params)
+    if not data:
+        return _fallback("discover", cache_key, lambda: _local().discover_local(api_params, page))
+    _cache_set(cache_key, data, ttl_for("discover"))
+    return data
 
+@tracing.traced("tmdb.recommendations")
 def get_recommendations(movie_id: int, page: int = 1) -> dict:
     """
     /movie/{movie_id}/recommendations
     """
     if not movie_id:
-        print("ID de filme inválido para recomendações.")
+        logger.warning("ID de filme inválido para recomendações.")
         return {}
 
     url = f"{BASE_URL}/movie/{movie_id}/recommendations"
     params = {"page": page, "language": "pt-BR"}
 
+    t0 = time.perf_counter()
     cache_key = _make_cache_key(url, params)
     cached = _cache_get(cache_key)
     if cached:
+        _log_hit("recommendations", t0)
         return cached
 
-    try:
-        if API_KEY_V3:
-            params["api_key"] = API_KEY_V3
-            resp = requests.get(url, params=params, timeout=10)
-        else:
-            resp = requests.get(url, headers=HEADERS, params=params, timeout=10)
-
-        if resp.status_code != 200:
-            print(f"Erro na API (recommendations): status {resp.status_code} — {resp.text[:200]}")
-            return {}
-
-        data = resp.json()
-        _cache_set(cache_key, data)
-        return data
-
-    except requests.exceptions.Timeout:
-        print("Erro: requisição de recomendações expirou (timeout).")
-        return {}
-    except requests.exceptions.RequestException as e:
-        print(f"Erro de rede ao buscar recomendações: {e}")
-        return {}
+    data = _fetch("recommendations", url, params)
+    if not data:
+        return _fallback("recommendations", cache_key, lambda: _local().similar_local(movie_id, page))
+    _cache_set(cache_key, data, ttl_for("recommendations"))
+    return data
 
+@tracing.traced("tmdb.genres")
 def get_genres() -> dict:
     """
     Retorna dicionário normalizado {nome_normalizado: id_genero}
@@ -208,38 +574,29 @@ def get_genres() -> dict:
     url = f"{BASE_URL}/genre/movie/list"
     params = {"language": "pt-BR"}
 
+    t0 = time.perf_counter()
     cache_key = _make_cache_key(url, params)
+    _note_request(cache_key, "genres")
     cached = _cache_get(cache_key)
     if cached:
+        _log_hit("genres", t0)
         return cached
 
-    try:
-        if API_KEY_V3:
-            params["api_key"] = API_KEY_V3
-            resp = requests.get(url, params=params, timeout=10)
-        else:
-            resp = requests.get(url, headers=HEADERS, params=params, timeout=10)
-
-        if resp.status_code != 200:
-            print(f"Erro na API (genres): status {resp.status_code} — {resp.text[:200]}")
-            return {}
-
-        data = resp.json()
-        genres = data.get("genres", [])
-        genre_map = {}
-        for g in genres:
-            raw_name = g.get("name", "")
-            genre_id = g.get("id")
-            normalized = normalize_text(raw_name)
-            genre_map[normalized] = genre_id
-
-        _cache_set(cache_key, genre_map)
-        return genre_map
-
-    except requests.exceptions.RequestException as e:
-        print(f"Erro ao buscar gêneros: {e}")
-        return {}
-
+    data = _fetch("genres", url, params)
+    if not data:
+        return _fallback("genres", cache_key)
+    genres = data.get("genres", [])
+    genre_map = {}
+    for g in genres:
+        raw_name = g.get("name", "")
+        genre_id = g.get("id")
+        normalized = normalize_text(raw_name)
+        genre_map[normalized] = genre_id
+
+    _cache_set(cache_key, genre_map, ttl_for("genres"))
+    return genre_map
+
+@tracing.traced("tmdb.videos")
 def get_movie_videos(movie_id: int) -> dict:
     """
     /movie/{movie_id}/videos - retorna vídeos (trailers, teasers).
@@ -250,19 +607,44 @@ def get_movie_videos(movie_id: int) -> dict:
     url = f"{BASE_URL}/movie/{movie_id}/videos"
     params = {"language": "pt-BR"}  # pede PT-BR quando possível
 
-    try:
-        if API_KEY_V3:
-            params["api_key"] = API_KEY_V3
-            resp = requests.get(url, params=params, timeout=10)
-        else:
-            resp = requests.get(url, headers=HEADERS, params=params, timeout=10)
+    # cache (a pré-busca dos cards aquece isto antes do clique em "Detalhes")
+    t0 = time.perf_counter()
+    cache_key = _make_cache_key(url, params)
+    cached = _cache_get(cache_key)
+    if cached:
+        _log_hit("videos", t0)
+        return cached
+
+    # sem cópia vencida, vazio em erro: o app lida
+    data = _fetch("videos", url, params)
+    if not data:
+        return _fallback("videos", cache_key)
+    _cache_set(cache_key, data, ttl_for("videos"))
+    return data
 
-        if resp.status_code != 200:
-            # retorna vazio para o app lidar
-            return {}
-        return resp.json()
-    except requests.RequestException:
+@tracing.traced("tmdb.details")
+def get_movie_details(movie_id: int, language: str = "pt-BR") -> dict:
+    """
+    /movie/{movie_id} - detalhes completos (overview, popularity, genres etc.).
+    Retorna JSON dict ou {} em caso de erro.
+    """
+    if not movie_id:
         return {}
+    url = f"{BASE_URL}/movie/{movie_id}"
+    params = {"language": language}
+
+    t0 = time.perf_counter()
+    cache_key = _make_cache_key(url, params)
+    cached = _cache_get(cache_key)
+    if cached:
+        _log_hit("details", t0)
+        return cached
+
+    data = _fetch("details", url, params)
+    if not data:
+        return _fallback("details", cache_key, lambda: _local().get_movie(movie_id))
+    _cache_set(cache_key, data, ttl_for("details"))
+    return data
 
 
 
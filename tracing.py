@@ -0,0 +1,328 @@
+# tracing.py
+"""
+Spans de tracing leves (pai/filho, atributos) para ver onde vai o tempo de
+cada clique/requisição.
+
+    with tracing.span("recs.fanout", genres=3) as s:
+        ...
+        s.set("candidates", len(candidates))
+
+    @tracing.traced("favorites.add")
+    def add_favorite(...): ...
+
+O span atual fica numa contextvar: spans abertos dentro de outro viram
+filhos dele, com o mesmo trace_id. Desligado por padrão (span() devolve um
+objeto vazio, sem custo além de uma checagem). MOVIEBOT_TRACE liga:
+  - "file": um span por linha (JSON) em data/traces.jsonl;
+  - "otlp": OTLP/HTTP JSON para MOVIEBOT_OTLP_ENDPOINT (padrão
+    http://127.0.0.1:4318/v1/traces), aceito por coletores OpenTelemetry.
+A exportação é em lote, numa thread em background (com a fila cheia, o
+span é descartado, como no logging).
+
+`python tracing.py --collect` sobe um coletor OTLP local (grava no mesmo
+data/traces.jsonl) e `python tracing.py --show` mostra as árvores dos
+traces mais recentes com a duração de cada etapa.
+"""
+import argparse
+import atexit
+import contextvars
+import json
+import os
+import queue
+import threading
+import time
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+import requests
+
+from logger_conf import get_logger
+
+logger = get_logger(__name__)
+
+EXPORTER = os.getenv("MOVIEBOT_TRACE", "").strip().lower()
+TRACE_FILE = os.path.join(os.path.dirname(__file__), "data", "traces.jsonl")
+OTLP_ENDPOINT = os.getenv("MOVIEBOT_OTLP_ENDPOINT", "http://127.0.0.1:4318/v1/traces")
+SERVICE_NAME = os.getenv("MOVIEBOT_SERVICE_NAME", "moviebot")
+BATCH_SIZE = 256
+FLUSH_SECONDS = 2.0
+QUEUE_SIZE = 20000
+
+_CURRENT: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+_QUEUE: "queue.Queue[dict]" = queue.Queue(QUEUE_SIZE)
+_LOCK = threading.Lock()
+_WRITE_LOCK = threading.Lock()
+_EXPORT_THREAD: Optional[threading.Thread] = None
+_DROPPED = 0
+
+def enabled() -> bool:
+    return EXPORTER in ("file", "otlp")
+
+class Span:
+    """Um trecho cronometrado. Use com `with` (ou start()/end() quando o bloco não cabe num with)."""
+
+    def __init__(self, name: str, attributes: Dict[str, Any], root: bool = False):
+        parent = None if root else _CURRENT.get()
+        self.name = name
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = attributes
+        self.status = "ok"
+        self.start_ns = 0
+        self.end_ns = 0
+        self._token = None
+
+    def set(self, key: str, value: Any) -> "Span":
+        self.attributes[key] = value
+        return self
+
+    def start(self) -> "Span":
+        self.start_ns = time.time_ns()
+        self._token = _CURRENT.set(self)
+        return self
+
+    def end(self, exc: Optional[BaseException] = None) -> None:
+        self.end_ns = time.time_ns()
+        if isinstance(exc, Exception):
+            self.status = "error"
+            self.attributes["exception"] = f"{type(exc).__name__}: {exc}"[:300]
+        elif exc is not None:
+            # controle de fluxo (ex: RerunException do Streamlit), não erro
+            self.attributes["interrupted"] = type(exc).__name__
+        if self._token is not None:
+            try:
+                _CURRENT.reset(self._token)
+            except ValueError:
+                _CURRENT.set(None)  # fechado em outro contexto (ex: rerun interrompido)
+            self._token = None
+        _export(self)
+
+    def __enter__(self) -> "Span":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.end(exc)
+        return False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id, "span_id": self.span_id, "parent_id": self.parent_id,
+            "name": self.name, "start_ns": self.start_ns, "end_ns": self.end_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "status": self.status, "attributes": self.attributes,
+        }
+
+class _NoopSpan:
+    def set(self, key, value):
+        return self
+
+    def start(self):
+        return self
+
+    def end(self, exc=None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NOOP = _NoopSpan()
+
+def span(name: str, root: bool = False, **attributes):
+    """Span filho do atual (ou raiz de um trace novo); vazio se o tracing está desligado."""
+    if not enabled():
+        return _NOOP
+    return Span(name, attributes, root=root)
+
+def current():
+    """Span aberto neste contexto (para pôr atributos de dentro de uma função auxiliar)."""
+    return (_CURRENT.get() if enabled() else None) or _NOOP
+
+def traced(name: Optional[str] = None):
+    """Decorador: cada chamada vira um span."""
+    def decorate(fn):
+        span_name = name or f"{fn.__module__}.{fn.__name__}"
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not enabled():
+                return fn(*args, **kwargs)
+            with Span(span_name, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+# ---------- exportação ----------
+def _export(s: Span) -> None:
+    global _DROPPED
+    _ensure_exporter()
+    try:
+        _QUEUE.put_nowait(s.to_dict())
+    except queue.Full:
+        _DROPPED += 1
+
+def _ensure_exporter() -> None:
+    global _EXPORT_THREAD
+    if _EXPORT_THREAD is not None:
+        return
+    with _LOCK:
+        if _EXPORT_THREAD is None:
+            _EXPORT_THREAD = threading.Thread(target=_export_loop, name="trace-export", daemon=True)
+            _EXPORT_THREAD.start()
+            atexit.register(flush)
+
+def _drain(limit: int = BATCH_SIZE) -> List[dict]:
+    batch = []
+    while len(batch) < limit:
+        try:
+            batch.append(_QUEUE.get_nowait())
+        except queue.Empty:
+            break
+    return batch
+
+def write_spans(spans: List[dict], path: Optional[str] = None) -> None:
+    path = path or TRACE_FILE
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with _WRITE_LOCK, open(path, "a", encoding="utf-8") as f:
+        f.write("".join(json.dumps(s, ensure_ascii=False, default=str) + "\n" for s in spans))
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+def to_otlp(spans: List[dict]) -> Dict[str, Any]:
+    """Corpo de um ExportTraceServiceRequest (OTLP/HTTP JSON)."""
+    otlp_spans = []
+    for s in spans:
+        item = {
+            "traceId": s["trace_id"], "spanId": s["span_id"], "name": s["name"], "kind": 1,
+            "startTimeUnixNano": str(s["start_ns"]), "endTimeUnixNano": str(s["end_ns"]),
+            "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in s["attributes"].items()],
+            "status": {"code": 2 if s["status"] == "error" else 1},
+        }
+        if s["parent_id"]:
+            item["parentSpanId"] = s["parent_id"]
+        otlp_spans.append(item)
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+        "scopeSpans": [{"scope": {"name": "moviebot.tracing"}, "spans": otlp_spans}],
+    }]}
+
+def from_otlp(body: Dict[str, Any]) -> List[dict]:
+    """Spans (no formato do arquivo) de um ExportTraceServiceRequest."""
+    spans = []
+    for rs in body.get("resourceSpans", []):
+        for ss in rs.get("scopeSpans", []):
+            for s in ss.get("spans", []):
+                start, end = int(s.get("startTimeUnixNano", 0)), int(s.get("endTimeUnixNano", 0))
+                attrs = {a["key"]: next(iter(a.get("value", {}).values()), None) for a in s.get("attributes", [])}
+                spans.append({
+                    "trace_id": s.get("traceId"), "span_id": s.get("spanId"), "parent_id": s.get("parentSpanId"),
+                    "name": s.get("name"), "start_ns": start, "end_ns": end,
+                    "duration_ms": round((end - start) / 1e6, 3),
+                    "status": "error" if s.get("status", {}).get("code") == 2 else "ok", "attributes": attrs,
+                })
+    return spans
+
+def _send(spans: List[dict]) -> None:
+    if not spans:
+        return
+    try:
+        if EXPORTER == "otlp":
+            resp = requests.post(OTLP_ENDPOINT, json=to_otlp(spans), timeout=5)
+            if resp.status_code >= 300:
+                logger.warning("tracing: coletor respondeu %s", resp.status_code)
+        else:
+            write_spans(spans)
+    except Exception as e:
+        logger.warning("tracing: falha ao exportar %d spans: %s", len(spans), e)
+
+def _export_loop() -> None:
+    while True:
+        time.sleep(FLUSH_SECONDS)
+        while True:
+            batch = _drain()
+            if not batch:
+                break
+            _send(batch)
+
+def flush() -> None:
+    """Exporta agora o que está na fila (chamado também na saída do processo)."""
+    while True:
+        batch = _drain()
+        if not batch:
+            return
+        _send(batch)
+
+# ---------- coletor local e visualização ----------
+class _CollectorHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        if self.path.rstrip("/") != "/v1/traces":
+            self.send_error(404)
+            return
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            write_spans(from_otlp(body), self.server.trace_file)
+        except (ValueError, KeyError) as e:
+            self.send_error(400, str(e))
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, format, *args):
+        pass
+
+def collect(host: str = "127.0.0.1", port: int = 4318, path: Optional[str] = None) -> None:
+    server = ThreadingHTTPServer((host, port), _CollectorHandler)
+    server.trace_file = path or TRACE_FILE
+    print(f"Coletor OTLP em http://{host}:{port}/v1/traces -> {server.trace_file}")
+    server.serve_forever()
+
+def show(path: Optional[str] = None, last: int = 5) -> None:
+    """Imprime as árvores dos `last` traces mais recentes do arquivo."""
+    by_trace: Dict[str, List[dict]] = {}
+    with open(path or TRACE_FILE, "r", encoding="utf-8") as f:
+        for line in f:
+            s = json.loads(line)
+            by_trace.setdefault(s["trace_id"], []).append(s)
+    traces = sorted(by_trace.values(), key=lambda spans: min(s["start_ns"] for s in spans))[-last:]
+    for spans in traces:
+        ids = {s["span_id"] for s in spans}
+        children: Dict[Optional[str], List[dict]] = {}
+        for s in spans:
+            parent = s["parent_id"] if s["parent_id"] in ids else None
+            children.setdefault(parent, []).append(s)
+
+        def walk(parent, depth):
+            for s in sorted(children.get(parent, []), key=lambda x: x["start_ns"]):
+                attrs = " ".join(f"{k}={v}" for k, v in s["attributes"].items())
+                flag = " !" if s["status"] == "error" else ""
+                print(f"{'  ' * depth}{s['name']:<{40 - 2 * depth}} {s['duration_ms']:>9.1f} ms{flag}  {attrs}")
+                walk(s["span_id"], depth + 1)
+        print(f"trace {spans[0]['trace_id'][:12]} ({len(spans)} spans)")
+        walk(None, 1)
+        print()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Coletor local e visualização dos traces do MovieBot.")
+    parser.add_argument("--collect", action="store_true", help="sobe um coletor OTLP/HTTP local")
+    parser.add_argument("--port", type=int, default=4318)
+    parser.add_argument("--show", action="store_true", help="mostra os traces mais recentes")
+    parser.add_argument("--last", type=int, default=5)
+    parser.add_argument("--file", default=TRACE_FILE)
+    args = parser.parse_args()
+    if args.collect:
+        collect(port=args.port, path=args.file)
+    else:
+        show(args.file, args.last)
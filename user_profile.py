@@ -0,0 +1,247 @@
+# user_profile.py
+"""
+Perfil do usuário mantido incrementalmente: contagem de gêneros e soma dos
+vetores de texto (TF-IDF) das sinopses dos favoritos.
+
+Antes cada recomendador recontava gêneros e concatenava sinopses a cada
+pedido; agora `add_favorite`/`remove_favorite`/enriquecimento atualizam o
+perfil e ele fica salvo em data/, então o recomendador parte de um perfil
+pronto, qualquer que seja o número de favoritos.
+"""
+import json
+import os
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import scipy.sparse as sp
+
+import favorites
+from text_model import TextModel, get_text_model
+from logger_conf import get_logger
+
+logger = get_logger(__name__)
+
+PROFILE_FILE = os.path.join(os.path.dirname(__file__), "data", "profile.json")
+PROFILE_TEXT_FILE = os.path.join(os.path.dirname(__file__), "data", "profile_text.npy")
+
+class UserProfile:
+    """Pesos de gênero + centróide de texto de uma lista de favoritos."""
+
+    def __init__(self):
+        self.genre_counts: Counter = Counter()
+        self.ids: set = set()
+        self.text_ids: set = set()          # favoritos cujo texto já está em text_sum
+        self.text_sum: Optional[np.ndarray] = None
+        self.model_version: Optional[str] = None
+        self.fav_mtime: float = 0.0         # mtime do favorites.json quando o perfil foi atualizado
+
+    # ---------- construção ----------
+    @classmethod
+    def from_favorites(cls, favs: Iterable[Dict], model: Optional[TextModel] = None) -> "UserProfile":
+        prof = cls()
+        prof.model_version = model.version if model is not None else None
+        for f in favs or []:
+            prof.add(f, model)
+        return prof
+
+    def add(self, movie: Dict, model: Optional[TextModel] = None) -> None:
+        mid = movie.get("id")
+        if not mid or mid in self.ids:
+            return
+        self.ids.add(mid)
+        for gid in movie.get("genre_ids", []) or []:
+            try:
+                self.genre_counts[int(gid)] += 1
+            except (ValueError, TypeError):
+                pass
+        self._add_text(movie, model)
+
+    def remove(self, movie: Dict, model: Optional[TextModel] = None) -> None:
+        mid = movie.get("id")
+        if mid not in self.ids:
+            return
+        self.ids.discard(mid)
+        for gid in movie.get("genre_ids", []) or []:
+            try:
+                gid = int(gid)
+            except (ValueError, TypeError):
+                continue
+            self.genre_counts[gid] -= 1
+            if self.genre_counts[gid] <= 0:
+                del self.genre_counts[gid]
+        if mid in self.text_ids:
+            vec = self._vector(movie, model)
+            if vec is not None:
+                self.text_sum -= vec
+            self.text_ids.discard(mid)
+
+    def update(self, movie: Dict, model: Optional[TextModel] = None) -> None:
+        """Favorito enriquecido depois (ex: ganhou overview): inclui o texto que faltava."""
+        if movie.get("id") in self.ids:
+            self._add_text(movie, model)
+
+    def _vector(self, movie: Dict, model: Optional[TextModel]) -> Optional[np.ndarray]:
+        text = movie.get("overview") or ""
+        if model is None or model.version != self.model_version or not text.strip():
+            return None
+        return model.transform([text]).toarray().ravel()
+
+    def _add_text(self, movie: Dict, model: Optional[TextModel]) -> None:
+        mid = movie.get("id")
+        if mid in self.text_ids:
+            return
+        vec = self._vector(movie, model)
+        if vec is None:
+            return
+        if self.text_sum is None or self.text_sum.shape != vec.shape:
+            self.text_sum = np.zeros_like(vec)
+        self.text_sum += vec
+        self.text_ids.add(mid)
+
+    # ---------- leitura ----------
+    def genre_weights(self) -> Dict[int, float]:
+        total = sum(self.genre_counts.values())
+        if not total:
+            return {}
+        return {gid: count / total for gid, count in self.genre_counts.items()}
+
+    def top_genres(self, top_n: int = 3) -> List[int]:
+        return [gid for gid, _ in self.genre_counts.most_common(top_n)]
+
+    def has_text(self) -> bool:
+        return self.text_sum is not None and bool(self.text_ids) and bool(np.any(self.text_sum))
+
+    def text_query(self):
+        """Centróide de texto normalizado (L2) como matriz esparsa (1, F), pronto para TextModel.similarity."""
+        if not self.has_text():
+            return None
+        norm = np.linalg.norm(self.text_sum)
+        return sp.csr_matrix(self.text_sum / norm)
+
+    # ---------- persistência ----------
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(PROFILE_FILE), exist_ok=True)
+        meta = {
+            "genre_counts": {str(k): v for k, v in self.genre_counts.items()},
+            "ids": sorted(self.ids),
+            "text_ids": sorted(self.text_ids),
+            "model_version": self.model_version,
+            "fav_mtime": self.fav_mtime,
+        }
+        if self.text_sum is not None:
+            tmp = PROFILE_TEXT_FILE + ".tmp.npy"
+            np.save(tmp, self.text_sum)
+            os.replace(tmp, PROFILE_TEXT_FILE)
+        tmp = PROFILE_FILE + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp, PROFILE_FILE)
+
+    @classmethod
+    def load(cls) -> Optional["UserProfile"]:
+        try:
+            with open(PROFILE_FILE, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning("user_profile: perfil ilegível, reconstruindo: %s", e)
+            return None
+        prof = cls()
+        prof.genre_counts = Counter({int(k): v for k, v in meta.get("genre_counts", {}).items()})
+        prof.ids = set(meta.get("ids", []))
+        prof.text_ids = set(meta.get("text_ids", []))
+        prof.model_version = meta.get("model_version")
+        prof.fav_mtime = meta.get("fav_mtime", 0.0)
+        if prof.text_ids:
+            try:
+                prof.text_sum = np.load(PROFILE_TEXT_FILE)
+            except Exception:
+                # sem o vetor o texto precisa ser refeito
+                prof.text_ids = set()
+                prof.model_version = None
+        return prof
+
+# ---------- perfil do favorites.json ----------
+_PROFILE: Optional[UserProfile] = None
+_PROFILE_MTIME = 0.0
+_LOCK = threading.RLock()
+
+def _fav_mtime() -> float:
+    try:
+        return os.path.getmtime(favorites.FAV_FILE)
+    except OSError:
+        return 0.0
+
+def _file_mtime() -> float:
+    try:
+        return os.path.getmtime(PROFILE_FILE)
+    except OSError:
+        return 0.0
+
+def _persist(prof: UserProfile) -> None:
+    global _PROFILE_MTIME
+    prof.fav_mtime = _fav_mtime()
+    try:
+        prof.save()
+        _PROFILE_MTIME = _file_mtime()
+    except Exception as e:
+        logger.error("user_profile: erro ao gravar perfil: %s", e)
+
+def rebuild_profile(model: Optional[TextModel] = None) -> UserProfile:
+    """Reconstrói do zero a partir do favorites.json (usado só quando o perfil salvo não confere)."""
+    global _PROFILE
+    with _LOCK:
+        prof = UserProfile.from_favorites(favorites.list_favorites(), model)
+        _persist(prof)
+        _PROFILE = prof
+        return prof
+
+def get_profile() -> UserProfile:
+    """
+    Perfil atual dos favoritos. Em regime normal só faz dois `stat`; reconstrói
+    apenas se o favorites.json foi alterado por um processo que não atualizou
+    o perfil, ou se o modelo de texto foi reajustado.
+    """
+    global _PROFILE, _PROFILE_MTIME
+    model = get_text_model()
+    with _LOCK:
+        if _PROFILE is None or _file_mtime() != _PROFILE_MTIME:
+            _PROFILE = UserProfile.load()
+            _PROFILE_MTIME = _file_mtime()
+        prof = _PROFILE
+        if prof is None or prof.fav_mtime < _fav_mtime():
+            return rebuild_profile(model)
+        if model is not None and prof.model_version != model.version:
+            return rebuild_profile(model)
+        return prof
+
+def on_favorites_changed(event: str, movie: Dict) -> None:
+    global _PROFILE, _PROFILE_MTIME
+    model = get_text_model()
+    with _LOCK:
+        # outro processo (API, CLI, outro worker) pode ter gravado um perfil mais novo
+        prof = _PROFILE
+        if prof is None or _file_mtime() != _PROFILE_MTIME:
+            prof = UserProfile.load()
+            _PROFILE_MTIME = _file_mtime()
+        if prof is None or (model is not None and prof.model_version != model.version):
+            rebuild_profile(model)
+            return
+        if event == "add":
+            prof.add(movie, model)
+        elif event == "remove":
+            prof.remove(movie, model)
+        elif event == "update":
+            prof.update(movie, model)
+        # o favorites.json já tem esta mudança, mas pode ter outras de quem não
+        # atualiza o perfil; o delta só vale se os ids baterem com o arquivo
+        if prof.ids != {f.get("id") for f in favorites.list_favorites() if f.get("id")}:
+            rebuild_profile(model)
+            return
+        _persist(prof)
+        _PROFILE = prof
+
+favorites.add_listener(on_favorites_changed)
@@ -0,0 +1,233 @@
+# warm_cache.py
+"""
+Aquecimento do cache do tmdb_client: snapshot no boot e reaquecimento contínuo.
+
+O snapshot (data/tmdb_snapshot.json) guarda as respostas dos gêneros, das
+páginas do discover mais usadas (cada gênero x ordenação x mínimo de votos
+padrão) e das buscas mais populares, junto com quantas vezes cada consulta
+foi pedida. No boot, `boot()` carrega o arquivo direto no cache (nenhuma
+chamada de rede) e, se ele estiver velho, atualiza em background e salva de
+novo.
+
+Depois do boot (no app e na API), o WarmingScheduler rebusca as consultas
+quentes pouco antes do TTL vencer: as fixas (gêneros, discover padrão, MOVIEBOT_WARM_QUERIES) e
+as observadas com pelo menos MIN_COUNT pedidos recentes (as contagens decaem
+com meia-vida COUNT_HALF_LIFE), na ordem de frequência.
+"""
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+import tmdb_client
+from tmdb_client import bypass_cache, discover_movies, get_genres, search_movie
+from logger_conf import get_logger
+
+logger = get_logger(__name__)
+
+SNAPSHOT_FILE = os.path.join(os.path.dirname(__file__), "data", "tmdb_snapshot.json")
+
+# snapshot mais novo que isso não é atualizado no boot (evita N workers buscando juntos)
+SNAPSHOT_MAX_AGE = float(os.getenv("MOVIEBOT_SNAPSHOT_MAX_AGE", "3600"))
+MAX_SEARCHES = 50
+MAX_DISCOVER = 300
+
+# consultas do discover que o app/CLI sempre fazem, para cada gênero
+HOT_SORTS = ("popularity.desc", "vote_average.desc")
+HOT_MIN_VOTES = (10, 30, 50)
+
+_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="warm-cache")
+_LOCK = threading.Lock()
+_BOOTED = False
+
+def _hot(kind: str, n: int) -> List[Tuple[str, dict]]:
+    """As n consultas de um tipo mais pedidas (que estão no cache), da mais para a menos."""
+    return tmdb_client.top_requests(kind, n)
+
+def export_snapshot(path: Optional[str] = None) -> int:
+    """Grava gêneros + discover/buscas mais pedidos. Retorna quantas respostas foram salvas."""
+    path = path or SNAPSHOT_FILE
+    chosen = _hot("genres", 1) + _hot("discover", MAX_DISCOVER) + _hot("search", MAX_SEARCHES)
+    snapshot = {
+        "created": time.time(),
+        "entries": tmdb_client.cached_responses(k for k, _ in chosen),
+        "requests": dict(chosen),
+    }
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, ensure_ascii=False)
+        os.replace(tmp, path)
+    except Exception as e:
+        logger.error("warm_cache: erro ao gravar snapshot: %s", e)
+        return 0
+    return len(snapshot["entries"])
+
+def import_snapshot(path: Optional[str] = None) -> Optional[float]:
+    """Carrega o snapshot no cache (sem sobrescrever o que já está lá). Retorna quando ele foi criado."""
+    path = path or SNAPSHOT_FILE
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning("warm_cache: snapshot ilegível, ignorando: %s", e)
+        return None
+
+    # vale o TTL inteiro a partir do boot; a atualização em background troca depois
+    tmdb_client.restore_cache(snapshot.get("entries") or {}, snapshot.get("requests") or {})
+    return snapshot.get("created")
+
+def standard_queries() -> List[Tuple[str, tuple]]:
+    """Gêneros + discover padrão de cada gênero (ordenação x mínimo de votos)."""
+    queries: List[Tuple[str, tuple]] = [("genres", ())]
+    for gid in sorted(set((get_genres() or {}).values())):
+        for sort_by in HOT_SORTS:
+            for min_votes in HOT_MIN_VOTES:
+                queries.append(("discover", ({"genre_id": gid, "sort_by": sort_by, "min_vote_count": min_votes}, 1)))
+    return queries
+
+def hot_queries() -> List[Tuple[str, tuple]]:
+    """Consultas a reaquecer: as padrão e as mais pedidas."""
+    queries = standard_queries()
+    for _, entry in _hot("discover", MAX_DISCOVER):
+        queries.append(("discover", tuple(entry["args"])))
+    for _, entry in _hot("search", MAX_SEARCHES):
+        queries.append(("search", tuple(entry["args"])))
+    return queries
+
+def _run(kind: str, args: tuple) -> dict:
+    fn = {"genres": get_genres, "discover": discover_movies, "search": search_movie}[kind]
+    # busca de novo mesmo com o valor em cache; se falhar, o antigo continua lá
+    with bypass_cache():
+        return fn(*args)
+
+def refresh_snapshot(path: Optional[str] = None) -> int:
+    """Rebusca as consultas quentes (em paralelo) e grava um snapshot novo."""
+    queries = list(dict.fromkeys((k, json.dumps(a, sort_keys=True)) for k, a in hot_queries()))
+    list(_EXECUTOR.map(lambda q: _run(q[0], tuple(json.loads(q[1]))), queries))
+    return export_snapshot(path)
+
+# ---------- reaquecimento antes do TTL vencer ----------
+# rebusca quando faltar menos que isso para vencer (fração do TTL da consulta)
+REFRESH_AHEAD = 0.2
+TICK_SECONDS = float(os.getenv("MOVIEBOT_WARM_TICK", "15"))
+MAX_PER_TICK = 20
+# consultas observadas com menos pedidos que isso não são reaquecidas
+MIN_COUNT = 2
+# meia-vida das contagens de pedidos: a cada rodada elas decaem, então uma
+# busca que foi popular ontem deixa de ser reaquecida
+COUNT_HALF_LIFE = float(os.getenv("MOVIEBOT_WARM_HALF_LIFE", "3600"))
+# JSON com consultas extras sempre quentes: [{"kind": "search", "args": ["matrix", 1]}, ...]
+WARM_QUERIES_FILE = os.getenv("MOVIEBOT_WARM_QUERIES")
+
+def configured_queries() -> List[Tuple[str, tuple]]:
+    """Consultas sempre quentes: as padrão + as do arquivo MOVIEBOT_WARM_QUERIES."""
+    queries = standard_queries()
+    if WARM_QUERIES_FILE:
+        try:
+            with open(WARM_QUERIES_FILE, "r", encoding="utf-8") as f:
+                queries += [(q["kind"], tuple(q.get("args") or ())) for q in json.load(f)]
+        except Exception as e:
+            logger.warning("warm_cache: lista de consultas ilegível, ignorando: %s", e)
+    return queries
+
+class WarmingScheduler:
+    """Thread que, a cada TICK_SECONDS, rebusca as consultas quentes perto de vencer."""
+
+    def __init__(self, tick: float = TICK_SECONDS, max_per_tick: int = MAX_PER_TICK):
+        self.tick = tick
+        self.max_per_tick = max_per_tick
+        self.pinned: set = set()          # chaves de cache das consultas fixas
+        self.refreshed = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def seed(self) -> None:
+        """Garante as consultas fixas no cache e descobre as chaves delas."""
+        wanted = {(kind, json.dumps(list(args), sort_keys=True, default=str)) for kind, args in configured_queries()}
+        known = {(e["kind"], json.dumps(e["args"], sort_keys=True, default=str)): k
+                 for k, e in tmdb_client.tracked_requests().items()}
+        missing = [w for w in wanted if w not in known]
+        list(_EXECUTOR.map(lambda w: _run(w[0], tuple(json.loads(w[1]))), missing))
+        self.pinned = {k for k, e in tmdb_client.tracked_requests().items()
+                       if (e["kind"], json.dumps(e["args"], sort_keys=True, default=str)) in wanted}
+
+    def due(self, now: Optional[float] = None) -> List[Tuple[str, dict]]:
+        """Consultas quentes perto de vencer, da mais pedida para a menos (fixas primeiro)."""
+        now = now or time.time()
+        entries = [(k, e) for k, e in tmdb_client.tracked_requests().items()
+                   if e["kind"] in ("genres", "discover", "search")
+                   and (k in self.pinned or e["count"] >= MIN_COUNT)]
+        due = []
+        for key, entry in entries:
+            ahead = tmdb_client.ttl_for(entry["kind"]) * REFRESH_AHEAD
+            if tmdb_client.cache_expires_at(key) - now <= ahead:
+                due.append((key, entry))
+        due.sort(key=lambda item: (item[0] not in self.pinned, -item[1]["count"]))
+        return due[: self.max_per_tick]
+
+    def run_once(self) -> int:
+        batch = self.due()
+        list(_EXECUTOR.map(lambda item: _run(item[1]["kind"], tuple(item[1]["args"])), batch))
+        tmdb_client.purge_expired()
+        tmdb_client.decay_requests(0.5 ** (self.tick / COUNT_HALF_LIFE), keep=self.pinned)
+        self.refreshed += len(batch)
+        return len(batch)
+
+    def _loop(self) -> None:
+        try:
+            self.seed()
+        except Exception as e:
+            logger.exception("warm_cache: falha ao semear consultas fixas")
+        while not self._stop.wait(self.tick):
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.exception("warm_cache: reaquecimento falhou")
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="warm-cache-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+SCHEDULER = WarmingScheduler()
+
+def _refresh_job() -> None:
+    try:
+        refresh_snapshot()
+    except Exception as e:
+        logger.exception("warm_cache: atualização do snapshot falhou")
+
+def boot(refresh: bool = True, schedule: bool = False) -> int:
+    """
+    Uma vez por processo: carrega o snapshot no cache e, se ele não existe ou
+    passou de SNAPSHOT_MAX_AGE (e `refresh`), agenda a atualização em
+    background. Com `schedule`, também liga o WarmingScheduler — só para
+    processos de longa duração (app e API), não para o CLI/lote.
+    Retorna quantas respostas estão no cache depois do carregamento.
+    """
+    global _BOOTED
+    with _LOCK:
+        if _BOOTED:
+            return tmdb_client.cache_size()
+        _BOOTED = True
+    created = import_snapshot()
+    if refresh and (created is None or time.time() - created > SNAPSHOT_MAX_AGE):
+        threading.Thread(target=_refresh_job, name="warm-cache-refresh", daemon=True).start()
+    if schedule:
+        SCHEDULER.start()
+    return tmdb_client.cache_size()
+
+if __name__ == "__main__":
+    import_snapshot()
+    t0 = time.perf_counter()
+    n = refresh_snapshot()
+    print(f"Snapshot com {n} respostas gravado em {time.perf_counter() - t0:.1f}s ({SNAPSHOT_FILE}).")